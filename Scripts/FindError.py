@@ -1,8 +1,9 @@
-import csv
-import json
 import logging
 import time
 
+import checkpoint
+from reference_catalog import ReferenceCatalog, describe_suggestions, load_klass, load_lesson
+
 # Настройка логирования
 logging.basicConfig(
     filename='log.log',
@@ -10,74 +11,57 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-time.sleep(2)
-
-# Открываем файл klass.csv и считываем первые значения из каждой строки (пропуская первые 3 строки)
-klass = []
-try:
-    with open('klass.csv', 'r', encoding='windows-1251') as file:
-        reader = csv.reader(file, delimiter=';')
-        for i in range(3):  # Пропускаем первые 3 строки
-            next(reader, None)
-        for row in reader:
-            if row:  # Проверяем, что строка не пустая
-                klass.append(row[0].strip())
-    logging.info("Файл klass.csv успешно обработан.")
-except Exception as e:
-    logging.error(f"Ошибка при чтении файла klass.csv: {e}")
+# Проверяем значения в JSON файле
+# klass и lesson - списки или ReferenceCatalog (общий для FindError и Final_check в конвейере)
+def find_errors(data, klass, lesson):
+    errors = []
+    klass = ReferenceCatalog.of(klass)
+    lesson = ReferenceCatalog.of(lesson)
 
-# Открываем файл lesson.csv и считываем все строки (пропуская первые 2 строки)
-lesson = []
-try:
-    with open('lesson.csv', 'r', encoding='windows-1251') as file:
-        reader = csv.reader(file, delimiter=';')
-        for i in range(2):  # Пропускаем первые 2 строки
-            next(reader, None)
-        for row in reader:
-            if row:  # Проверяем, что строка не пустая
-                lesson.append(row[0].strip())
-    logging.info("Файл lesson.csv успешно обработан.")
-except Exception as e:
-    logging.error(f"Ошибка при чтении файла lesson.csv: {e}")
+    for class_name, days in data.items():
+        for day, lessons in days.items():
+            for lesson_num, lesson_info in lessons.items():
+                # Проверяем ключ "lesson"
+                lesson_value = lesson_info.get("lesson", "").strip()
+                if lesson_value and lesson_value not in lesson:  # Проверяем только если значение не пустое
+                    errors.append(f"Класс: {class_name}, День: {day}, Урок: {lesson_num}, "
+                                  f"Несоответствие в lesson: {lesson_value}{describe_suggestions(lesson, lesson_value)}")
 
-# Считываем файл raspisanie.json
-try:
-    with open('raspisanie.json', 'r', encoding='utf-8') as file:
-        data = json.load(file)
-    logging.info("Файл raspisanie.json успешно загружен.")
-except Exception as e:
-    logging.error(f"Ошибка при чтении файла raspisanie.json: {e}")
-    exit()
+                # Проверяем ключ "number"
+                number_value = lesson_info.get("number", "").strip()
+                if number_value and number_value not in klass:  # Проверяем только если значение не пустое
+                    errors.append(f"Класс: {class_name}, День: {day}, Урок: {lesson_num}, "
+                                  f"Несоответствие в number: {number_value}{describe_suggestions(klass, number_value)}")
+    return errors
 
-# Проверяем значения в JSON файле
-errors = []
+# Записываем ошибки в файл error.log
+def write_errors(errors, file_path='error.log'):
+    if errors:
+        try:
+            with open(file_path, 'w', encoding='utf-8') as file:
+                for error in errors:
+                    file.write(error + '\n')
+                    logging.error(error)
+            logging.info("Несоответствия записаны в файл error.log.")
+        except Exception as e:
+            logging.error(f"Ошибка при записи в файл error.log: {e}")
+    else:
+        logging.info("Несоответствий не найдено.")
 
-for class_name, days in data.items():
-    for day, lessons in days.items():
-        for lesson_num, lesson_info in lessons.items():
-            # Проверяем ключ "lesson"
-            lesson_value = lesson_info.get("lesson", "").strip()
-            if lesson_value and lesson_value not in lesson:  # Проверяем только если значение не пустое
-                errors.append(f"Класс: {class_name}, День: {day}, Урок: {lesson_num}, "
-                              f"Несоответствие в lesson: {lesson_value}")
+if __name__ == "__main__":
+    time.sleep(2)
 
-            # Проверяем ключ "number"
-            number_value = lesson_info.get("number", "").strip()
-            if number_value and number_value not in klass:  # Проверяем только если значение не пустое
-                errors.append(f"Класс: {class_name}, День: {day}, Урок: {lesson_num}, "
-                              f"Несоответствие в number: {number_value}")
+    klass = ReferenceCatalog(load_klass('klass.csv'))
+    lesson = ReferenceCatalog(load_lesson('lesson.csv'))
 
-# Записываем ошибки в файл error.log
-if errors:
+    # Считываем файл raspisanie.json
     try:
-        with open('error.log', 'w', encoding='utf-8') as file:
-            for error in errors:
-                file.write(error + '\n')
-                logging.error(error)
-        logging.info("Несоответствия записаны в файл error.log.")
+        data = checkpoint.load('raspisanie.json')
+        logging.info("Файл raspisanie.json успешно загружен.")
     except Exception as e:
-        logging.error(f"Ошибка при записи в файл error.log: {e}")
-else:
-    logging.info("Несоответствий не найдено.")
+        logging.error(f"Ошибка при чтении файла raspisanie.json: {e}")
+        exit()
+
+    write_errors(find_errors(data, klass, lesson), 'error.log')
 
-time.sleep(2)
\ No newline at end of file
+    time.sleep(2)
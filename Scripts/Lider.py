@@ -1,3 +1,4 @@
+import argparse
 import os
 import subprocess
 import time
@@ -54,8 +55,28 @@ def ask_user_confirmation(prompt):
         else:
             print("Пожалуйста, введите 'да' или 'нет'.")
 
-# Основной код
-if __name__ == "__main__":
+# Проверки после этапа в режиме --legacy: ошибки в log.log и файлы ошибок
+def check_stage_results(base_dir="."):
+    # Проверка файла log.log на наличие слова ERROR
+    log_content = read_file(os.path.join(base_dir, "log.log"))
+    if log_content and "ERROR" in log_content:
+        print("\nВ файле log.log найдены ошибки")
+        if not ask_user_confirmation("Продолжить выполнение? (да/нет): "):
+            print("Выполнение скрипта завершено по запросу пользователя.")
+            return False
+
+    # Проверка наличия error.log или err_groups.log (findings.jsonl - в режиме --validation engine)
+    error_files = ["error.log", "err_groups.log", "chech_groups.log", "final_error.log", "findings.jsonl"]
+    files_found = [file for file in error_files if os.path.exists(os.path.join(base_dir, file))]
+    if files_found:
+        print(f"Найдены следующие файлы ошибок: {', '.join(files_found)}.")
+        if not ask_user_confirmation("Продолжить выполнение? (да/нет): "):
+            print("Выполнение скрипта завершено по запросу пользователя.")
+            return False
+    return True
+
+# Старый режим: каждый скрипт запускается отдельным процессом с паузами
+def run_legacy():
     # Пауза перед стартом
     print(f"Начинаю работу")
     time.sleep(2)
@@ -76,25 +97,72 @@ if __name__ == "__main__":
         print("Проверка специальных файлов через 3 секунды...")
         time.sleep(3)
 
-        # Проверка файла log.log на наличие слова ERROR
-        log_content = read_file("log.log")
-        if log_content and "ERROR" in log_content:
-            print("\nВ файле log.log найдены ошибки")
-            if not ask_user_confirmation("Продолжить выполнение? (да/нет): "):
-                print("Выполнение скрипта завершено по запросу пользователя.")
-                break
-
-        # Проверка наличия error.log или err_groups.log
-        error_files = ["error.log", "err_groups.log", "chech_groups.log", "final_error.log"]
-        files_found = [file for file in error_files if os.path.exists(file)]
-        if files_found:
-            print(f"Найдены следующие файлы ошибок: {', '.join(files_found)}.")
-            if not ask_user_confirmation("Продолжить выполнение? (да/нет): "):
-                print("Выполнение скрипта завершено по запросу пользователя.")
-                break
+        # Проверка log.log и файлов ошибок
+        if not check_stage_results():
+            break
 
         # Закрытие всех файлов перед уведомлением пользователя
         print("Закрытие всех открытых файлов...")
         time.sleep(3)
 
-    print("Выполнение скрипта завершено.")
\ No newline at end of file
+    print("Выполнение скрипта завершено.")
+
+# Политика, по которой задается вопрос в режиме --interactive без --stop-on:
+# любая ошибка этапа (прежняя проверка слова ERROR в log.log и файлов ошибок)
+INTERACTIVE_POLICY = "errors>0"
+
+# Решение при срабатывании политики в режиме --interactive
+def confirm_violation(name, violations):
+    print(f"\nЭтап {name}: {', '.join(violations)}")
+    if ask_user_confirmation("Продолжить выполнение? (да/нет): "):
+        return True
+    print("Выполнение скрипта завершено по запросу пользователя.")
+    return False
+
+# Основной режим: все этапы в одном процессе без искусственных пауз.
+# После каждого этапа его счетчики событий сверяются с политикой --stop-on;
+# вопрос пользователю задается только с ключом --interactive
+def run_in_process(options=None, cache=None, interactive=False, classes=None, executor=None):
+    import events
+    import pipeline
+
+    options = dict(options or {})
+    if interactive and not options.get('stop_on'):
+        options['stop_on'] = events.parse_policy(INTERACTIVE_POLICY)
+    print("Начинаю работу")
+    try:
+        results = pipeline.run_pipeline(on_violation=confirm_violation if interactive else None,
+                                        cache=cache, classes=classes, executor=executor, **options)
+    finally:
+        if executor is not None:
+            executor.close()
+    pipeline.print_timings(results)
+    if cache is not None:
+        cache.report()
+    if classes is not None:
+        classes.report()
+    print("Выполнение скрипта завершено.")
+
+# Параметры встроенного конвейера (см. pipeline.add_arguments)
+def pipeline_arguments(parser):
+    import pipeline
+    pipeline.add_arguments(parser)
+
+# Основной код
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обработка расписания АВЕРС для ГИС СО ЕЦП")
+    parser.add_argument("--legacy", action="store_true",
+                        help="запускать каждый скрипт отдельным процессом с паузами (прежний режим)")
+    parser.add_argument("--interactive", action="store_true",
+                        help="при срабатывании политики --stop-on (по умолчанию - при любой ошибке этапа) "
+                             "спрашивать, продолжать ли выполнение")
+    pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    if args.legacy:
+        run_legacy()
+    else:
+        import pipeline
+        run_in_process(pipeline.pipeline_options(args), cache=pipeline.make_cache(args),
+                       interactive=args.interactive, classes=pipeline.make_class_cache(args),
+                       executor=pipeline.make_class_pool(args))
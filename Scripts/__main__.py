@@ -0,0 +1,6 @@
+import sys
+
+import cli
+
+# Запуск каталога Scripts как программы: python Scripts <команда> ... (см. cli.py)
+sys.exit(cli.main())
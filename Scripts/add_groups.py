@@ -1,41 +1,34 @@
-import json
 import csv
 import logging
 import os
 import time
+import checkpoint
 
 # Настройка основного логгера
 logger = logging.getLogger('main_logger')
 logger.setLevel(logging.DEBUG)
 
-# Обработчик для log.log (все уровни логирования)
-log_handler = logging.FileHandler('log.log', mode='w', encoding='cp1251')  # Кодировка windows-1251
-log_handler.setLevel(logging.DEBUG)
-log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(log_handler)
+# Обработчики файлов подключаются только при запуске скрипта напрямую,
+# при импорте из конвейера записи уходят в корневой логгер
+def setup_logging():
+    # Обработчик для log.log (все уровни логирования)
+    log_handler = logging.FileHandler('log.log', mode='w', encoding='cp1251')  # Кодировка windows-1251
+    log_handler.setLevel(logging.DEBUG)
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(log_handler)
 
-# Обработчик для err_groups.log (только ERROR и выше)
-error_handler = logging.FileHandler('err_groups.log', mode='w', encoding='cp1251', delay=True)  # Отложенное создание + кодировка windows-1251
-error_handler.setLevel(logging.ERROR)
-error_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(error_handler)
+    # Обработчик для err_groups.log (только ERROR и выше)
+    error_handler = logging.FileHandler('err_groups.log', mode='w', encoding='cp1251', delay=True)  # Отложенное создание + кодировка windows-1251
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(error_handler)
 
 # Функция для загрузки данных из groups.csv
 def load_groups_csv(file_path):
     """Загружает данные из groups.csv."""
-    groups_data = {}
     try:
         with open(file_path, 'r', encoding='cp1251') as file:
-            reader = csv.reader(file, delimiter=';')
-            next(reader)  # Пропускаем заголовки
-            for row in reader:
-                class_name, subject, teacher, group = row
-                class_name = class_name.lower()  # Только класс переводим в нижний регистр
-                key = (class_name, subject.strip(), teacher.strip())
-                if key not in groups_data:
-                    groups_data[key] = []
-                groups_data[key].append(group.strip())  # Удаляем лишние пробелы
-                logger.debug(f"Добавлена группа: {group} для ключа {key}")
+            groups_data = groups_from_rows(csv.reader(file, delimiter=';'))
         logger.info("Файл groups.csv успешно загружен")
         return groups_data
     except FileNotFoundError:
@@ -45,12 +38,27 @@ def load_groups_csv(file_path):
         logger.error("Ошибка декодирования файла groups.csv. Проверьте кодировку файла.")
         raise SystemExit("Ошибка декодирования файла groups.csv. Проверьте кодировку файла.")
 
+# Функция для разбора строк справочника групп (из CSV или напрямую из groups.xlsx)
+def groups_from_rows(rows):
+    """Формирует словарь (класс, предмет, учитель) -> [группы]; первая строка - заголовки."""
+    groups_data = {}
+    rows = iter(rows)
+    next(rows)  # Пропускаем заголовки
+    for row in rows:
+        class_name, subject, teacher, group = row
+        class_name = class_name.lower()  # Только класс переводим в нижний регистр
+        key = (class_name, subject.strip(), teacher.strip())
+        if key not in groups_data:
+            groups_data[key] = []
+        groups_data[key].append(group.strip())  # Удаляем лишние пробелы
+        logger.debug(f"Добавлена группа: {group} для ключа {key}")
+    return groups_data
+
 # Функция для загрузки данных из raspisanie_sinh_time.json
 def load_raspisanie(file_path):
     """Загружает данные из raspisanie_sinh_time.json."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        data = checkpoint.load(file_path)
         return data
     except FileNotFoundError:
         logger.error("Файл raspisanie_sinh_time.json не найден")
@@ -135,7 +143,8 @@ def add_groups(data, groups_data):
     return data
 
 if __name__ == "__main__":
-    time.sleep(2)    
+    setup_logging()
+    time.sleep(2)
     script_dir = os.path.dirname(os.path.abspath(__file__))
     groups_file_path = os.path.join(script_dir, 'groups.csv')
     input_file_path = os.path.join(script_dir, 'raspisanie_sinh_time.json')
@@ -149,8 +158,7 @@ if __name__ == "__main__":
     
     # Сохранение результатов
     output_file_path = os.path.join(script_dir, 'raspisanie_groups_added.json')
-    with open(output_file_path, 'w', encoding='utf-8') as file:
-        json.dump(updated_data, file, ensure_ascii=False, indent=4)
+    checkpoint.dump(updated_data, output_file_path)
     
     logger.info(f"Файл успешно обработан и сохранен как {output_file_path}")
     time.sleep(2)
\ No newline at end of file
@@ -1,8 +1,8 @@
-import json
 import logging
 from collections import OrderedDict
 import os
 import time
+import checkpoint
 
 # Настройка логирования
 logging.basicConfig(
@@ -14,8 +14,7 @@ logging.basicConfig(
 def load_raspisanie(file_path):
     """Загружает данные из raspisanie.json."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file, object_pairs_hook=OrderedDict)
+        data = checkpoint.load(file_path, object_pairs_hook=OrderedDict)
         return data
     except FileNotFoundError:
         logging.error("Файл raspisanie.json не найден")
@@ -74,7 +73,6 @@ if __name__ == "__main__":
     
     # Сохранение результатов
     output_file_path = os.path.join(script_dir, 'raspisanie_key_added.json')
-    with open(output_file_path, 'w', encoding='utf-8') as file:
-        json.dump(updated_data, file, ensure_ascii=False, indent=4)
+    checkpoint.dump(updated_data, output_file_path)
     logging.info(f"Файл успешно обработан и сохранен как {output_file_path}")
     time.sleep(2)
\ No newline at end of file
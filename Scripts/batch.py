@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Пакетная обработка расписаний нескольких школ.
+# Корневой каталог содержит общие справочники ГИС СО ЕЦП (klass.xlsx, lesson.xlsx)
+# и подкаталоги школ со своими raspisanie.xlsx, groups.xlsx, zamena.xlsx.
+# Каждая школа обрабатывается встроенным конвейером (pipeline.py) в отдельном процессе.
+
+# Файлы ошибок, которые создают этапы проверки
+ERROR_FILES = ["error.log", "err_groups.log", "chech_groups.log", "final_error.log", "findings.jsonl"]
+
+# Этапы, которые пропускаются, если в каталогах школ уже лежат CSV
+EXCEL_STAGES = ["delete", "exel_to_csv"]
+
+# Справочники, загруженные в основном процессе и переданные рабочим процессам
+_catalogs = None
+
+
+def load_shared_catalogs(root_dir, source='csv'):
+    """
+    Загружает общие справочники klass и lesson один раз на весь пакет (как ReferenceCatalog).
+    Если в корне нет CSV, они получаются из klass.xlsx и lesson.xlsx
+    (в режиме source='xlsx' - напрямую, без pandas).
+    """
+    from reference_catalog import ReferenceCatalog, load_klass, load_lesson
+
+    if source == 'xlsx' and not all(os.path.exists(os.path.join(root_dir, f"{name}.csv")) for name in ("klass", "lesson")):
+        import xlsx_reader
+        sources = xlsx_reader.load_inputs(root_dir, xlsx_reader.CATALOG_WORKBOOKS)
+        if sources is not None:
+            return {'klass': ReferenceCatalog(sources['klass']), 'lesson': ReferenceCatalog(sources['lesson'])}
+
+    for name in ("klass", "lesson"):
+        csv_path = os.path.join(root_dir, f"{name}.csv")
+        xlsx_path = os.path.join(root_dir, f"{name}.xlsx")
+        if not os.path.exists(csv_path) and os.path.exists(xlsx_path):
+            import exel_to_csv
+            exel_to_csv.convert_excel_to_csv(xlsx_path)
+    return {
+        'klass': ReferenceCatalog(load_klass(os.path.join(root_dir, "klass.csv"))),
+        'lesson': ReferenceCatalog(load_lesson(os.path.join(root_dir, "lesson.csv"))),
+    }
+
+
+def find_schools(root_dir):
+    """Возвращает подкаталоги корня, в которых есть raspisanie.xlsx или raspisanie.csv."""
+    schools = []
+    for name in sorted(os.listdir(root_dir)):
+        school_dir = os.path.join(root_dir, name)
+        if not os.path.isdir(school_dir):
+            continue
+        if any(os.path.exists(os.path.join(school_dir, f"raspisanie.{ext}")) for ext in ("xlsx", "csv")):
+            schools.append(school_dir)
+    return schools
+
+
+def count_lines(file_path):
+    if not os.path.exists(file_path):
+        return 0
+    with open(file_path, 'rb') as file:
+        return sum(1 for line in file if line.strip())
+
+
+def init_worker(catalogs):
+    """Инициализация рабочего процесса: справочники передаются один раз, а не с каждой задачей."""
+    global _catalogs
+    _catalogs = catalogs
+
+
+def make_school_cache(school_dir, options):
+    """Кэш этапов школы: общий каталог из параметров или .stage_cache в каталоге школы."""
+    if not options.get('cache_dir'):
+        return None
+    import stage_cache
+    cache_dir = options['cache_dir']
+    if not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(school_dir, cache_dir)
+    return stage_cache.StageCache(cache_dir, options.get('cache_size_mb', stage_cache.DEFAULT_MAX_MB) * 1024 * 1024)
+
+
+def make_school_class_cache(school_dir, options):
+    """Кэш классов школы: файл с указанным именем в каталоге школы (у каждой школы свои классы)."""
+    if not options.get('class_cache'):
+        return None
+    import class_cache
+    return class_cache.ClassCache(os.path.join(school_dir, os.path.basename(options['class_cache'])))
+
+
+def run_school(school_dir, options):
+    """Обрабатывает одну школу и возвращает ее итоговую запись для сводки."""
+    import pipeline
+
+    start = time.perf_counter()
+    summary = {"school": os.path.basename(school_dir), "path": school_dir}
+    try:
+        stages = None
+        if options.get('from_csv'):
+            stages = [name for name, _ in pipeline.STAGES if name not in EXCEL_STAGES]
+        classes = make_school_class_cache(school_dir, options)
+        results = pipeline.run_pipeline(base_dir=school_dir, stages=stages,
+                                        in_memory=options.get('in_memory', False),
+                                        checkpoints=options.get('checkpoints', ()),
+                                        checkpoint_format=options.get('checkpoint_format', 'json'),
+                                        model=options.get('model', 'dict'),
+                                        source=options.get('source', 'csv'),
+                                        export_csv=options.get('export_csv', False),
+                                        validation=options.get('validation', 'legacy'),
+                                        stop_on=options.get('stop_on', ()),
+                                        exports=options.get('exports', ()),
+                                        workspace=options.get('workspace'),
+                                        workspace_outputs=options.get('workspace_outputs', 'final'),
+                                        store=options.get('store'), store_week=options.get('store_week'),
+                                        catalogs=_catalogs, cache=make_school_cache(school_dir, options),
+                                        classes=classes)
+        failed = [item["stage"] for item in results if not item["ok"]]
+        stopped = [item for item in results if item["violations"]]
+        summary["status"] = "ошибка" if failed else "стоп" if stopped else "ok"
+        summary["failed_stage"] = failed[0] if failed else stopped[0]["stage"] if stopped else None
+        summary["violations"] = stopped[0]["violations"] if stopped else []
+        summary["stages"] = {item["stage"]: round(item["seconds"], 4) for item in results}
+        summary["cache_hits"] = sum(1 for item in results if item.get("cache") == 'hit')
+        if classes is not None and classes.changes is not None:
+            summary["changed_classes"] = len(classes.changes["added"]) + len(classes.changes["changed"])
+    except Exception as e:
+        summary["status"] = "ошибка"
+        summary["failed_stage"] = None
+        summary["exception"] = str(e)
+        summary["stages"] = {}
+    summary["errors"] = {name: count_lines(os.path.join(school_dir, name)) for name in ERROR_FILES}
+    summary["seconds"] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def run_batch(root_dir, workers=None, options=None):
+    """
+    Обрабатывает все школы корневого каталога в пуле процессов.
+    :param root_dir: Каталог с общими справочниками и подкаталогами школ.
+    :param workers: Число рабочих процессов (по умолчанию - число ядер).
+    :param options: Параметры конвейера: in_memory, checkpoints, checkpoint_format, model, source, export_csv,
+                    validation, stop_on, from_csv,
+                    cache_dir (относительный путь - внутри каталога каждой школы), cache_size_mb,
+                    class_cache (имя файла кэша классов в каталоге каждой школы).
+    :return: Список итоговых записей по школам в порядке каталогов.
+    """
+    options = options or {}
+    root_dir = os.path.abspath(root_dir)
+    schools = find_schools(root_dir)
+    if not schools:
+        print(f"В каталоге {root_dir} не найдено ни одной школы.")
+        return []
+
+    catalogs = load_shared_catalogs(root_dir, options.get('source', 'csv'))
+    print(f"Справочники загружены: кабинетов {len(catalogs['klass'])}, предметов {len(catalogs['lesson'])}.")
+    print(f"Школ к обработке: {len(schools)}.")
+
+    summaries = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(catalogs,)) as executor:
+        futures = {executor.submit(run_school, school_dir, options): school_dir for school_dir in schools}
+        for future in as_completed(futures):
+            school_dir = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {"school": os.path.basename(school_dir), "path": school_dir, "status": "ошибка",
+                           "exception": str(e), "errors": {}, "stages": {}, "seconds": 0.0}
+            summaries[school_dir] = summary
+            print(f"Школа {summary['school']}: {summary['status']} за {summary['seconds']:.3f} с.")
+    return [summaries[school_dir] for school_dir in schools]
+
+
+def print_summary(summaries):
+    """Выводит итоговую сводку по всем школам."""
+    print("Сводка пакетной обработки:")
+    print(f"  {'Школа':<24} {'Статус':<8} " + " ".join(f"{name:>16}" for name in ERROR_FILES) + f" {'Время, с':>9}")
+    for summary in summaries:
+        counts = " ".join(f"{summary['errors'].get(name, 0):>16}" for name in ERROR_FILES)
+        print(f"  {summary['school']:<24} {summary['status']:<8} {counts} {summary['seconds']:>9.3f}")
+    failed = sum(1 for summary in summaries if summary["status"] == "ошибка")
+    stopped = sum(1 for summary in summaries if summary["status"] == "стоп")
+    print(f"  Всего школ: {len(summaries)}, с ошибками выполнения: {failed}, остановлено политикой: {stopped}")
+
+
+if __name__ == "__main__":
+    import pipeline
+
+    parser = argparse.ArgumentParser(description="Пакетная обработка расписаний нескольких школ")
+    parser.add_argument("root", help="каталог с klass.xlsx, lesson.xlsx и подкаталогами школ")
+    parser.add_argument("--workers", type=int, default=None, help="число рабочих процессов (по умолчанию - число ядер)")
+    parser.add_argument("--from-csv", action="store_true",
+                        help="не конвертировать Excel: в каталогах школ уже лежат CSV")
+    pipeline.add_arguments(parser)
+    args = parser.parse_args()
+    if args.class_workers > 0:
+        # Школы уже обрабатываются в пуле процессов; пул классов внутри каждого из них не создается
+        parser.error("--class-workers не поддерживается пакетной обработкой: используйте --workers")
+
+    batch_start = time.perf_counter()
+    summaries = run_batch(args.root, workers=args.workers, options={
+        **pipeline.pipeline_options(args),
+        'from_csv': args.from_csv,
+        'cache_dir': args.cache_dir,
+        'cache_size_mb': args.cache_size_mb,
+        'class_cache': args.class_cache,
+    })
+    print_summary(summaries)
+    print(f"Общее время: {time.perf_counter() - batch_start:.3f} с.")
+
+    summary_path = os.path.join(args.root, "batch_summary.json")
+    with open(summary_path, 'w', encoding='utf-8') as file:
+        json.dump(summaries, file, ensure_ascii=False, indent=4)
+    print(f"Сводка сохранена в {summary_path}")
@@ -0,0 +1,316 @@
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Замер производительности этапов на синтетических данных (synthetic.py).
+# Для каждого масштаба (1x, 10x, 100x типичной школы) создается набор файлов,
+# и функции этапов выполняются по цепочке, как в конвейере. Для каждой функции
+# записывается время (лучшее из нескольких повторов) и пиковая память по tracemalloc
+# (отдельным прогоном, чтобы трассировка не искажала время).
+# Для каждого формата промежуточных файлов (checkpoint.py) записываются размер файла,
+# время записи и чтения, а для двоичного формата - время чтения одного класса через mmap.
+# Отдельно замеряется холодный запуск команды validate (cli.py) в новом процессе: время
+# сравнивается с cli.VALIDATE_BUDGET, а по -X importtime проверяется, что pandas, numpy
+# и openpyxl не загружаются.
+# Результаты дописываются в benchmark_results.jsonl и сравниваются с предыдущим запуском.
+
+RESULTS_FILE = "benchmark_results.jsonl"
+DEFAULT_SCALES = [1, 10, 100]
+
+
+def load_json(file_path):
+    import checkpoint
+    return checkpoint.load(file_path)
+
+
+def dump_json(data, file_path):
+    import checkpoint
+    checkpoint.dump(data, file_path)
+
+
+def make_benchmarks(work_dir):
+    """
+    Этапы в порядке конвейера: (имя, подготовка, функция).
+    Подготовка (не замеряется) получает результат предыдущего этапа и возвращает аргументы функции,
+    функция возвращает данные для следующего этапа.
+    """
+    import add_groups
+    import add_key
+    import all_null_lesson
+    import csv_to_json
+    import json_to_GIS_SO
+    import lesson_sort
+    import sinh_time
+    import update_cab
+    import update_lesson_gis
+
+    def file_path(name):
+        return os.path.join(work_dir, name)
+
+    def convert(input_file, output_file):
+        csv_to_json.convert_csv_to_json(input_file, output_file)
+        return None
+
+    def replace(input_file, output_file, replacements):
+        update_lesson_gis.update_json(input_file, output_file, replacements)
+        return None
+
+    def export(input_file, output_file):
+        json_to_GIS_SO.create_csv_schedule(input_file, output_file)
+        return None
+
+    def write_cab_updated(data):
+        dump_json(data, file_path('raspisanie_cab_updated.json'))
+        return (file_path('raspisanie_cab_updated.json'), file_path('raspisanie_replace_lessons.json'),
+                update_lesson_gis.load_replacements(file_path('zamena.csv')))
+
+    return [
+        ("convert_csv_to_json", lambda _: (file_path('raspisanie.csv'), file_path('raspisanie.json')), convert),
+        ("add_keys", lambda _: (load_json(file_path('raspisanie.json')),), add_key.add_keys),
+        ("set_sinh_time", lambda data: (data,), sinh_time.set_sinh_time),
+        ("add_groups", lambda data: (data, add_groups.load_groups_csv(file_path('groups.csv'))),
+         add_groups.add_groups),
+        ("add_missing_keys", lambda data: (data,), all_null_lesson.add_missing_keys),
+        ("sort_lessons", lambda data: (data,), lesson_sort.sort_lessons),
+        ("update_dot_one_fields", lambda data: (data,), update_cab.update_dot_one_fields),
+        ("update_json", write_cab_updated, replace),
+        ("create_csv_schedule",
+         lambda _: (file_path('raspisanie_replace_lessons.json'), file_path('GIS_schedule.csv')), export),
+    ]
+
+
+def measure(func, args, repeat):
+    """
+    Время (лучшее из repeat прогонов) и пиковая память функции.
+    Аргументы копируются перед каждым прогоном: функции этапов изменяют расписание на месте.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        call_args = copy.deepcopy(args)
+        start = time.perf_counter()
+        result = func(*call_args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    call_args = copy.deepcopy(args)
+    tracemalloc.start()
+    try:
+        func(*call_args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def best_time(func, repeat):
+    """Лучшее время из repeat вызовов func() и результат последнего вызова."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure_checkpoints(data, work_dir, repeat):
+    """
+    Размер и время записи/чтения расписания в каждом формате промежуточных файлов.
+    :return: Список {"format", "bytes", "store_seconds", "load_seconds", "class_seconds"};
+             class_seconds - чтение одного (последнего) класса без разбора остальных.
+    """
+    import checkpoint
+
+    rows = []
+    last_class = next(reversed(data), None)
+    for fmt in checkpoint.FORMATS:
+        file_path = os.path.join(work_dir, f"checkpoint_{fmt}.bin")
+        store_seconds, _ = best_time(lambda: checkpoint.dump(data, file_path, fmt), repeat)
+        load_seconds, loaded = best_time(lambda: checkpoint.load(file_path), repeat)
+        if loaded != data:
+            raise AssertionError(f"Формат {fmt}: прочитанное расписание не совпадает с записанным")
+
+        def read_class():
+            schedule = checkpoint.open_schedule(file_path)
+            days = schedule[last_class]
+            if isinstance(schedule, checkpoint.LazySchedule):
+                schedule.close()
+            return days
+
+        class_seconds, _ = best_time(read_class, repeat)
+        rows.append({"format": fmt, "bytes": os.path.getsize(file_path), "store_seconds": round(store_seconds, 6),
+                     "load_seconds": round(load_seconds, 6), "class_seconds": round(class_seconds, 6)})
+        os.remove(file_path)
+    return rows
+
+
+def measure_cold_start(generator_options, repeat):
+    """
+    Холодный запуск python <Scripts> validate на школе типичного размера (масштаб 1x).
+    :return: {"command", "seconds", "budget", "heavy_modules"}; heavy_modules - загруженные
+             командой модули из cli.HEAVY_MODULES.
+    """
+    import cli
+    import synthetic
+
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    work_dir = tempfile.mkdtemp(prefix="bench_cold_")
+    try:
+        synthetic.generate(work_dir, **generator_options)
+        subprocess.run([sys.executable, scripts_dir, "convert", work_dir, "--from-csv"], check=True,
+                       stdout=subprocess.DEVNULL)
+        command = [scripts_dir, "validate", work_dir]
+        seconds, _ = best_time(lambda: subprocess.run([sys.executable] + command, check=True,
+                                                      stdout=subprocess.DEVNULL), repeat)
+        profile = subprocess.run([sys.executable, "-X", "importtime"] + command, check=True,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        # Строки вида "import time: <собственное> | <общее> | <модуль>"
+        loaded = {line.rsplit('|', 1)[-1].strip() for line in profile.stderr.splitlines() if '|' in line}
+        return {"command": "validate", "seconds": round(seconds, 4), "budget": cli.VALIDATE_BUDGET,
+                "heavy_modules": [name for name in cli.HEAVY_MODULES if name in loaded]}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_scale(scale, generator_options, repeat, keep_dir=None):
+    """
+    Замеряет все этапы на наборе размером scale x типичная школа.
+    :return: (строки по этапам, строки по форматам промежуточных файлов).
+    """
+    import pipeline
+    import synthetic
+
+    work_dir = keep_dir or tempfile.mkdtemp(prefix=f"bench_{scale}x_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        options = dict(generator_options)
+        options['classes'] = options['classes'] * scale
+        stats = synthetic.generate(work_dir, **options)
+        # Записи этапов идут в log.log рабочего каталога, как при обычном запуске
+        handler = pipeline.configure_logging(work_dir)
+        rows = []
+        checkpoints = []
+        data = None
+        try:
+            for name, prepare, func in make_benchmarks(work_dir):
+                args = prepare(data)
+                data, seconds, peak = measure(func, args, repeat)
+                rows.append({"scale": scale, "classes": stats['classes'], "lessons": stats['lessons'],
+                             "stage": name, "seconds": round(seconds, 6), "peak_kb": round(peak / 1024, 1)})
+                print(f"  {scale:>4}x {name:<24} {seconds:9.3f} с {peak / 1024 / 1024:9.1f} МБ")
+                if name == "update_dot_one_fields":
+                    # Промежуточные файлы замеряются на расписании после всех преобразований
+                    for row in measure_checkpoints(data, work_dir, repeat):
+                        checkpoints.append({"scale": scale, **row})
+                        print(f"  {scale:>4}x checkpoint {row['format']:<13} {row['bytes'] / 1024:9.1f} КБ  "
+                              f"запись {row['store_seconds']:7.3f} с  чтение {row['load_seconds']:7.3f} с  "
+                              f"один класс {row['class_seconds']:7.4f} с")
+        finally:
+            handler.close()
+        return rows, checkpoints
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def load_previous(results_path, label=None):
+    """Последний сохраненный запуск (или запуск с меткой label) из файла результатов."""
+    if not os.path.exists(results_path):
+        return None
+    previous = None
+    with open(results_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            if label is None or run.get("label") == label:
+                previous = run
+    return previous
+
+
+def print_comparison(run, previous):
+    """Выводит отношение времени и памяти к предыдущему запуску."""
+    before = {(row["scale"], row["stage"]): row for row in previous["results"]}
+    print(f"Сравнение с запуском {previous.get('label') or previous['started']}:")
+    for row in run["results"]:
+        old = before.get((row["scale"], row["stage"]))
+        if old is None or not old["seconds"]:
+            continue
+        memory = row["peak_kb"] / old["peak_kb"] if old["peak_kb"] else 0
+        print(f"  {row['scale']:>4}x {row['stage']:<24} время x{row['seconds'] / old['seconds']:6.2f}  "
+              f"память x{memory:6.2f}")
+
+
+def run_benchmark(scales=DEFAULT_SCALES, generator_options=None, repeat=3, results_path=RESULTS_FILE,
+                  label=None, compare_with=None, keep_dir=None):
+    """
+    Выполняет замеры для всех масштабов и дописывает запуск в файл результатов.
+    :return: Запись запуска {"label", "started", "python", "generator", "repeat", "results", "checkpoints",
+             "cold_start"}.
+    """
+    import synthetic
+
+    generator_options = {**synthetic.DEFAULTS, **(generator_options or {})}
+    previous = load_previous(results_path, compare_with)
+    run = {
+        "label": label,
+        "started": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "generator": generator_options,
+        "repeat": repeat,
+        "results": [],
+        "checkpoints": [],
+    }
+    for scale in scales:
+        scale_dir = os.path.join(keep_dir, f"{scale}x") if keep_dir else None
+        rows, checkpoints = run_scale(scale, generator_options, repeat, scale_dir)
+        run["results"].extend(rows)
+        run["checkpoints"].extend(checkpoints)
+    run["cold_start"] = cold_start = measure_cold_start(generator_options, repeat)
+    print(f"  Холодный запуск validate: {cold_start['seconds']:.3f} с (бюджет {cold_start['budget']:.3f} с)")
+    if cold_start['seconds'] > cold_start['budget']:
+        print("  ВНИМАНИЕ: превышен бюджет холодного запуска validate")
+    if cold_start['heavy_modules']:
+        print(f"  ВНИМАНИЕ: validate загружает {', '.join(cold_start['heavy_modules'])}")
+
+    with open(results_path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(run, ensure_ascii=False) + '\n')
+    print(f"Результаты дописаны в {results_path}")
+    if previous is not None:
+        print_comparison(run, previous)
+    return run
+
+
+if __name__ == "__main__":
+    import synthetic
+
+    parser = argparse.ArgumentParser(description="Замер времени и памяти этапов на синтетических данных")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="масштабы через запятую относительно одной школы (по умолчанию 1,10,100)")
+    parser.add_argument("--repeat", type=int, default=3, help="число прогонов для замера времени")
+    parser.add_argument("--results", default=RESULTS_FILE, help="файл результатов (JSONL)")
+    parser.add_argument("--label", default=None, help="метка запуска, например имя ветки")
+    parser.add_argument("--compare", default=None, metavar="МЕТКА",
+                        help="сравнить с последним запуском с этой меткой (по умолчанию - с последним)")
+    parser.add_argument("--keep", default=None, metavar="КАТАЛОГ",
+                        help="сохранить сгенерированные файлы в каталоге (по умолчанию удаляются)")
+    synthetic.add_arguments(parser)
+    args = parser.parse_args()
+
+    run_benchmark(scales=[int(scale) for scale in args.scales.split(',')],
+                  generator_options={'classes': args.classes, 'slots': args.slots,
+                                     'subgroup_ratio': args.subgroup_ratio, 'catalog_size': args.catalog_size,
+                                     'seed': args.seed},
+                  repeat=args.repeat, results_path=args.results, label=args.label,
+                  compare_with=args.compare, keep_dir=args.keep)
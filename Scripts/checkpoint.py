@@ -0,0 +1,156 @@
+import json
+import marshal
+import mmap
+import struct
+import sys
+from collections.abc import Mapping
+
+# Форматы промежуточных файлов расписания (raspisanie*.json).
+# json    - прежний формат: JSON с отступами (indent=4), совместим с внешними инструментами;
+# compact - JSON без отступов и пробелов;
+# binary  - двоичный формат: каждый класс записан отдельным блоком marshal, строки интернированы
+#           (одинаковые названия уроков, учителей и времени хранятся в блоке один раз), в конце
+#           файла - оглавление классов. Файл можно открыть через mmap и разбирать классы по мере
+#           обращения к ним (open_schedule).
+# Формат при чтении определяется по сигнатуре, поэтому имена файлов не меняются,
+# а любой этап читает файл, записанный в любом формате.
+
+FORMATS = ["json", "compact", "binary"]
+DEFAULT_FORMAT = "json"
+MAGIC = b"RSPBIN1\0"
+MARSHAL_VERSION = 4  # Версия с повторным использованием одинаковых объектов (ссылки на строки)
+_TRAILER = struct.Struct("<Q")  # Смещение оглавления от начала файла
+
+
+class CheckpointError(ValueError):
+    """Файл не является расписанием в поддерживаемом формате."""
+
+
+def intern_strings(value):
+    """Копия расписания, в которой все строки интернированы (для компактной записи marshal)."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, Mapping):
+        return {sys.intern(key) if isinstance(key, str) else key: intern_strings(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [intern_strings(item) for item in value]
+    return value
+
+
+def dump(data, file_path, fmt=DEFAULT_FORMAT):
+    """Записывает расписание в файл в формате fmt."""
+    if fmt == "json":
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=4)
+    elif fmt == "compact":
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+    elif fmt == "binary":
+        dump_binary(data, file_path)
+    else:
+        raise ValueError(f"Неизвестный формат промежуточных файлов: {fmt}")
+
+
+def dump_binary(data, file_path):
+    index = []
+    with open(file_path, 'wb') as file:
+        file.write(MAGIC)
+        offset = len(MAGIC)
+        for class_name, days in data.items():
+            block = marshal.dumps(intern_strings(days), MARSHAL_VERSION)
+            file.write(block)
+            index.append((class_name, offset, len(block)))
+            offset += len(block)
+        file.write(marshal.dumps(index, MARSHAL_VERSION))
+        file.write(_TRAILER.pack(offset))
+
+
+def read_index(buffer):
+    """Оглавление двоичного файла: [(класс, смещение, длина), ...]."""
+    if len(buffer) < len(MAGIC) + _TRAILER.size or buffer[:len(MAGIC)] != MAGIC:
+        raise CheckpointError("Нет сигнатуры двоичного формата расписания")
+    (index_offset,) = _TRAILER.unpack(buffer[-_TRAILER.size:])
+    try:
+        return marshal.loads(buffer[index_offset:len(buffer) - _TRAILER.size])
+    except (ValueError, EOFError, TypeError) as e:
+        raise CheckpointError(f"Поврежденное оглавление двоичного файла: {e}")
+
+
+def is_binary(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def load(file_path, object_pairs_hook=None):
+    """
+    Читает расписание в любом из форматов FORMATS.
+    :param object_pairs_hook: Передается json.load (для двоичного формата не используется).
+    :raises FileNotFoundError: Файла нет.
+    :raises ValueError: Файл поврежден (json.JSONDecodeError или CheckpointError).
+    """
+    if is_binary(file_path):
+        with open(file_path, 'rb') as file:
+            buffer = file.read()
+        try:
+            return {class_name: marshal.loads(buffer[offset:offset + length])
+                    for class_name, offset, length in read_index(buffer)}
+        except (ValueError, EOFError, TypeError) as e:
+            raise CheckpointError(f"Поврежденный блок класса в файле {file_path}: {e}")
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return json.load(file, object_pairs_hook=object_pairs_hook)
+
+
+class LazySchedule(Mapping):
+    """
+    Расписание из двоичного файла, отображенного в память: класс разбирается при первом
+    обращении к нему. Только для чтения; закрывается через close() или with.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._index = {class_name: (offset, length) for class_name, offset, length in read_index(self._map)}
+        except CheckpointError:
+            self._map.close()
+            raise
+        self._classes = {}
+
+    def __getitem__(self, class_name):
+        days = self._classes.get(class_name)
+        if days is None:
+            offset, length = self._index[class_name]
+            days = self._classes[class_name] = marshal.loads(self._map[offset:offset + length])
+        return days
+
+    def stream(self):
+        """Пары (класс, дни) по порядку без запоминания разобранных классов (память - на один класс)."""
+        for class_name, (offset, length) in self._index.items():
+            days = self._classes.get(class_name)
+            yield class_name, days if days is not None else marshal.loads(self._map[offset:offset + length])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_schedule(file_path):
+    """
+    Открывает расписание для чтения отдельных классов: двоичный файл - без разбора
+    (LazySchedule), JSON - обычной загрузкой.
+    """
+    if is_binary(file_path):
+        return LazySchedule(file_path)
+    return load(file_path)
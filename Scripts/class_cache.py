@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+# Покомпонентный (по классам) кэш этапов, изменяющих расписание.
+# После разбора расписания у каждого класса вычисляется отпечаток его данных. Ключ класса
+# на этапе - хэш имени этапа, кода его модулей, зависимостей (например, групп этого класса)
+# и ключа класса на предыдущем этапе. Если ключ найден в файле кэша прошлого запуска,
+# результат этапа для класса берется оттуда, а функция этапа выполняется только для
+# остальных классов. Предупреждения и ошибки, записанные этапом для класса, сохраняются
+# и повторяются, поэтому err_groups.log и счетчики событий не зависят от попаданий в кэш.
+# Кроме того, по отпечаткам итогового расписания определяются классы, изменившиеся
+# с прошлого запуска: для них пишется отдельный файл ГИС (GIS_schedule_delta.csv)
+# и сводка class_changes.json.
+
+CACHE_FORMAT = "1"  # Меняется при несовместимом изменении формата файла
+DELTA_FILE = "GIS_schedule_delta.csv"
+CHANGES_FILE = "class_changes.json"
+
+
+def fingerprint(value):
+    """Отпечаток данных класса (порядок ключей учитывается: от него зависит результат этапов)."""
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def digest(*parts):
+    """Хэш строк parts (для ключей этапов)."""
+    result = hashlib.sha256()
+    for part in parts:
+        result.update(str(part).encode('utf-8'))
+        result.update(b'\0')
+    return result.hexdigest()
+
+
+class RecordCollector(logging.Handler):
+    """Собирает записи (по умолчанию предупреждения и ошибки) с именем логгера, чтобы повторить их через тот же логгер."""
+
+    def __init__(self, level=logging.WARNING):
+        super().__init__(level=level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.name, record.levelno, record.getMessage()))
+
+
+def replay(records):
+    """Повторяет сохраненные записи через исходные логгеры (с их обработчиками, например err_groups.log)."""
+    for name, level, message in records:
+        logger = logging.getLogger() if name == 'root' else logging.getLogger(name)
+        logger.log(level, message)
+
+
+class ClassCache:
+    """Результаты этапов по классам; файл хранит записи только последнего запуска."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.entries = {}  # Ключ -> {"data": pickle данных класса, "records": [...]} прошлого запуска
+        self.exported = {}  # Класс -> отпечаток итогового расписания прошлого запуска
+        self.used = {}  # Записи этого запуска
+        self.keys = {}  # Класс -> ключ класса после последнего выполненного этапа
+        self.stats = {}  # этап -> {"hit": n, "miss": n} этого запуска
+        self.changes = None
+        try:
+            with open(file_path, 'rb') as file:
+                stored = pickle.load(file)
+            if stored.get("format") == CACHE_FORMAT:
+                self.entries = stored["entries"]
+                self.exported = stored["exported"]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+            pass  # Первый запуск или поврежденный файл: все классы вычисляются заново
+
+    def begin(self):
+        """
+        Начало запуска: цепочки ключей классов строятся заново от отпечатков данных, а записи
+        прошлого запуска в этом же процессе (режим наблюдения) добавляются к кэшу; в файл
+        записываются только записи нового запуска.
+        """
+        self.entries.update(self.used)
+        self.used = {}
+        self.keys = {}
+        self.stats = {}
+        self.changes = None
+
+    def apply(self, stage_name, modules, func, data, deps=None):
+        """
+        Выполняет функцию этапа только для классов, которых нет в кэше.
+        :param modules: Модули с кодом этапа (входят в ключ).
+        :param func: Функция этапа: расписание -> расписание.
+        :param deps: Функция (класс) -> строка с данными, от которых зависит результат этапа для класса.
+        :return: Расписание после этапа (классы в исходном порядке).
+        """
+        import stage_cache
+
+        code = stage_cache.code_version(modules)
+        stats = self.stats.setdefault(stage_name, {"hit": 0, "miss": 0})
+        result = {}
+        for class_name, days in data.items():
+            # Имя класса входит в ключ: оно встречается в сообщениях и в поиске групп
+            previous = self.keys.get(class_name) or digest(class_name, fingerprint(days))
+            key = digest(CACHE_FORMAT, stage_name, code, deps(class_name) if deps else "", previous)
+            self.keys[class_name] = key
+            entry = self.used.get(key) or self.entries.get(key)
+            if entry is not None:
+                stats["hit"] += 1
+                replay(entry["records"])
+                result[class_name] = pickle.loads(entry["data"])
+            else:
+                stats["miss"] += 1
+                collector = RecordCollector()
+                logging.getLogger().addHandler(collector)
+                try:
+                    result[class_name] = func({class_name: days})[class_name]
+                finally:
+                    logging.getLogger().removeHandler(collector)
+                entry = {"data": pickle.dumps(result[class_name], protocol=pickle.HIGHEST_PROTOCOL),
+                         "records": collector.records}
+            self.used[key] = entry
+        return result
+
+    def export_delta(self, schedule, delta_path, changes_path):
+        """
+        Сравнивает итоговое расписание с прошлым запуском: пишет файл ГИС только с изменившимися
+        и новыми классами и сводку изменений по классам.
+        :return: Сводка {"added", "changed", "removed", "unchanged", "recomputed"}.
+        """
+        import json_to_GIS_SO
+
+        current = {class_name: fingerprint(days) for class_name, days in schedule.items()}
+        added = [name for name in current if name not in self.exported]
+        changed = [name for name in current if name in self.exported and current[name] != self.exported[name]]
+        removed = [name for name in self.exported if name not in current]
+        self.changes = {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unchanged": len(current) - len(added) - len(changed),
+            "recomputed": {stage_name: stats["miss"] for stage_name, stats in self.stats.items()},
+        }
+        delta = set(added) | set(changed)
+        json_to_GIS_SO.write_csv_schedule({name: days for name, days in schedule.items() if name in delta},
+                                          delta_path)
+        with open(changes_path, 'w', encoding='utf-8') as file:
+            json.dump(self.changes, file, ensure_ascii=False, indent=4)
+        logging.info(f"Изменения по классам: добавлено {len(added)}, изменено {len(changed)}, "
+                     f"удалено {len(removed)}, без изменений {self.changes['unchanged']}.")
+        self.exported = current
+        return self.changes
+
+    def save(self):
+        """Записывает записи этого запуска атомарно (через временный файл)."""
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump({"format": CACHE_FORMAT, "entries": self.used, "exported": self.exported}, file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.file_path)
+        except OSError as e:
+            logging.warning(f"Не удалось сохранить кэш классов {self.file_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def report(self):
+        """Выводит число классов, взятых из кэша и вычисленных заново, и сводку изменений."""
+        print("Кэш классов:")
+        for stage_name, stats in self.stats.items():
+            print(f"  {stage_name:<20} из кэша {stats['hit']:>4}, вычислено {stats['miss']:>4}")
+        if self.changes is not None:
+            print(f"  Изменения: добавлено {len(self.changes['added'])}, изменено {len(self.changes['changed'])}, "
+                  f"удалено {len(self.changes['removed'])}, без изменений {self.changes['unchanged']}")
@@ -0,0 +1,118 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Параллельная обработка классов одной школы.
+# Функции этапов, изменяющих расписание, обрабатывают классы независимо друг от друга,
+# поэтому расписание делится на непрерывные части по классам (примерно равные по числу уроков),
+# части обрабатываются в пуле процессов, а результаты объединяются в исходном порядке классов.
+# Записи журнала, сделанные в рабочих процессах, собираются и повторяются в основном процессе
+# по порядку частей, поэтому log.log, err_groups.log и счетчики событий те же, что при
+# последовательной обработке. Маленькие расписания (меньше threshold уроков) обрабатываются
+# в текущем процессе: запуск пула обошелся бы дороже самой обработки.
+
+DEFAULT_THRESHOLD = 5000  # Уроков в расписании, начиная с которых используется пул
+SHARDS_PER_WORKER = 2  # Частей на процесс: выравнивает загрузку, если классы разного размера
+
+
+def count_lessons(data):
+    """Число уроков в расписании (по всем классам и дням)."""
+    return sum(len(lessons) for days in data.values() for lessons in days.values())
+
+
+def split_classes(data, shards):
+    """
+    Делит расписание на не более shards непрерывных частей с примерно равным числом уроков.
+    :return: Список словарей {класс: дни} в исходном порядке классов.
+    """
+    sizes = [(class_name, sum(len(lessons) for lessons in days.values())) for class_name, days in data.items()]
+    target = max(1, sum(size for _, size in sizes) / shards)
+    parts = [{}]
+    filled = 0
+    for class_name, size in sizes:
+        if parts[-1] and filled >= target * len(parts) and len(parts) < shards:
+            parts.append({})
+        parts[-1][class_name] = data[class_name]
+        filled += size
+    return parts
+
+
+def init_worker():
+    """
+    Инициализация рабочего процесса: корневому логгеру назначается пустой обработчик до импорта
+    скриптов, чтобы их logging.basicConfig не создавал log.log в текущем каталоге.
+    """
+    root = logging.getLogger()
+    root.addHandler(logging.NullHandler())
+    root.setLevel(logging.DEBUG)
+
+
+def run_shard(func, part):
+    """Выполняет функцию этапа для части расписания и возвращает результат и записи журнала."""
+    from class_cache import RecordCollector
+
+    collector = RecordCollector(logging.DEBUG)
+    logging.getLogger().addHandler(collector)
+    try:
+        return func(part), collector.records
+    finally:
+        logging.getLogger().removeHandler(collector)
+
+
+class ClassPool:
+    """
+    Пул процессов для обработки классов одной школы; создается при первом большом расписании
+    и используется всеми этапами (и повторными запусками). Закрывается через close() или with.
+    """
+
+    def __init__(self, workers=None, threshold=DEFAULT_THRESHOLD):
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.executor = None
+
+    def parallel(self, data):
+        """Обрабатывать ли расписание в пуле."""
+        return self.workers > 1 and len(data) > 1 and count_lessons(data) >= self.threshold
+
+    def map(self, func, data):
+        """
+        Применяет func к частям расписания.
+        :param func: Функция части расписания; должна сериализоваться pickle (функция модуля
+                     или functools.partial от нее).
+        :return: Результаты по частям в порядке классов (одна часть, если пул не используется).
+        """
+        if not self.parallel(data):
+            return [func(data)]
+        if self.executor is None:
+            # spawn: рабочие процессы не наследуют обработчики журнала текущего запуска
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        from class_cache import replay
+
+        futures = [self.executor.submit(run_shard, func, part)
+                   for part in split_classes(data, self.workers * SHARDS_PER_WORKER)]
+        results = []
+        for future in futures:
+            result, records = future.result()
+            replay(records)
+            results.append(result)
+        return results
+
+    def apply(self, func, data):
+        """Применяет функцию этапа (расписание -> расписание) и объединяет части в порядке классов."""
+        result = {}
+        for part in self.map(func, data):
+            result.update(part)
+        return result
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
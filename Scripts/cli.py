@@ -0,0 +1,144 @@
+import argparse
+import os
+import sys
+
+# Единая командная строка конвейера: python <каталог Scripts> <команда> [каталог школы] [параметры]
+#   convert  - Excel -> CSV -> JSON и все преобразования расписания (без проверок и выгрузки)
+#   validate - проверки преобразованного расписания (validation.py или FindError, check_group, Final_check)
+#   export   - запись GIS_schedule.csv
+#   run      - весь конвейер (как pipeline.py)
+# Модули этапов импортируются только внутри команд: validate и export не загружают pandas,
+# numpy и openpyxl; convert загружает pandas, только если Excel нужно преобразовать в CSV
+# (с --source xlsx - openpyxl вместо pandas).
+
+# Предельное время холодного запуска validate (от старта интерпретатора до выхода) на школе
+# типичного размера, с; замеряется benchmark.py (measure_cold_start)
+VALIDATE_BUDGET = 0.3
+# Модули, которые не должны загружаться командой validate
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl"]
+
+CONVERT_STAGES = ["delete", "exel_to_csv", "csv_to_json", "add_key", "sinh_time", "add_groups",
+                  "all_null_lesson", "lesson_sort", "update_cab", "update_lesson_gis"]
+# Этапы, чьи файлы читают проверки и выгрузка: в режиме --in-memory они все же записываются
+CONVERT_CHECKPOINTS = ["csv_to_json", "update_cab", "update_lesson_gis"]
+EXPORT_STAGES = ["json_to_GIS_SO"]
+
+
+def from_excel(args):
+    """Нужно ли преобразовывать Excel: нет --from-csv и есть raspisanie.xlsx (или нет raspisanie.csv)."""
+    if args.from_csv:
+        return False
+    return (os.path.exists(os.path.join(args.dir, 'raspisanie.xlsx'))
+            or not os.path.exists(os.path.join(args.dir, 'raspisanie.csv')))
+
+
+def finish(results, stages):
+    """Выводит время этапов; код выхода 1, если этап завершился с ошибкой или конвейер остановлен."""
+    import pipeline
+    pipeline.print_timings(results)
+    return 0 if len(results) == len(stages) and all(item["ok"] for item in results) else 1
+
+
+def command_convert(args):
+    import pipeline
+
+    stages = CONVERT_STAGES if from_excel(args) else CONVERT_STAGES[2:]
+    # Книги, прочитанные напрямую, дополнительно сохраняются в CSV: их читают validate и export
+    results = pipeline.run_pipeline(base_dir=args.dir, stages=stages, in_memory=args.in_memory,
+                                    checkpoints=CONVERT_CHECKPOINTS, model=args.model, source=args.source,
+                                    export_csv=True, checkpoint_format=args.checkpoint_format,
+                                    workspace=args.workspace, workspace_outputs='all')
+    return finish(results, stages)
+
+
+def command_validate(args):
+    import pipeline
+
+    stages = pipeline.VALIDATION_STAGES[args.mode]
+    results = pipeline.run_pipeline(base_dir=args.dir, stages=stages, validation=args.mode,
+                                    workspace=args.workspace)
+    code = finish(results, stages)
+    if args.strict and any(item["events"].get("errors") for item in results):
+        code = code or 2
+    return code
+
+
+def command_export(args):
+    import pipeline
+    results = pipeline.run_pipeline(base_dir=args.dir, stages=EXPORT_STAGES, workspace=args.workspace,
+                                    exports=args.export)
+    return finish(results, EXPORT_STAGES)
+
+
+def command_run(args):
+    import pipeline
+
+    cache = pipeline.make_cache(args)
+    classes = pipeline.make_class_cache(args)
+    executor = pipeline.make_class_pool(args)
+    try:
+        results = pipeline.run_pipeline(base_dir=args.dir, **pipeline.pipeline_options(args), cache=cache,
+                                        classes=classes, executor=executor)
+    finally:
+        if executor is not None:
+            executor.close()
+    if cache is not None:
+        cache.report()
+    if classes is not None:
+        classes.report()
+    pipeline.print_timings(results)
+    return 0 if all(item["ok"] for item in results) else 1
+
+
+def make_parser():
+    # pipeline.py импортирует только стандартную библиотеку; модули этапов загружаются при их выполнении
+    import pipeline
+
+    parser = argparse.ArgumentParser(prog="Scripts", description="Обработка расписания АВЕРС для ГИС СО ЕЦП")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help_text, handler, workspace=True):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("dir", nargs="?", default=".", help="каталог школы (по умолчанию текущий)")
+        if workspace:
+            # Для run параметр добавляется вместе с остальными параметрами конвейера
+            command.add_argument("--workspace", nargs="?", const="", default=None, metavar="КАТАЛОГ",
+                                 help="выполнять в отдельном рабочем каталоге (tmpfs - в /dev/shm)")
+        command.set_defaults(handler=handler)
+        return command
+
+    convert = add_command("convert", "Excel -> JSON и преобразования расписания", command_convert)
+    convert.add_argument("--source", choices=["csv", "xlsx"], default="csv",
+                         help="csv - конвертация Excel в CSV через pandas, xlsx - прямое чтение книг")
+    convert.add_argument("--from-csv", action="store_true",
+                         help="не преобразовывать Excel, использовать готовые CSV (pandas не загружается)")
+    convert.add_argument("--model", choices=["dict", "grid", "columnar"], default="dict",
+                         help="представление расписания (см. pipeline.py)")
+    convert.add_argument("--in-memory", action="store_true",
+                         help="записывать только промежуточные файлы, нужные командам validate и export")
+    convert.add_argument("--checkpoint-format", choices=["json", "compact", "binary"], default="json",
+                         help="формат промежуточных файлов (checkpoint.py)")
+
+    validate = add_command("validate", "проверки преобразованного расписания", command_validate)
+    validate.add_argument("--mode", choices=["engine", "legacy"], default="engine",
+                          help="engine - одна проверка с записью findings.jsonl (по умолчанию), "
+                               "legacy - FindError, check_group, Final_check")
+    validate.add_argument("--strict", action="store_true", help="код выхода 2, если найдены ошибки")
+
+    export = add_command("export", "запись GIS_schedule.csv", command_export)
+    export.add_argument("--export", action="append", default=[], type=pipeline.parse_export, metavar="ЦЕЛЬ",
+                        help="дополнительная выгрузка за тот же проход: class, teacher, split:МБ (см. pipeline.py)")
+
+    run = add_command("run", "весь конвейер", command_run, workspace=False)
+    pipeline.add_arguments(run)
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    args.dir = os.path.abspath(args.dir)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+import csv
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Табличное представление расписания (режим --model columnar).
+# Все расписание хранится одной таблицей: строка на урок, столбцы
+# class_name, day, day_idx, key, pos, time, lesson, teach, number, groups;
+# класс и день - категориальные столбцы. Этапы конвейера выполняются
+# операциями над столбцами (слияния, маски, isin, сводная таблица) вместо
+# обхода вложенных словарей. Результат совпадает с исходными функциями.
+
+FIELDS = ["time", "lesson", "teach", "number", "groups"]  # Поля урока в порядке JSON
+COLUMNS = ["class_name", "day", "day_idx", "key", "pos"] + FIELDS
+GROUP = ["class_name", "day_idx"]  # Один день одного класса
+NO_ROOM = "Нет кабинета"
+
+
+class ColumnarSchedule:
+    """
+    Расписание в виде таблицы.
+    frame - уроки в порядке JSON (класс, день, pos - позиция ключа в дне),
+    layout - классы и их дни в исходном порядке (сохраняет и дни без уроков).
+    """
+    __slots__ = ("frame", "layout")
+
+    def __init__(self, frame, layout):
+        self.frame = frame
+        self.layout = layout
+
+    @classmethod
+    def from_json(cls, data):
+        """Строит таблицу из словаря в формате raspisanie*.json."""
+        layout = {}
+        columns = {name: [] for name in COLUMNS}
+        for class_name, days in data.items():
+            layout[class_name] = list(days)
+            for day_idx, (day, lessons) in enumerate(days.items()):
+                for pos, (key, lesson) in enumerate(lessons.items()):
+                    if list(lesson) != FIELDS:
+                        raise ValueError(f"Неожиданный набор полей урока: {list(lesson)}")
+                    columns["class_name"].append(class_name)
+                    columns["day"].append(day)
+                    columns["day_idx"].append(day_idx)
+                    columns["key"].append(key)
+                    columns["pos"].append(pos)
+                    for field in FIELDS:
+                        columns[field].append(lesson[field])
+        day_names = list(dict.fromkeys(day for days in layout.values() for day in days))
+        frame = pd.DataFrame({
+            "class_name": pd.Categorical(columns["class_name"], categories=list(layout)),
+            "day": pd.Categorical(columns["day"], categories=day_names),
+            "day_idx": np.array(columns["day_idx"], dtype=np.int64),
+            "key": pd.Series(columns["key"], dtype=object),
+            "pos": np.array(columns["pos"], dtype=np.int64),
+            **{field: pd.Series(columns[field], dtype=object) for field in FIELDS},
+        })
+        return cls(frame, layout)
+
+    def to_json(self):
+        """Возвращает словарь в формате raspisanie*.json."""
+        result = {class_name: {day: {} for day in days} for class_name, days in self.layout.items()}
+        frame = self.frame
+        values = zip(frame["class_name"].tolist(), frame["day"].tolist(), frame["key"].tolist(),
+                     *(frame[field].tolist() for field in FIELDS))
+        for class_name, day, key, time, lesson, teach, number, groups in values:
+            result[class_name][day][key] = {"time": time, "lesson": lesson, "teach": teach,
+                                            "number": number, "groups": groups}
+        return result
+
+    def with_frame(self, frame):
+        """Новое расписание с той же раскладкой классов и дней; строки упорядочиваются заново."""
+        frame = frame.sort_values(GROUP + ["pos"], kind="stable", ignore_index=True)
+        frame["pos"] = frame.groupby(GROUP, observed=True).cumcount().to_numpy()
+        return ColumnarSchedule(frame, self.layout)
+
+
+def dot_one(frame):
+    """Маска строк с ключами подгрупп (.1)."""
+    return frame["key"].str.endswith(".1")
+
+
+def parent_keys(frame):
+    """Ключ основного урока так же, как в исходных скриптах: key.split(".1")[0]."""
+    return frame["key"].str.split(".1", regex=False).str[0]
+
+
+def has_plain_keys(schedule):
+    """Все ключи вида "3" или "3.1" - только для них работают табличные all_null_lesson и lesson_sort."""
+    return bool(schedule.frame["key"].str.fullmatch(r"\d+(\.1)?").all())
+
+
+# --- Этапы ---
+
+def add_keys(schedule):
+    """Аналог add_key.add_keys: ключ .1 приводится к виду <предыдущий числовой ключ>.1."""
+    frame = schedule.frame.copy()
+    keys = frame["key"]
+    previous = keys.where(keys.str.isdigit()).groupby([frame["class_name"], frame["day_idx"]],
+                                                      observed=True).ffill()
+    expected = previous + ".1"
+    fix = dot_one(frame) & previous.notna() & (keys != expected)
+    if not fix.any():
+        return schedule
+    for key, expected_key in zip(keys[fix].tolist(), expected[fix].tolist()):
+        logging.warning(f"Ключ {key} не соответствует формату '{expected_key}'. Исправляем.")
+    frame.loc[fix, "key"] = expected[fix]
+    # Совпавшие после исправления ключи: как в словаре - место первого, значение последнего
+    frame["pos"] = frame.groupby(GROUP + ["key"], observed=True)["pos"].transform("min")
+    frame = frame.drop_duplicates(subset=GROUP + ["key"], keep="last")
+    return schedule.with_frame(frame)
+
+
+def child_parent_pairs(frame):
+    """Пары (строка .1, строка основного урока) одного дня; строки .1 без основного урока отдельно."""
+    children = frame[dot_one(frame)].assign(parent_key=parent_keys(frame)[dot_one(frame)])
+    parents = frame[GROUP + ["key"]].reset_index().rename(columns={"key": "parent_key", "index": "parent_row"})
+    pairs = children.reset_index().rename(columns={"index": "child_row"}).merge(
+        parents, on=GROUP + ["parent_key"], how="left", sort=False)
+    return pairs
+
+
+def set_sinh_time(schedule):
+    """Аналог sinh_time.set_sinh_time: время урока .1 берется из основного урока (самосоединение)."""
+    frame = schedule.frame.copy()
+    pairs = child_parent_pairs(frame)
+    pairs = pairs[pairs["parent_row"].notna()]
+    child_rows = pairs["child_row"].to_numpy()
+    parent_rows = pairs["parent_row"].astype(np.int64).to_numpy()
+    time = frame["time"].to_numpy(copy=True)
+    time[child_rows] = time[parent_rows]
+    frame["time"] = time
+    logging.info(f"Время подгрупп синхронизировано: уроков {len(child_rows)}")
+    return ColumnarSchedule(frame, schedule.layout)
+
+
+def groups_table(groups_data):
+    """Справочник групп add_groups.groups_from_rows в виде таблицы с первыми двумя группами."""
+    rows = [(class_name, subject, teacher, groups[0], groups[1] if len(groups) > 1 else None, len(groups))
+            for (class_name, subject, teacher), groups in groups_data.items()]
+    return pd.DataFrame(rows, columns=["g_class", "g_subject", "g_teacher", "group_1", "group_2", "group_count"])
+
+
+def lookup_groups(pairs, table, prefix):
+    """Присоединяет к парам группы по ключу (класс, предмет, учитель) основного или дочернего урока."""
+    keys = pd.DataFrame({
+        "g_class": pairs["class_name"].astype(str).str.lower(),
+        "g_subject": pairs[f"{prefix}_lesson"].str.strip(),
+        "g_teacher": pairs[f"{prefix}_teach"].str.strip(),
+    })
+    found = keys.merge(table, on=["g_class", "g_subject", "g_teacher"], how="left", sort=False)
+    found["group_count"] = found["group_count"].fillna(0).astype(np.int64)
+    found.index = pairs.index
+    return keys, found
+
+
+def add_groups(schedule, groups_data, logger=logging):
+    """
+    Аналог add_groups.add_groups: группы назначаются слиянием пар (основной урок, урок .1)
+    со справочником групп. Сообщения об ошибках пишутся в том же порядке и виде.
+    """
+    frame = schedule.frame.copy()
+    pairs = child_parent_pairs(frame)
+    for row in pairs[pairs["parent_row"].isna()].itertuples():
+        logger.warning(f"Для ключа {row.key} не найден родительский ключ {row.parent_key}. Пропускаем.")
+    pairs = pairs[pairs["parent_row"].notna()].copy()
+    pairs["parent_row"] = pairs["parent_row"].astype(np.int64)
+    pairs["parent_lesson"] = frame["lesson"].to_numpy()[pairs["parent_row"].to_numpy()]
+    pairs["parent_teach"] = frame["teach"].to_numpy()[pairs["parent_row"].to_numpy()]
+    pairs["child_lesson"] = pairs["lesson"]
+    pairs["child_teach"] = pairs["teach"]
+
+    table = groups_table(groups_data)
+    parent_keys_, parent_found = lookup_groups(pairs, table, "parent")
+    child_keys, child_found = lookup_groups(pairs, table, "child")
+    same = (pairs["child_lesson"] == pairs["parent_lesson"]) & (pairs["child_teach"] == pairs["parent_teach"])
+
+    groups = frame["groups"].to_numpy(copy=True)
+    parent_rows = pairs["parent_row"].to_numpy()
+    child_rows = pairs["child_row"].to_numpy()
+    parent_count = parent_found["group_count"].to_numpy()
+    child_count = child_found["group_count"].to_numpy()
+    same_mask = same.to_numpy()
+
+    # Совпадают предмет и учитель: первая группа - основному уроку, вторая (если есть) - уроку .1
+    set_parent = parent_count > 0
+    groups[parent_rows[set_parent]] = parent_found["group_1"].to_numpy()[set_parent]
+    set_child = same_mask & (parent_count >= 2)
+    groups[child_rows[set_child]] = parent_found["group_2"].to_numpy()[set_child]
+    # Разные предмет или учитель: у урока .1 своя первая группа
+    set_child = ~same_mask & (child_count > 0)
+    groups[child_rows[set_child]] = child_found["group_1"].to_numpy()[set_child]
+    frame["groups"] = groups
+
+    # Ошибки в порядке обхода исходного скрипта
+    parent_tuples = list(parent_keys_.itertuples(index=False, name=None))
+    child_tuples = list(child_keys.itertuples(index=False, name=None))
+    for i in np.flatnonzero((parent_count == 0) | (~same_mask & (child_count == 0))):
+        if same_mask[i]:
+            logger.error(f"Не найдено подходящих групп для ключа {parent_tuples[i]}")
+            continue
+        if parent_count[i] == 0:
+            logger.error(f"Не найдено подходящих групп для родительского ключа {parent_tuples[i]}")
+        if child_count[i] == 0:
+            logger.error(f"Не найдено подходящих групп для дочернего ключа {child_tuples[i]}")
+    logger.info(f"Группы назначены: пар основной урок/подгруппа {len(pairs)}")
+    return ColumnarSchedule(frame, schedule.layout)
+
+
+def empty_lessons(keys):
+    """Пустые уроки для добавления: keys - таблица с class_name, day_idx, key и порядковыми полями."""
+    frame = keys.copy()
+    for field in FIELDS:
+        frame[field] = ""
+    return frame
+
+
+def add_missing_keys(schedule):
+    """
+    Аналог all_null_lesson.add_missing_keys: каждому дню класса добавляются все основные ключи
+    класса и ключи .1 тех уроков, у которых подгруппа есть хотя бы в одном дне.
+    Порядок ключей в дне тот же, что у исходной функции.
+    """
+    if not has_plain_keys(schedule):
+        return None  # Нестандартные ключи: используется исходная функция
+    frame = schedule.frame
+    base = frame["key"].str.split(".", regex=False).str[0]
+    is_main = frame["key"].str.isdigit()
+    days = pd.DataFrame([(class_name, day_idx, day) for class_name, names in schedule.layout.items()
+                         for day_idx, day in enumerate(names)], columns=["class_name", "day_idx", "day"])
+    days["class_name"] = pd.Categorical(days["class_name"], categories=frame["class_name"].cat.categories)
+    days["day"] = pd.Categorical(days["day"], categories=frame["day"].cat.categories)
+
+    # Основные ключи класса (в порядке номеров) и ключи .1 с порядком первого появления номера
+    mains = frame.loc[is_main, ["class_name", "key"]].drop_duplicates()
+    mains["rank_a"] = mains["key"].astype(np.int64)
+    mains["rank_b"] = 0
+    dots = frame.loc[dot_one(frame) & ~is_main, ["class_name", "key"]].assign(base=base)
+    bases = dots.drop_duplicates(subset=["class_name", "base"])[["class_name", "base"]]
+    bases["rank_a"] = bases.groupby("class_name", observed=True).cumcount()
+    dots = dots.drop_duplicates(subset=["class_name", "key"]).merge(bases, on=["class_name", "base"])
+    dots = dots.merge(mains[["class_name", "key"]].rename(columns={"key": "base"}), on=["class_name", "base"])
+    dots["rank_b"] = dots.groupby(["class_name", "base"], observed=True)["key"].rank(method="first")
+
+    existing = frame[GROUP + ["key"]]
+    added = []
+    for rank_group, candidates in ((1, mains), (2, dots)):
+        wanted = days.merge(candidates[["class_name", "key", "rank_a", "rank_b"]], on="class_name")
+        missing = wanted.merge(existing, on=GROUP + ["key"], how="left", indicator=True)
+        missing = missing[missing["_merge"] == "left_only"].drop(columns="_merge")
+        added.append(empty_lessons(missing).assign(rank_group=rank_group))
+
+    # Существующие уроки - по номеру (устойчиво), затем добавленные основные, затем добавленные .1
+    current = frame.assign(rank_group=0, rank_a=base.astype(np.int64), rank_b=frame["pos"])
+    combined = pd.concat([current] + added, ignore_index=True)
+    combined = combined.sort_values(GROUP + ["rank_group", "rank_a", "rank_b"], kind="stable", ignore_index=True)
+    combined["pos"] = combined.groupby(GROUP, observed=True).cumcount().to_numpy()
+    logging.info(f"Добавлено пустых уроков: {len(combined) - len(frame)}")
+    return ColumnarSchedule(combined[COLUMNS], schedule.layout)
+
+
+def sort_lessons(schedule):
+    """Аналог lesson_sort.sort_lessons: устойчивая сортировка ключей дня по номеру урока."""
+    if not has_plain_keys(schedule):
+        return None
+    frame = schedule.frame.assign(
+        base=schedule.frame["key"].str.split(".", regex=False).str[0].astype(np.int64))
+    frame = frame.sort_values(GROUP + ["base", "pos"], kind="stable", ignore_index=True).drop(columns="base")
+    frame["pos"] = frame.groupby(GROUP, observed=True).cumcount().to_numpy()
+    return ColumnarSchedule(frame, schedule.layout)
+
+
+def update_dot_one_fields(schedule):
+    """Аналог update_cab.update_dot_one_fields: урокам .1 без кабинета ставится "Нет кабинета"."""
+    frame = schedule.frame.copy()
+    mask = (dot_one(frame) & (frame["time"] != "") & (frame["lesson"] != "") & (frame["teach"] != "")
+            & (frame["number"] == ""))
+    frame.loc[mask, "number"] = NO_ROOM
+    logging.info(f"Установлено значение '{NO_ROOM}' для уроков: {int(mask.sum())}")
+    return ColumnarSchedule(frame, schedule.layout)
+
+
+def replace_lessons(schedule, replacements):
+    """Аналог update_lesson_gis.replace_lessons: замены применяются к каждому названию через движок замен."""
+    import update_lesson_gis
+
+    engine = update_lesson_gis.ReplacementEngine.of(replacements)
+    frame = schedule.frame.copy()
+    replaced = frame["lesson"].map(engine.replace)
+    changed = int((replaced != frame["lesson"]).sum())
+    frame["lesson"] = replaced
+    logging.info(f"Замена выполнена для уроков: {changed}" if changed else "Нет изменений для применения.")
+    engine.report()
+    return ColumnarSchedule(frame, schedule.layout)
+
+
+def find_errors(schedule, klass, lesson, skip_no_room=False):
+    """
+    Аналог FindError.find_errors (и Final_check.final_check при skip_no_room=True):
+    проверка по справочникам через isin, сообщения в том же порядке и виде.
+    """
+    from reference_catalog import ReferenceCatalog, describe_suggestions
+
+    klass = ReferenceCatalog.of(klass)
+    lesson = ReferenceCatalog.of(lesson)
+    frame = schedule.frame
+    lesson_values = frame["lesson"].str.strip()
+    number_values = frame["number"].str.strip()
+    bad_lesson = (lesson_values != "") & ~lesson_values.isin(lesson.values)
+    bad_number = (number_values != "") & ~number_values.isin(klass.values)
+    if skip_no_room:
+        bad_number &= number_values != NO_ROOM
+
+    errors = []
+    rows = np.flatnonzero((bad_lesson | bad_number).to_numpy())
+    columns = [frame[name].to_numpy() for name in ("class_name", "day", "key")]
+    for i in rows:
+        class_name, day, key = (column[i] for column in columns)
+        if bad_lesson.iat[i]:
+            value = lesson_values.iat[i]
+            errors.append(f"Класс: {class_name}, День: {day}, Урок: {key}, "
+                          f"Несоответствие в lesson: {value}{describe_suggestions(lesson, value)}")
+        if bad_number.iat[i]:
+            value = number_values.iat[i]
+            errors.append(f"Класс: {class_name}, День: {day}, Урок: {key}, "
+                          f"Несоответствие в number: {value}{describe_suggestions(klass, value)}")
+    return errors
+
+
+def check_groups(schedule, lessons, log_file='log.log', error_file='chech_groups.log'):
+    """
+    Аналог check_group.check_groups: уроки предметов с группами без назначенной группы.
+    Строки пишутся в те же файлы и в том же виде, но каждый файл открывается один раз.
+    :return: Число уроков без групп.
+    """
+    frame = schedule.frame
+    mask = frame["lesson"].isin(list(lessons))
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log_lines = []
+    error_lines = []
+    for class_name, day, key, lesson, groups in zip(*(frame.loc[mask, name].tolist() for name in
+                                                      ("class_name", "day", "key", "lesson", "groups"))):
+        if groups:
+            log_lines.append(f"{timestamp} - INFO - Класс: {class_name}, День недели: {day}, Номер урока: {key}, "
+                             f"Предмет: {lesson}, Группы: {groups}, Все хорошо\n")
+        else:
+            line = (f"{timestamp} - ERROR - Класс: {class_name}, День недели: {day}, Номер урока: {key}, "
+                    f"Предмет: {lesson}, Группы: {groups}, Ошибка: groups пустой\n")
+            log_lines.append(line)
+            error_lines.append(line)
+    for file_path, lines in ((log_file, log_lines), (error_file, error_lines)):
+        if lines:
+            with open(file_path, 'a', encoding='cp1251') as file:
+                file.writelines(lines)
+    return len(error_lines)
+
+
+def write_csv_schedule(schedule, output_csv_path):
+    """
+    Аналог json_to_GIS_SO.write_csv_schedule: ячейки формируются операциями над столбцами,
+    сетка ГИС - сводной таблицей (класс, ключ) x день.
+    """
+    import json_to_GIS_SO
+
+    frame = schedule.frame
+    name = frame["lesson"] + np.where(frame["groups"] != "", " (" + frame["groups"] + ")", "")
+    cell = (name + "\n" + frame["teach"] + "\n" + frame["time"]
+            + np.where(frame["number"] != "", "\n" + frame["number"], ""))
+    cell = cell.str.rstrip("\n")
+    grid = pd.DataFrame({"class_name": frame["class_name"].astype(str), "key": frame["key"],
+                         "day_idx": frame["day_idx"], "cell": cell})
+    day_count = max((len(days) for days in schedule.layout.values()), default=0)
+    table = grid.pivot(index=["class_name", "key"], columns="day_idx", values="cell")
+    table = table.reindex(columns=range(day_count)).fillna("")
+    cells = dict(zip(table.index, table.itertuples(index=False, name=None)))
+    keys_by_class = grid.groupby("class_name", sort=False)["key"].agg(list).to_dict()
+
+    try:
+        with open(output_csv_path, 'w', encoding='windows-1251', newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            for class_name, days in schedule.layout.items():
+                writer.writerow([f"Класс: {class_name}"])
+                writer.writerow([])
+                writer.writerow(["", "", "Пн", "Вт", "Ср", "Чт", "Пт"])
+                writer.writerow([])
+                # Порядок строк - как в json_to_GIS_SO (номер урока, затем подгруппа)
+                all_lessons = set(keys_by_class.get(class_name, []))
+                for lesson_key in sorted(all_lessons, key=json_to_GIS_SO.lesson_order):
+                    writer.writerow(["", lesson_key] + list(cells[(class_name, lesson_key)][:len(days)]))
+                writer.writerow([])
+                writer.writerow([])
+        logging.info(f"CSV-файл успешно создан: {output_csv_path}")
+    except Exception as e:
+        logging.error(f"Ошибка при создании CSV-файла: {e}")
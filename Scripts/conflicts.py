@@ -0,0 +1,143 @@
+import argparse
+import os
+
+from validation import NO_ROOM
+
+# Поиск накладок: один учитель или один кабинет в одно время у разных классов.
+# Инвертированные индексы учитель -> {(день, время) -> {класс: урок}} и кабинет -> {...}
+# заполняются за тот же обход класс -> день -> урок, что и остальные проверки (validation.validate),
+# поэтому время проверки линейно по числу уроков и для сводного расписания всех школ района.
+# Подгруппы (.1) одного класса идут в то же время, что и основной урок: учитель или кабинет,
+# записанные у класса дважды, накладкой не считаются (в индексе один урок на класс).
+# Совместный урок нескольких классов (один учитель, один предмет, один кабинет) - тоже не накладка.
+# Уроки без кабинета ("Нет кабинета") в индекс кабинетов не попадают.
+
+SCHEDULE_FILE = "raspisanie_replace_lessons.json"
+DISTRICT_FINDINGS_FILE = "findings_district.jsonl"
+CONFLICT_RULES = ("teacher_conflict", "room_conflict")  # Правила validation.RULES, проверяемые по индексам
+MAX_OTHERS = 5  # Сколько других классов перечислять в находке; остальные только подсчитываются
+
+
+def slot_key(day, lesson_number, lesson_info):
+    """Ключ времени урока: (день, время); урок без времени - по номеру основного урока."""
+    time = lesson_info.get("time", "").strip()
+    return day, time or f"урок {lesson_number.partition('.')[0]}"
+
+
+def joint_teacher(bookings):
+    """Уроки учителя - один совместный урок: у всех классов тот же предмет и кабинет."""
+    return len({(subject, room) for _, subject, room, _ in bookings.values()}) == 1
+
+
+def joint_room(bookings):
+    """
+    Уроки в кабинете ведет один учитель: накладка учителя проверяется своим правилом.
+    Уроки без учителя совместными не считаются - кабинет занят разными классами.
+    """
+    teachers = {teacher for *_, teacher in bookings.values()}
+    return len(teachers) == 1 and "" not in teachers
+
+
+def others_text(names, class_name):
+    """
+    Другие классы накладки: не больше MAX_OTHERS имен из начала списка, чтобы запись
+    для каждого из k классов строилась за O(1), а не O(k).
+    """
+    others = [name for name in names[:MAX_OTHERS + 1] if name != class_name][:MAX_OTHERS]
+    text = ", ".join(others)
+    if len(names) - 1 > len(others):
+        text += f" и еще {len(names) - 1 - len(others)}"
+    return text
+
+
+class ConflictIndex:
+    """Инвертированные индексы учителей и кабинетов по времени уроков."""
+    __slots__ = ("teachers", "rooms")
+
+    def __init__(self):
+        self.teachers = {}  # Учитель -> {(день, время) -> {класс: (урок, предмет, кабинет, учитель)}}
+        self.rooms = {}  # Кабинет -> {(день, время) -> {класс: (урок, предмет, кабинет, учитель)}}
+
+    def add(self, class_name, day, lesson_number, lesson_info):
+        teacher = lesson_info.get("teach", "").strip()
+        room = lesson_info.get("number", "").strip()
+        if room == NO_ROOM:
+            room = ""
+        if not teacher and not room:
+            return
+        key = slot_key(day, lesson_number, lesson_info)
+        booking = (lesson_number, lesson_info.get("lesson", "").strip(), room, teacher)
+        # setdefault по классу: основной урок и подгруппа одного класса - одна запись
+        if teacher:
+            self.teachers.setdefault(teacher, {}).setdefault(key, {}).setdefault(class_name, booking)
+        if room:
+            self.rooms.setdefault(room, {}).setdefault(key, {}).setdefault(class_name, booking)
+
+    def add_schedule(self, data, prefix=""):
+        """
+        Добавляет все уроки расписания (словарь или checkpoint.LazySchedule - по одному классу в памяти).
+        :param prefix: Приставка к имени класса: отличает классы разных школ в сводном индексе.
+        """
+        for class_name, days in (data.stream() if hasattr(data, "stream") else data.items()):
+            for day, lessons in days.items():
+                for lesson_number, lesson_info in lessons.items():
+                    self.add(prefix + class_name, day, lesson_number, lesson_info)
+        return self
+
+    def conflicts(self, rules=CONFLICT_RULES):
+        """Находки (правило, класс, день, урок, значение) - по одной на каждый класс накладки."""
+        sources = [("teacher_conflict", self.teachers, joint_teacher), ("room_conflict", self.rooms, joint_room)]
+        for rule, index, joint in sources:
+            if rule not in rules:
+                continue
+            for name, slots in index.items():
+                for (day, time), bookings in slots.items():
+                    if len(bookings) < 2 or joint(bookings):
+                        continue
+                    names = list(bookings)
+                    for class_name, (lesson_number, *_) in bookings.items():
+                        value = f"{name} {time}: также {others_text(names, class_name)}"
+                        yield rule, class_name, day, lesson_number, value
+
+    def report(self, findings, rules=CONFLICT_RULES):
+        """Добавляет накладки в Findings."""
+        for rule, class_name, day, lesson_number, value in self.conflicts(rules):
+            findings.add(rule, class_name, day, lesson_number, value)
+        return findings
+
+
+def check_district(school_dirs, findings=None):
+    """
+    Накладки по сводному расписанию нескольких школ (учитель, работающий в двух школах района).
+    Классы в находках записываются как "школа/класс".
+    :param school_dirs: Каталоги школ с итоговым расписанием (SCHEDULE_FILE).
+    :return: Findings.
+    """
+    import checkpoint
+    import validation
+
+    index = ConflictIndex()
+    for school_dir in school_dirs:
+        file_path = os.path.join(school_dir, SCHEDULE_FILE)
+        if not os.path.isfile(file_path):
+            continue
+        schedule = checkpoint.open_schedule(file_path)
+        try:
+            index.add_schedule(schedule, f"{os.path.basename(os.path.abspath(school_dir))}/")
+        finally:
+            if isinstance(schedule, checkpoint.LazySchedule):
+                schedule.close()
+    return index.report(findings if findings is not None else validation.Findings())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Накладки учителей и кабинетов по расписаниям школ района")
+    parser.add_argument("root", help="каталог с подкаталогами школ (как у batch.py)")
+    args = parser.parse_args()
+
+    schools = sorted(entry.path for entry in os.scandir(args.root) if entry.is_dir())
+    result = check_district(schools)
+    result.write_jsonl(os.path.join(args.root, DISTRICT_FINDINGS_FILE))
+    for rule, count in result.by_rule().items():
+        if rule in CONFLICT_RULES:
+            print(f"{rule}: {count}")
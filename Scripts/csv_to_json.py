@@ -1,8 +1,9 @@
 import csv
-import json
 import logging
 import os
 import time
+import checkpoint
+from reference_catalog import room_name
 
 # Настройка логирования
 logging.basicConfig(
@@ -11,89 +12,152 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]  # Дни недели
+
 def convert_csv_to_json(input_file, output_file):
     """
     Основная функция для конвертации CSV файла с расписанием в JSON.
     """
+    result = parse_csv_schedule(input_file)
+    if result is None:
+        return
+
+    try:
+        # Запись результата в JSON файл
+        logging.info(f"Запись результата в файл {output_file}.")
+        checkpoint.dump(result, output_file)
+        
+        logging.info(f"Успешно завершена обработка файла {input_file}. Результат сохранен в {output_file}.")
+    
+    except Exception as e:
+        logging.error(f"Ошибка при обработке файла {input_file}: {str(e)}")
+        print(f"Ошибка: {str(e)}")
+
+def parse_csv_schedule(input_file):
+    """
+    Читает CSV файл с расписанием и возвращает словарь расписания.
+    При ошибке возвращает None.
+    """
     if not os.path.exists(input_file):
         logging.error(f"Файл {input_file} не найден.")
         print(f"Ошибка: Файл {input_file} не найден.")
-        return
+        return None
     
     logging.info(f"Начало обработки файла {input_file}.")
     
     result = {}  # Результирующий словарь для хранения данных
-    current_class = None  # Текущий класс, который обрабатывается
-    days = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]  # Дни недели
-    previous_lesson_number = None  # Переменная для отслеживания последнего основного номера урока
-    
     try:
-        with open(input_file, 'r', encoding='windows-1251') as csvfile:
-            reader = csv.reader(csvfile, delimiter=';')
-            rows = list(reader)  # Читаем все строки
-            logging.info(f"Файл {input_file} успешно прочитан. Всего строк: {len(rows)}.")
-            
-            i = 0
-            # Игнорируем все строки до первого вхождения "Класс - "
-            while i < len(rows):
-                row = rows[i]
-                logging.debug(f"Обработка строки {i + 1}: {row}")
-                
-                if row and row[0].startswith("Класс - "):
-                    logging.debug(f"Найдено начало расписания для класса: {row[0]}.")
-                    break
-                i += 1
-            
-            # Основной цикл обработки расписания
-            while i < len(rows):
-                row = rows[i]
-                logging.debug(f"Обработка строки {i + 1}: {row}")
-                
-                # Обработка строки с названием класса
-                if row and row[0].startswith("Класс - "):
-                    # Удаляем подстроку "Класс - " и ";;;;;;;;;;"
-                    class_name = row[0].replace("Класс - ", "").replace(";;;;;;;;;;", "").strip()
-                    result[class_name] = {day: {} for day in days}  # Создаем структуру для класса
-                    current_class = class_name
-                    logging.info(f"Начата обработка класса: {current_class}.")
-                    previous_lesson_number = None  # Сбрасываем предыдущий номер урока
-                    i += 4  # Пропускаем заголовочные строки
-                    continue
-                
-                # Обработка пар строк (урок и учитель)
-                if i + 1 < len(rows):
-                    par_lesson = rows[i]  # Строка с уроком
-                    teach_lesson = rows[i + 1]  # Строка с учителем
-                    logging.debug(f"Обработка пары строк: урок = {par_lesson}, учитель = {teach_lesson}.")
-                    
-                    # Проверка на дополнительный урок
-                    if par_lesson and not par_lesson[0].strip():
-                        logging.debug("Обнаружен дополнительный урок.")
-                        process_lesson(par_lesson, teach_lesson, result[current_class], days, is_additional=True, previous_lesson_number=previous_lesson_number)
-                        i += 2
-                    else:
-                        # Основной урок
-                        logging.debug("Обработка основного урока.")
-                        process_lesson(par_lesson, teach_lesson, result[current_class], days)
-                        previous_lesson_number = par_lesson[0].strip() if par_lesson[0].strip() else previous_lesson_number
-                        i += 2
-                
-                # Проверка на пустую строку (конец расписания для текущего класса)
-                if i < len(rows) and (not rows[i] or all(not cell.strip() for cell in rows[i])):
-                    logging.debug(f"Пустая строка {i + 1}. Ожидание нового класса.")
-                    current_class = None
-                    i += 1
-        
-        # Запись результата в JSON файл
-        logging.info(f"Запись результата в файл {output_file}.")
-        with open(output_file, 'w', encoding='utf-8') as jsonfile:
-            json.dump(result, jsonfile, ensure_ascii=False, indent=4)
-        
-        logging.info(f"Успешно завершена обработка файла {input_file}. Результат сохранен в {output_file}.")
+        for class_name, class_data in iter_csv_schedule(input_file):
+            result[class_name] = class_data
+        return result
     
     except Exception as e:
         logging.error(f"Ошибка при обработке файла {input_file}: {str(e)}")
         print(f"Ошибка: {str(e)}")
+        return None
+
+def iter_csv_schedule(input_file):
+    """
+    Читает CSV файл построчно и возвращает классы по одному, не загружая файл целиком.
+    """
+    with open(input_file, 'r', encoding='windows-1251', newline='') as csvfile:
+        reader = csv.reader(csvfile, delimiter=';')
+        yield from iter_classes(reader)
+        logging.info(f"Файл {input_file} прочитан. Всего строк: {reader.line_num}.")
+
+# Состояния разбора файла расписания АВЕРС
+PREAMBLE = "preamble"  # Строки до первого "Класс - "
+HEADER = "header"  # Заголовочные строки после названия класса
+LESSON = "lesson"  # Ожидается строка урока (или название следующего класса)
+TEACHER = "teacher"  # Ожидается строка с учителями для прочитанной строки урока
+AFTER_PAIR = "after_pair"  # Пара обработана: пустая строка завершает класс
+
+HEADER_ROWS = 3  # Количество заголовочных строк после строки с названием класса
+
+def is_blank(row):
+    """Пустая строка - разделитель между классами."""
+    return not row or all(not cell.strip() for cell in row)
+
+def iter_classes(rows, days=DAYS):
+    """
+    Разбирает строки CSV как конечный автомат:
+    преамбула -> название класса -> заголовки -> пары (урок, учитель) -> пустая строка.
+    Возвращает пары (имя класса, данные класса) по мере завершения каждого класса,
+    поэтому в памяти держится только текущий класс.
+    """
+    state = PREAMBLE
+    current_class = None  # Текущий класс, который обрабатывается
+    class_data = None
+    previous_lesson_number = None  # Последний основной номер урока
+    header_rows_left = 0
+    par_lesson = None
+
+    for line_number, row in enumerate(rows, 1):
+        logging.debug("Обработка строки %d: %s", line_number, row)
+
+        if state == AFTER_PAIR:
+            state = LESSON
+            if is_blank(row):
+                # Конец расписания для текущего класса
+                logging.debug("Пустая строка %d. Ожидание нового класса.", line_number)
+                if current_class is not None:
+                    yield current_class, class_data
+                current_class = None
+                class_data = None
+                continue
+
+        if state == PREAMBLE:
+            # Игнорируем все строки до первого вхождения "Класс - "
+            if not (row and row[0].startswith("Класс - ")):
+                continue
+            logging.debug("Найдено начало расписания для класса: %s.", row[0])
+            state = LESSON
+
+        if state == HEADER:
+            header_rows_left -= 1
+            if header_rows_left == 0:
+                state = LESSON
+            continue
+
+        if state == LESSON:
+            # Обработка строки с названием класса
+            if row and row[0].startswith("Класс - "):
+                if current_class is not None:
+                    yield current_class, class_data
+                # Удаляем подстроку "Класс - " и ";;;;;;;;;;"
+                current_class = row[0].replace("Класс - ", "").replace(";;;;;;;;;;", "").strip()
+                class_data = {day: {} for day in days}  # Создаем структуру для класса
+                logging.info(f"Начата обработка класса: {current_class}.")
+                previous_lesson_number = None  # Сбрасываем предыдущий номер урока
+                header_rows_left = HEADER_ROWS  # Пропускаем заголовочные строки
+                state = HEADER
+                continue
+            par_lesson = row  # Строка с уроком
+            state = TEACHER
+            continue
+
+        # state == TEACHER: обработка пары строк (урок и учитель)
+        teach_lesson = row
+        state = AFTER_PAIR
+        if current_class is None:
+            logging.warning(f"Строка {line_number - 1} находится вне расписания класса. Пропускаем.")
+            continue
+
+        # Проверка на дополнительный урок
+        if par_lesson and not par_lesson[0].strip():
+            logging.debug("Обнаружен дополнительный урок.")
+            process_lesson(par_lesson, teach_lesson, class_data, days, is_additional=True, previous_lesson_number=previous_lesson_number)
+        else:
+            # Основной урок
+            logging.debug("Обработка основного урока.")
+            process_lesson(par_lesson, teach_lesson, class_data, days)
+            if par_lesson:
+                previous_lesson_number = par_lesson[0].strip()
+
+    if state == TEACHER:
+        logging.warning("Последняя строка урока не имеет строки с учителями. Пропускаем.")
+    if current_class is not None:
+        yield current_class, class_data
 
 def process_lesson(par_lesson, teach_lesson, class_data, days, is_additional=False, previous_lesson_number=None):
     """
@@ -111,7 +175,7 @@ def process_lesson(par_lesson, teach_lesson, class_data, days, is_additional=Fal
     
     # Извлекаем номер урока (для основного урока)
     lesson_number = par_lesson[0].strip() if par_lesson[0] else ""
-    logging.debug(f"Номер урока: {lesson_number}.")
+    logging.debug("Номер урока: %s.", lesson_number)
     
     # Если это дополнительный урок, используем previous_lesson_number
     if is_additional and previous_lesson_number:
@@ -124,7 +188,7 @@ def process_lesson(par_lesson, teach_lesson, class_data, days, is_additional=Fal
     
     # Извлекаем время урока (оно одинаковое для основного и дополнительного)
     lesson_time = par_lesson[1].strip() if len(par_lesson) > 1 else ""
-    logging.debug(f"Время урока: {lesson_time}.")
+    logging.debug("Время урока: %s.", lesson_time)
     
     # Обрабатываем каждый день недели
     for day_idx, day in enumerate(days):
@@ -135,16 +199,16 @@ def process_lesson(par_lesson, teach_lesson, class_data, days, is_additional=Fal
         
         # Извлекаем данные урока для текущего дня
         lesson_name = par_lesson[2 + 2 * day_idx].strip()  # Название урока
-        lesson_room = par_lesson[3 + 2 * day_idx].strip()  # Кабинет
+        lesson_room = room_name(par_lesson[3 + 2 * day_idx])  # Кабинет ("101.0" из CSV pandas -> "101")
         teacher_name = teach_lesson[2 + 2 * day_idx].strip()  # Учитель
         
         # Пропускаем пустые уроки
         if not lesson_name:
-            logging.debug(f"Урок в {day} отсутствует. Пропускаем.")
+            logging.debug("Урок в %s отсутствует. Пропускаем.", day)
             continue
         
         # Добавляем ключ groups с пустой строкой к каждому уроку
-        logging.debug(f"Добавление урока с ключом {lesson_key} в {day}.")
+        logging.debug("Добавление урока с ключом %s в %s.", lesson_key, day)
         class_data[day][lesson_key] = {
             "time": lesson_time,
             "lesson": lesson_name,
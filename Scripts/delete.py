@@ -8,7 +8,10 @@ files_to_delete = [
     "err_groups.log",
     "final_error.log",
     "chech_groups.log",
+    "findings.jsonl",
     "GIS_schedule.csv",
+    "GIS_schedule_delta.csv",
+    "class_changes.json",
     "klass.csv",
     "lesson.csv",   
     "raspisanie.csv",
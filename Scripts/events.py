@@ -0,0 +1,61 @@
+import logging
+import operator
+import re
+
+# События этапов конвейера.
+# Вместо повторного чтения log.log и поиска файлов ошибок каждый этап отчитывается счетчиками:
+# errors и warnings - число записей лога уровня ERROR и WARNING, остальные - именованные
+# счетчики этапов (unknown_subject, unknown_room, missing_group, ...).
+# Решение продолжать или остановить конвейер принимается по политике вида
+# "unknown_room>0,missing_group>=50": конвейер останавливается, если выполнено любое условие.
+
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '==': operator.eq}
+_CONDITION = re.compile(r'^\s*(\w+)\s*(>=|>|==)\s*(\d+)\s*$')
+
+
+class EventCounter(logging.Handler):
+    """Считает записи лога уровня WARNING и выше, пока подключен к логгеру."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.errors = 0
+        self.warnings = 0
+
+    def emit(self, record):
+        if record.levelno >= logging.ERROR:
+            self.errors += 1
+        else:
+            self.warnings += 1
+
+
+def count(ctx, name, value=1):
+    """Увеличивает именованный счетчик текущего этапа."""
+    events = ctx['events']
+    events[name] = events.get(name, 0) + value
+
+
+def parse_policy(text):
+    """
+    Разбирает политику остановки: условия через запятую, например "unknown_room>0,missing_group>=50".
+    :return: Список кортежей (счетчик, оператор, порог).
+    :raises ValueError: При неверной записи условия.
+    """
+    policy = []
+    for condition in filter(None, (part.strip() for part in (text or "").split(','))):
+        match = _CONDITION.match(condition)
+        if not match:
+            raise ValueError(f"Неверное условие политики: '{condition}' (ожидается, например, unknown_room>0)")
+        name, op, threshold = match.groups()
+        policy.append((name, op, int(threshold)))
+    return policy
+
+
+def check_policy(policy, events):
+    """Возвращает выполненные условия политики в виде строк (пустой список - можно продолжать)."""
+    return [f"{name}={events.get(name, 0)} ({name}{op}{threshold})"
+            for name, op, threshold in policy if OPERATORS[op](events.get(name, 0), threshold)]
+
+
+def format_events(events):
+    """Краткая запись ненулевых счетчиков этапа."""
+    return ", ".join(f"{name}={value}" for name, value in events.items() if value)
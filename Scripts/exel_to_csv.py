@@ -1,6 +1,5 @@
 import os
 import logging
-import pandas as pd
 import time
 
 # Настройка логирования
@@ -20,6 +19,8 @@ def check_files(file_list):
 
 # Функция для преобразования Excel в CSV
 def convert_excel_to_csv(file_name):
+    # pandas загружается только при преобразовании (импорт модуля должен быть быстрым)
+    import pandas as pd
     try:
         # Читаем Excel файл
         df = pd.read_excel(file_name)
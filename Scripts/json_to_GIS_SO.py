@@ -1,6 +1,11 @@
-import json
 import csv
+import functools
+import glob
+import io
 import logging
+import os
+import re
+import checkpoint
 
 # Настройка логирования
 logging.basicConfig(
@@ -9,6 +14,286 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
 )
 
+# Выгрузка расписания в CSV для ГИС СО за один проход по классам.
+# Блок строк каждого класса формируется один раз и передается всем целям выгрузки:
+# основному файлу GIS_schedule.csv, файлам по классам, файлам по учителям и частям
+# основного файла ограниченного размера (для загрузки). Классы читаются по одному
+# (из двоичного промежуточного файла - без разбора остальных), а файлы пишутся
+# через буфер, поэтому расход памяти не зависит от размера расписания.
+
+ENCODING = 'windows-1251'
+BUFFER_SIZE = 1024 * 1024  # Буфер записи файлов выгрузки
+DAY_HEADER = ["", "", "Пн", "Вт", "Ср", "Чт", "Пт"]
+CLASS_DIR = "GIS_classes"  # Файлы по классам
+TEACHER_DIR = "GIS_teachers"  # Файлы по учителям
+PART_PREFIX = "GIS_schedule_part"  # Части основного файла: GIS_schedule_part01.csv, ...
+TEACHER_HEADER = ["Класс", "День", "Урок", "Предмет", "Время", "Кабинет"]
+TEACHER_FLUSH_ROWS = 10000  # Строк по учителям в памяти, после которых они дописываются в файлы
+
+
+@functools.lru_cache(maxsize=None)
+def lesson_order(lesson_key):
+    """Порядок строк: номер урока, затем подгруппа ('1' < '1.1' < '2')."""
+    slot, _, sub = lesson_key.partition('.')
+    return float(slot), int(sub) if sub.isdigit() else 0
+
+
+def lesson_title(lesson_data):
+    """Название предмета с группой в скобках (если группа есть)."""
+    if lesson_data.get('groups'):
+        return f"{lesson_data['lesson']} ({lesson_data['groups']})"
+    return lesson_data['lesson']
+
+
+def cell_text(lesson_data):
+    """Ячейка урока: предмет, учитель, время и кабинет в отдельных строках (пустая, если урока нет)."""
+    if not all(key in lesson_data for key in ['lesson', 'teach', 'time']):
+        return ""
+    cell_content = f"{lesson_title(lesson_data)}\n{lesson_data['teach']}\n{lesson_data['time']}"
+    # Добавляем номер кабинета, если он есть
+    if lesson_data.get('number'):
+        cell_content += f"\n{lesson_data['number']}"
+    # Убираем лишний перенос строки в конце
+    return cell_content.rstrip('\n')
+
+
+def class_rows(class_name, days):
+    """Строки CSV одного класса: заголовок, дни недели, уроки (включая .1) и пустые строки после класса."""
+    rows = [[f"Класс: {class_name}"], [], DAY_HEADER, []]
+    all_lessons = set()
+    for lessons in days.values():
+        all_lessons.update(lessons)
+    for lesson_key in sorted(all_lessons, key=lesson_order):
+        rows.append(["", lesson_key] + [cell_text(lessons.get(lesson_key, {})) for lessons in days.values()])
+    rows.append([])
+    rows.append([])
+    return rows
+
+
+def render_class(class_name, days):
+    """Блок класса в формате ГИС (байты в кодировке windows-1251)."""
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=';').writerows(class_rows(class_name, days))
+    return buffer.getvalue().encode(ENCODING)
+
+
+def render_classes(schedule):
+    """Блоки всех классов части расписания (для построения в пуле процессов, см. class_pool.py)."""
+    return [(class_name, render_class(class_name, days)) for class_name, days in schedule.items()]
+
+
+def iter_classes(schedule):
+    """Классы по одному; классы двоичного файла разбираются по мере обхода и не запоминаются."""
+    if isinstance(schedule, checkpoint.LazySchedule):
+        return schedule.stream()
+    return schedule.items()
+
+
+def safe_name(name):
+    """Имя файла из названия класса или ФИО учителя (без символов, запрещенных в Windows)."""
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', name).strip().rstrip('.') or '_'
+
+
+class FileNames:
+    """Уникальные имена файлов для названий (без учета регистра, как в Windows)."""
+
+    def __init__(self):
+        self.names = {}
+        self.taken = set()
+
+    def get(self, name):
+        file_name = self.names.get(name)
+        if file_name is None:
+            base = candidate = safe_name(name)
+            number = 2
+            while candidate.lower() in self.taken:
+                candidate = f"{base}_{number}"
+                number += 1
+            self.taken.add(candidate.lower())
+            file_name = self.names[name] = f"{candidate}.csv"
+        return file_name
+
+
+def reset_dir(directory):
+    """Создает каталог выгрузки и удаляет из него CSV прошлого запуска."""
+    os.makedirs(directory, exist_ok=True)
+    for file_path in glob.glob(os.path.join(directory, '*.csv')):
+        os.remove(file_path)
+
+
+class GisFile:
+    """Основной файл выгрузки."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file = open(file_path, 'wb', buffering=BUFFER_SIZE)
+
+    def write_class(self, class_name, days, block):
+        self.file.write(block)
+
+    def close(self):
+        self.file.close()
+
+    def summary(self):
+        return f"CSV-файл успешно создан: {self.file_path}"
+
+
+class ClassFiles:
+    """Отдельный файл в формате ГИС для каждого класса."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = FileNames()
+        reset_dir(directory)
+
+    def write_class(self, class_name, days, block):
+        with open(os.path.join(self.directory, self.names.get(class_name)), 'wb') as file:
+            file.write(block)
+
+    def close(self):
+        pass
+
+    def summary(self):
+        return f"Файлы по классам ({len(self.names.names)}) созданы в {self.directory}"
+
+
+class TeacherFiles:
+    """Уроки каждого учителя по всем классам: строки копятся в памяти и дописываются в файлы порциями."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = FileNames()
+        self.pending = {}  # Учитель -> строки, еще не записанные в файл
+        self.pending_rows = 0
+        self.started = set()  # Учителя, файлы которых уже созданы
+        reset_dir(directory)
+
+    def write_class(self, class_name, days, block):
+        for day_name, lessons in days.items():
+            for lesson_key in sorted(lessons, key=lesson_order):
+                lesson_data = lessons[lesson_key]
+                teacher = lesson_data.get('teach')
+                if not teacher or 'lesson' not in lesson_data:
+                    continue
+                self.pending.setdefault(teacher, []).append(
+                    [class_name, day_name, lesson_key, lesson_title(lesson_data), lesson_data.get('time', ''),
+                     lesson_data.get('number', '')])
+                self.pending_rows += 1
+        if self.pending_rows >= TEACHER_FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        for teacher, rows in self.pending.items():
+            new = teacher not in self.started
+            file_path = os.path.join(self.directory, self.names.get(teacher))
+            with open(file_path, 'w' if new else 'a', encoding=ENCODING, newline='',
+                      buffering=BUFFER_SIZE) as file:
+                writer = csv.writer(file, delimiter=';')
+                if new:
+                    writer.writerow(TEACHER_HEADER)
+                writer.writerows(rows)
+            self.started.add(teacher)
+        self.pending = {}
+        self.pending_rows = 0
+
+    def close(self):
+        self.flush()
+
+    def summary(self):
+        return f"Файлы по учителям ({len(self.started)}) созданы в {self.directory}"
+
+
+class SplitFiles:
+    """Основной файл, разделенный на части не больше max_bytes (по границам классов)."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.parts = 0
+        self.size = 0
+        self.file = None
+        for file_path in glob.glob(os.path.join(directory, f"{PART_PREFIX}*.csv")):
+            os.remove(file_path)
+
+    def write_class(self, class_name, days, block):
+        if self.file is None or (self.size and self.size + len(block) > self.max_bytes):
+            if self.file is not None:
+                self.file.close()
+            self.parts += 1
+            self.size = 0
+            self.file = open(os.path.join(self.directory, f"{PART_PREFIX}{self.parts:02d}.csv"), 'wb',
+                             buffering=BUFFER_SIZE)
+        if len(block) > self.max_bytes:
+            logging.warning(f"Класс {class_name} ({len(block)} байт) не помещается в часть размером "
+                            f"{self.max_bytes} байт и записан в отдельную часть")
+        self.file.write(block)
+        self.size += len(block)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def summary(self):
+        return f"Выгрузка разделена на части ({self.parts}) не больше {self.max_bytes} байт"
+
+
+def parse_target(spec):
+    """
+    Разбирает описание дополнительной цели выгрузки: 'class', 'teacher' или 'split:МБ'.
+    :raises ValueError: Неизвестная цель или неверный размер.
+    """
+    name, _, value = spec.partition(':')
+    if name in ('class', 'teacher') and not value:
+        return name, None
+    if name == 'split':
+        try:
+            size = float(value)
+        except ValueError:
+            size = 0
+        if size > 0:
+            return name, int(size * 1024 * 1024)
+    raise ValueError(f"Неизвестная цель выгрузки '{spec}' (допустимо: class, teacher, split:МБ)")
+
+
+def make_targets(base_dir, specs=(), output_csv_path=None):
+    """
+    Цели выгрузки в каталоге base_dir: GIS_schedule.csv и дополнительные цели specs (см. parse_target).
+    """
+    targets = [GisFile(output_csv_path or os.path.join(base_dir, 'GIS_schedule.csv'))]
+    for spec in specs:
+        name, value = parse_target(spec)
+        if name == 'class':
+            targets.append(ClassFiles(os.path.join(base_dir, CLASS_DIR)))
+        elif name == 'teacher':
+            targets.append(TeacherFiles(os.path.join(base_dir, TEACHER_DIR)))
+        else:
+            targets.append(SplitFiles(base_dir, value))
+    return targets
+
+
+def export(schedule, targets, render=None):
+    """
+    Один проход по классам расписания: блок каждого класса формируется один раз и передается всем целям.
+    :param render: Функция (расписание) -> [(класс, блок), ...], если блоки строятся вне этой функции
+                   (например, по частям в пуле процессов); по умолчанию - по одному классу при обходе.
+    """
+    try:
+        if render is None:
+            blocks = ((class_name, days, render_class(class_name, days))
+                      for class_name, days in iter_classes(schedule))
+        else:
+            blocks = ((class_name, schedule[class_name], block) for class_name, block in render(schedule))
+        for class_name, days, block in blocks:
+            logging.info(f"Обработка класса: {class_name}")
+            for target in targets:
+                target.write_class(class_name, days, block)
+    finally:
+        for target in targets:
+            target.close()
+    for target in targets:
+        logging.info(target.summary())
+
+
 def create_csv_schedule(json_file_path, output_csv_path):
     """
     Преобразует JSON-файл с расписанинием в CSV-файл.
@@ -16,99 +301,37 @@ def create_csv_schedule(json_file_path, output_csv_path):
     """
     logging.info("Начало работы функции create_csv_schedule.")
     logging.debug(f"JSON-файл: {json_file_path}, CSV-файл: {output_csv_path}")
-    
+
     try:
-        # Загружаем JSON-файл с расписанием
+        # Загружаем расписание (двоичный файл - без разбора классов, они читаются при обходе)
         logging.debug(f"Попытка загрузить JSON-файл: {json_file_path}")
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            schedule = json.load(file)
+        schedule = checkpoint.open_schedule(json_file_path)
         logging.info(f"JSON-файл успешно загружен: {json_file_path}.")
-        logging.debug(f"Содержимое JSON: {schedule}")
     except FileNotFoundError:
         logging.error(f"Файл {json_file_path} не найден.")
         return
-    except json.JSONDecodeError as e:
+    except ValueError as e:  # json.JSONDecodeError или checkpoint.CheckpointError
         logging.error(f"Ошибка декодирования JSON в файле {json_file_path}: {e}")
         return
     except Exception as e:
         logging.error(f"Неизвестная ошибка при загрузке JSON: {e}")
         return
-    
-    # Создаем CSV-файл
+
+    try:
+        write_csv_schedule(schedule, output_csv_path)
+    finally:
+        if isinstance(schedule, checkpoint.LazySchedule):
+            schedule.close()
+
+
+def write_csv_schedule(schedule, output_csv_path, render=None):
+    """
+    Записывает расписание (словарь, загруженный из JSON, или checkpoint.LazySchedule) в CSV-файл для ГИС СО.
+    :param render: См. export.
+    """
     try:
         logging.debug(f"Попытка создать CSV-файл: {output_csv_path}")
-        with open(output_csv_path, 'w', encoding='windows-1251', newline='') as csvfile:
-            writer = csv.writer(csvfile, delimiter=';')
-            
-            # Проходим по каждому классу в расписании
-            for class_name, days in schedule.items():
-                logging.info(f"Обработка класса: {class_name}")
-                logging.debug(f"Дни недели для класса {class_name}: {days.keys()}")
-                
-                # Записываем заголовок класса
-                writer.writerow([f"Класс: {class_name}"])
-                writer.writerow([])  # Пустая строка для читаемости
-                
-                # Записываем заголовки дней недели
-                writer.writerow(["", "", "Пн", "Вт", "Ср", "Чт", "Пт"])
-                writer.writerow([])  # Пустая строка
-                
-                # Определяем все уникальные номера уроков (включая .1)
-                all_lessons = set()
-                for day in days.values():
-                    all_lessons.update(day.keys())
-                all_lessons_sorted = sorted(all_lessons, key=lambda x: float(x.split('.')[0]))
-                logging.debug(f"Все уроки для класса {class_name}: {all_lessons_sorted}")
-                
-                # Проходим по каждому уроку
-                for lesson_key in all_lessons_sorted:
-                    logging.debug(f"Обработка урока {lesson_key} в классе {class_name}")
-                    
-                    # Создаем строку для текущего урока
-                    row = ["", lesson_key]  # Первый столбец пустой, второй — номер урока
-                    
-                    # Проходим по каждому дню недели
-                    for day_name, lessons in days.items():
-                        logging.debug(f"Проверка дня {day_name} для урока {lesson_key}")
-                        
-                        # Если урок существует в текущем дне, добавляем его данные
-                        lesson_data = lessons.get(lesson_key, {})
-                        logging.debug(f"Данные урока {lesson_key} в день {day_name}: {lesson_data}")
-                        
-                        # Инициализируем ячейку как пустую строку
-                        cell_content = ""
-                        
-                        if all(key in lesson_data for key in ['lesson', 'teach', 'time']):
-                            # Формируем название предмета с группой (если группа есть)
-                            lesson_name = lesson_data['lesson']
-                            if lesson_data.get('groups'):
-                                lesson_name += f" ({lesson_data['groups']})"
-                            
-                            # Собираем основные данные
-                            cell_content = f"{lesson_name}\n{lesson_data['teach']}\n{lesson_data['time']}"
-                            
-                            # Добавляем номер кабинета, если он есть
-                            if lesson_data.get('number'):
-                                cell_content += f"\n{lesson_data['number']}"
-                        
-                        # Убираем лишний перенос строки в конце
-                        cell_content = cell_content.rstrip('\n') if cell_content else ""
-                        
-                        # Если ячейка пустая, оставляем ее такой
-                        row.append(cell_content)
-                        
-                        logging.debug(f"Данные урока {lesson_key} в день {day_name} добавлены в строку.")
-                    
-                    # Записываем строку с данными урока в CSV
-                    writer.writerow(row)
-                    logging.debug(f"Строка для урока {lesson_key} записана в CSV.")
-                
-                # Добавляем пустые строки между классами для читаемости
-                writer.writerow([])
-                writer.writerow([])
-                logging.debug(f"Добавлены пустые строки после класса {class_name}.")
-        
-        logging.info(f"CSV-файл успешно создан: {output_csv_path}")
+        export(schedule, [GisFile(output_csv_path)], render)
     except Exception as e:
         logging.error(f"Ошибка при создании CSV-файла: {e}")
 
@@ -123,8 +346,8 @@ if __name__ == "__main__":
     logging.info("Начало работы скрипта.")
     logging.info(f"JSON-файл: {json_file_path}")
     logging.info(f"Выходной CSV-файл: {output_csv_path}")
-    
+
     # Создаем CSV-файл
     create_csv_schedule(json_file_path, output_csv_path)
-    
-    logging.info("Работа скрипта завершена.")
\ No newline at end of file
+
+    logging.info("Работа скрипта завершена.")
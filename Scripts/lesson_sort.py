@@ -1,8 +1,8 @@
-import json
 import logging
 from collections import OrderedDict
 import os
 import time
+import checkpoint
 
 # Настройка логирования
 logging.basicConfig(
@@ -14,8 +14,7 @@ logging.basicConfig(
 def load_raspisanie(file_path):
     """Загружает данные из raspisanie_null_lesson_added.json."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        data = checkpoint.load(file_path)
         return data
     except FileNotFoundError:
         logging.error("Файл raspisanie_null_lesson_added.json не найден")
@@ -51,7 +50,6 @@ if __name__ == "__main__":
     
     # Сохранение результатов
     output_file_path = os.path.join(script_dir, 'raspisanie_sorted_schedule.json')
-    with open(output_file_path, 'w', encoding='utf-8') as file:
-        json.dump(updated_data, file, ensure_ascii=False, indent=4)
+    checkpoint.dump(updated_data, output_file_path)
     logging.info(f"Файл успешно обработан и сохранен как {output_file_path}")
     time.sleep(2)
\ No newline at end of file
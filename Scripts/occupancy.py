@@ -0,0 +1,202 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from reference_catalog import klass_from_rows, normalize, room_key, room_name
+from validation import NO_ROOM
+
+# Занятость кабинетов: матрица кабинет x (день, урок) из итогового расписания.
+# Строки - кабинеты справочника klass.csv (в его порядке), затем кабинеты, которых в справочнике нет
+# (названия сопоставляются по reference_catalog.room_key: "108.0" из ячейки pandas - тот же кабинет, что "108");
+# столбцы - все (день, номер урока) расписания, подгруппы (.1) занимают период основного урока.
+# Свободные кабинеты, загрузка кабинетов и самые загруженные периоды считаются операциями над
+# массивом NumPy; матрицы нескольких школ объединяются в одну для района (combine).
+# На диске матрица хранится упакованной по битам (save/load, .npz).
+
+SCHEDULE_FILE = "raspisanie_replace_lessons.json"
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]  # Порядок дней в столбцах
+
+
+def load_rooms(school_dir):
+    """Кабинеты из klass.csv (reference_catalog.klass_from_rows); нет файла - пустой список."""
+    file_path = os.path.join(school_dir, "klass.csv")
+    if not os.path.isfile(file_path):
+        return []
+    with open(file_path, 'r', encoding='windows-1251') as file:
+        return [room for room in klass_from_rows(csv.reader(file, delimiter=';')) if room]
+
+
+def period_order(period):
+    day, slot = period
+    return DAYS.index(day) if day in DAYS else len(DAYS), day, slot
+
+
+class Occupancy:
+    """Матрица занятости: matrix[кабинет, период] - True, если в кабинете идет урок."""
+    __slots__ = ("rooms", "periods", "matrix", "unknown", "_rows", "_columns")
+
+    def __init__(self, rooms, periods, matrix, unknown=()):
+        """
+        :param rooms: Названия кабинетов (строки матрицы).
+        :param periods: Пары (день, номер урока) - столбцы матрицы.
+        :param matrix: Логический массив len(rooms) x len(periods).
+        :param unknown: Кабинеты из расписания, которых нет в справочнике.
+        """
+        self.rooms = list(rooms)
+        self.periods = [tuple(period) for period in periods]
+        self.matrix = np.asarray(matrix, dtype=bool)
+        self.unknown = set(unknown)
+        self._rows = {room_key(room): row for row, room in enumerate(self.rooms)}
+        self._columns = {(normalize(day), slot): column for column, (day, slot) in enumerate(self.periods)}
+
+    @classmethod
+    def from_schedule(cls, data, rooms=(), prefix=""):
+        """
+        Строит матрицу за один обход расписания.
+        :param data: Расписание в формате raspisanie*.json (словарь или checkpoint.LazySchedule).
+        :param rooms: Кабинеты справочника klass (строки матрицы в этом порядке).
+        :param prefix: Приставка к названиям кабинетов (школа в районной матрице).
+        """
+        room_rows = {}  # Ключ кабинета -> строка
+        names = []  # Названия строк: из справочника, для остальных - из расписания
+        for room in rooms:
+            if room_key(room) not in room_rows:
+                room_rows[room_key(room)] = len(names)
+                names.append(room_name(room))
+        known = len(names)
+        periods = {}
+        rows, columns = [], []
+        for _, days in (data.stream() if hasattr(data, "stream") else data.items()):
+            for day, lessons in days.items():
+                for lesson_number in lessons:
+                    period = (day, int(lesson_number.partition('.')[0]))
+                    column = periods.setdefault(period, len(periods))
+                    room = room_name(lessons[lesson_number].get("number", ""))
+                    if room and room != NO_ROOM:
+                        key = room_key(room)
+                        if key not in room_rows:
+                            room_rows[key] = len(names)
+                            names.append(room)
+                        rows.append(room_rows[key])
+                        columns.append(column)
+        # Столбцы - в порядке дней и уроков, а не в порядке появления
+        ordered = sorted(periods, key=period_order)
+        position = np.empty(len(periods), dtype=np.intp)
+        position[[periods[period] for period in ordered]] = np.arange(len(ordered))
+        matrix = np.zeros((len(names), len(ordered)), dtype=bool)
+        matrix[np.asarray(rows, dtype=np.intp), position[np.asarray(columns, dtype=np.intp)]] = True
+        return cls([prefix + room for room in names], ordered, matrix,
+                   [prefix + room for room in names[known:]])
+
+    @classmethod
+    def combine(cls, occupancies):
+        """Районная матрица: строки всех школ, столбцы - объединение периодов."""
+        occupancies = list(occupancies)
+        periods = sorted({period for item in occupancies for period in item.periods}, key=period_order)
+        columns = {period: column for column, period in enumerate(periods)}
+        matrix = np.zeros((sum(len(item.rooms) for item in occupancies), len(periods)), dtype=bool)
+        row = 0
+        for item in occupancies:
+            matrix[row:row + len(item.rooms), [columns[period] for period in item.periods]] = item.matrix
+            row += len(item.rooms)
+        return cls([room for item in occupancies for room in item.rooms], periods, matrix,
+                   set().union(*(item.unknown for item in occupancies)))
+
+    def free_rooms(self, day, slot, rooms=None):
+        """
+        Свободные кабинеты в период (день, номер урока); неизвестный период - все кабинеты.
+        :param rooms: Искать только среди этих кабинетов (сопоставляются по room_key).
+        """
+        if rooms is None:
+            candidates = np.arange(len(self.rooms))
+        else:
+            candidates = np.array([self._rows[room_key(room)] for room in rooms if room_key(room) in self._rows],
+                                  dtype=np.intp)
+        column = self._columns.get((normalize(day), int(slot)))
+        if column is not None:
+            candidates = candidates[~self.matrix[candidates, column]]
+        return [self.rooms[row] for row in candidates]
+
+    def busy_periods(self, room):
+        """Периоды, в которые кабинет занят."""
+        return [self.periods[column] for column in np.flatnonzero(self.matrix[self._rows[room_key(room)]])]
+
+    def utilization(self):
+        """Загрузка каждого кабинета, % периодов с уроками (массив в порядке rooms)."""
+        if not self.periods:
+            return np.zeros(len(self.rooms))
+        return self.matrix.mean(axis=1) * 100
+
+    def peak_periods(self, top=5):
+        """Самые загруженные периоды: [(день, урок, занято кабинетов, % кабинетов), ...]."""
+        busy = self.matrix.sum(axis=0)
+        share = busy / len(self.rooms) * 100 if self.rooms else np.zeros(len(busy))
+        order = np.argsort(-busy, kind='stable')[:top]
+        return [(*self.periods[column], int(busy[column]), float(share[column])) for column in order]
+
+    def save(self, file_path):
+        """Записывает матрицу в .npz, упакованную по битам (1 бит на кабинет и период)."""
+        np.savez_compressed(file_path, bits=np.packbits(self.matrix, axis=1),
+                            rooms=np.array(self.rooms, dtype=str),
+                            days=np.array([day for day, _ in self.periods], dtype=str),
+                            slots=np.array([slot for _, slot in self.periods], dtype=np.int64),
+                            unknown=np.array(sorted(self.unknown), dtype=str))
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as archive:
+            periods = list(zip(archive["days"].tolist(), archive["slots"].tolist()))
+            matrix = np.unpackbits(archive["bits"], axis=1, count=len(periods)).astype(bool)
+            return cls(archive["rooms"].tolist(), periods, matrix, archive["unknown"].tolist())
+
+
+def school_occupancy(school_dir, prefix=""):
+    """Матрица школы по итоговому расписанию и klass.csv ее каталога."""
+    import checkpoint
+
+    schedule = checkpoint.open_schedule(os.path.join(school_dir, SCHEDULE_FILE))
+    try:
+        return Occupancy.from_schedule(schedule, load_rooms(school_dir), prefix)
+    finally:
+        if isinstance(schedule, checkpoint.LazySchedule):
+            schedule.close()
+
+
+def print_report(occupancy, top=5):
+    """Загрузка кабинетов (по убыванию) и самые загруженные периоды."""
+    percent = occupancy.utilization()
+    print(f"Кабинетов: {len(occupancy.rooms)}, периодов: {len(occupancy.periods)}, "
+          f"средняя загрузка: {percent.mean() if len(percent) else 0:.1f}%")
+    for row in np.argsort(-percent, kind='stable'):
+        mark = " (нет в справочнике)" if occupancy.rooms[row] in occupancy.unknown else ""
+        print(f"  {occupancy.rooms[row]:<24} {percent[row]:6.1f}%{mark}")
+    print("Самые загруженные периоды:")
+    for day, slot, busy, share in occupancy.peak_periods(top):
+        print(f"  {day} {slot} урок: занято {busy} ({share:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Занятость кабинетов по итоговому расписанию")
+    parser.add_argument("dirs", nargs="+", help="каталоги школ (несколько - сводная матрица района)")
+    parser.add_argument("--free", nargs=2, metavar=("ДЕНЬ", "УРОК"), help="вывести свободные кабинеты в период")
+    parser.add_argument("--top", type=int, default=5, help="число самых загруженных периодов в отчете")
+    parser.add_argument("--save", metavar="ФАЙЛ", help="сохранить матрицу в .npz")
+    args = parser.parse_args()
+
+    if len(args.dirs) == 1:
+        result = school_occupancy(args.dirs[0])
+    else:
+        result = Occupancy.combine(school_occupancy(school_dir, f"{os.path.basename(os.path.abspath(school_dir))}/")
+                                   for school_dir in args.dirs)
+    if args.free:
+        day, slot = args.free
+        rooms = result.free_rooms(day, slot)
+        print(f"Свободно в {day}, {slot} урок: {len(rooms)}")
+        for room in rooms:
+            print(f"  {room}")
+    else:
+        print_report(result, args.top)
+    if args.save:
+        result.save(args.save)
@@ -0,0 +1,882 @@
+import argparse
+import functools
+import json
+import logging
+import os
+import time
+
+# Встроенный конвейер обработки расписания.
+# Все этапы выполняются в одном интерпретаторе: функции этапов импортируются
+# из соответствующих скриптов и вызываются по порядку, без пауз между ними.
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Исходные Excel-файлы (как в exel_to_csv.py)
+EXCEL_FILES = ['raspisanie.xlsx', 'klass.xlsx', 'lesson.xlsx', 'groups.xlsx', 'zamena.xlsx']
+# Справочники, которые можно загрузить заранее и передать в run_pipeline(catalogs=...):
+# файл -> ключ в catalogs (klass и lesson - справочники ГИС СО ЕЦП, общие для всех школ)
+CATALOG_FILES = {'klass.xlsx': 'klass', 'lesson.xlsx': 'lesson', 'zamena.xlsx': 'replacements'}
+
+
+def configure_logging(base_dir):
+    """Направляет записи всех этапов в log.log рабочего каталога.
+
+    Настройка выполняется до импорта скриптов, поэтому их logging.basicConfig
+    уже ничего не меняет. Файл открывается отложенно, чтобы этап delete мог
+    удалить старый log.log.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(os.path.join(base_dir, 'log.log'), encoding='cp1251', errors='replace', delay=True)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    return handler
+
+
+def path(ctx, file_name):
+    """Возвращает путь к файлу внутри рабочего каталога запуска."""
+    return os.path.join(ctx['base_dir'], file_name)
+
+
+def load_json(file_path):
+    """Читает промежуточный файл расписания в любом формате (checkpoint.py)."""
+    import checkpoint
+    return checkpoint.load(file_path)
+
+
+def dump_json(data, file_path, fmt='json'):
+    """Записывает промежуточный файл расписания в формате fmt (checkpoint.FORMATS)."""
+    import checkpoint
+    checkpoint.dump(data, file_path, fmt)
+
+
+def take_schedule(ctx, file_name, loader=load_json):
+    """
+    Возвращает расписание для очередного этапа.
+    В режиме in_memory берется объект, оставленный предыдущим этапом,
+    иначе (или если его нет) расписание читается из промежуточного файла.
+    """
+    if ctx.get('in_memory') and ctx.get('data') is not None:
+        data = ctx['data']
+        # В режиме columnar этапам над словарями таблица передается в виде словаря
+        return data if isinstance(data, dict) else data.to_json()
+    return loader(path(ctx, file_name))
+
+
+def columnar(ctx):
+    """Включен ли табличный режим (--model columnar)."""
+    return ctx.get('model') == 'columnar'
+
+
+def take_table(ctx, file_name, loader=load_json):
+    """Возвращает расписание для табличного этапа (columnar.ColumnarSchedule)."""
+    from columnar import ColumnarSchedule
+    if ctx.get('in_memory') and isinstance(ctx.get('data'), ColumnarSchedule):
+        return ctx['data']
+    return ColumnarSchedule.from_json(take_schedule(ctx, file_name, loader))
+
+
+def put_schedule(ctx, stage_name, data, file_name):
+    """
+    Передает расписание следующему этапу.
+    В режиме in_memory промежуточный файл пишется только для этапов,
+    перечисленных в checkpoints (или для всех при 'all').
+    """
+    ctx['data'] = data
+    checkpoints = ctx.get('checkpoints', ())
+    if not ctx.get('in_memory') or stage_name in checkpoints or 'all' in checkpoints:
+        dump_json(data if isinstance(data, dict) else data.to_json(), path(ctx, file_name),
+                  ctx.get('checkpoint_format', 'json'))
+
+
+def transform(ctx, stage_name, func, data, deps=None):
+    """
+    Применяет функцию этапа к расписанию. С кэшем классов (class_cache.py) функция
+    выполняется только для классов, результата которых нет в кэше; с пулом классов
+    (class_pool.py) - по частям в рабочих процессах.
+    :param deps: Функция (класс) -> строка с данными, от которых зависит результат для класса.
+    """
+    if ctx.get('classes') is not None:
+        return ctx['classes'].apply(stage_name, STAGE_INFO[stage_name]["modules"], func, data, deps)
+    if ctx.get('executor') is not None:
+        return ctx['executor'].apply(func, data)
+    return func(data)
+
+
+def normalize_grid(data):
+    """Пустые уроки и порядок ключей через сетку schedule_model (model='grid')."""
+    from schedule_model import Schedule
+    return Schedule.from_json(data).normalize().to_json()
+
+
+# --- Этапы конвейера ---
+
+def stage_delete(ctx):
+    import delete
+    delete.delete_files([path(ctx, name) for name in delete.files_to_delete])
+
+
+def stage_excel_to_csv(ctx):
+    # Общие справочники, загруженные заранее (пакетный режим), не читаются;
+    # ctx['workbooks'] - только измененные книги (режим наблюдения, watch.py)
+    names = [name for name in ctx.get('workbooks') or EXCEL_FILES
+             if CATALOG_FILES.get(name) not in (ctx.get('catalogs') or {})]
+    if ctx.get('source') == 'xlsx':
+        # Книги читаются напрямую, без CSV и pandas; результат остается в ctx['sources']
+        import xlsx_reader
+        sources = xlsx_reader.load_inputs(ctx['base_dir'], names, export_csv=ctx.get('export_csv'))
+        if sources is None:
+            logging.info("Этап завершил работу из-за отсутствия файлов.")
+        elif ctx.get('workbooks') and ctx.get('sources'):
+            # Данные остальных книг остаются от предыдущего запуска
+            sources = {**ctx['sources'], **sources}
+        ctx['sources'] = sources
+        return
+
+    import exel_to_csv
+    files = [path(ctx, name) for name in names]
+    if not exel_to_csv.check_files(files):
+        logging.info("Этап завершил работу из-за отсутствия файлов.")
+        return
+    for file_name in files:
+        exel_to_csv.convert_excel_to_csv(file_name)
+
+
+def source(ctx, name):
+    """Данные, прочитанные напрямую из Excel (режим source='xlsx'), или None."""
+    sources = ctx.get('sources')
+    return sources.get(name) if sources else None
+
+
+def stage_csv_to_json(ctx):
+    import csv_to_json
+    data = source(ctx, 'schedule')
+    if data is None:
+        data = csv_to_json.parse_csv_schedule(path(ctx, 'raspisanie.csv'))
+    if data is not None:
+        put_schedule(ctx, 'csv_to_json', data, 'raspisanie.json')
+
+
+def load_catalogs(ctx):
+    """
+    Возвращает справочники (klass, lesson) как ReferenceCatalog: каждый - общий из ctx, прочитанный
+    из Excel или из CSV рабочего каталога (книга школы заменяет только свой справочник).
+    Справочники строятся один раз за запуск и используются обоими этапами проверки (FindError и Final_check).
+    """
+    if ctx.get('references') is None:
+        from reference_catalog import ReferenceCatalog, load_klass, load_lesson
+        catalogs = ctx.get('catalogs') or {}
+        loaders = {'klass': load_klass, 'lesson': load_lesson}
+        references = []
+        for name, loader in loaders.items():
+            if name in catalogs:
+                values = catalogs[name]
+            elif source(ctx, name) is not None:
+                values = source(ctx, name)
+            else:
+                values = loader(path(ctx, f'{name}.csv'))
+            references.append(ReferenceCatalog.of(values))
+        ctx['references'] = tuple(references)
+    return ctx['references']
+
+
+def stage_find_error(ctx):
+    import FindError
+    klass, lesson = load_catalogs(ctx)
+    if columnar(ctx):
+        import columnar as table
+        errors = table.find_errors(take_table(ctx, 'raspisanie.json'), klass, lesson)
+    else:
+        errors = FindError.find_errors(take_schedule(ctx, 'raspisanie.json'), klass, lesson)
+    count_mismatches(ctx, errors)
+    FindError.write_errors(errors, path(ctx, 'error.log'))
+
+
+def count_mismatches(ctx, errors):
+    """Счетчики событий по строкам ошибок FindError и Final_check."""
+    import events
+    events.count(ctx, 'unknown_subject', sum(1 for error in errors if "Несоответствие в lesson" in error))
+    events.count(ctx, 'unknown_room', sum(1 for error in errors if "Несоответствие в number" in error))
+
+
+def stage_add_key(ctx):
+    import add_key
+    if columnar(ctx):
+        import columnar as table
+        data = table.add_keys(take_table(ctx, 'raspisanie.json', add_key.load_raspisanie))
+    else:
+        data = transform(ctx, 'add_key', add_key.add_keys,
+                         take_schedule(ctx, 'raspisanie.json', add_key.load_raspisanie))
+    put_schedule(ctx, 'add_key', data, 'raspisanie_key_added.json')
+
+
+def stage_sinh_time(ctx):
+    import sinh_time
+    if columnar(ctx):
+        import columnar as table
+        data = table.set_sinh_time(take_table(ctx, 'raspisanie_key_added.json', sinh_time.load_raspisanie))
+    else:
+        data = transform(ctx, 'sinh_time', sinh_time.set_sinh_time,
+                         take_schedule(ctx, 'raspisanie_key_added.json', sinh_time.load_raspisanie))
+    put_schedule(ctx, 'sinh_time', data, 'raspisanie_sinh_time.json')
+
+
+def stage_add_groups(ctx):
+    import add_groups
+    import events
+    # Ошибки привязки групп, как и при запуске скрипта, дублируются в err_groups.log
+    error_handler = logging.FileHandler(path(ctx, 'err_groups.log'), mode='w', encoding='cp1251', delay=True)
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    add_groups.logger.addHandler(error_handler)
+    group_errors = events.EventCounter()
+    add_groups.logger.addHandler(group_errors)
+    try:
+        groups_data = source(ctx, 'groups')
+        if groups_data is None:
+            groups_data = add_groups.load_groups_csv(path(ctx, 'groups.csv'))
+        if columnar(ctx):
+            import columnar as table
+            data = take_table(ctx, 'raspisanie_sinh_time.json', add_groups.load_raspisanie)
+            data = table.add_groups(data, groups_data, add_groups.logger)
+        else:
+            data = take_schedule(ctx, 'raspisanie_sinh_time.json', add_groups.load_raspisanie)
+            # Результат для класса зависит только от строк groups.csv этого класса
+            by_class = {}
+            for key, groups in groups_data.items():
+                by_class.setdefault(key[0], []).append((key, groups))
+            data = transform(ctx, 'add_groups', functools.partial(add_groups.add_groups, groups_data=groups_data), data,
+                             lambda class_name: repr(by_class.get(class_name.lower(), [])))
+        put_schedule(ctx, 'add_groups', data, 'raspisanie_groups_added.json')
+    finally:
+        add_groups.logger.removeHandler(error_handler)
+        add_groups.logger.removeHandler(group_errors)
+        error_handler.close()
+    events.count(ctx, 'group_errors', group_errors.errors)
+
+
+def stage_all_null_lesson(ctx):
+    import all_null_lesson
+    if columnar(ctx):
+        import columnar as table
+        data = table.add_missing_keys(take_table(ctx, 'raspisanie_groups_added.json', all_null_lesson.load_raspisanie))
+        if data is not None:
+            put_schedule(ctx, 'all_null_lesson', data, 'raspisanie_null_lesson_added.json')
+            return
+        # Нестандартные ключи: исходная функция над словарями
+    data = take_schedule(ctx, 'raspisanie_groups_added.json', all_null_lesson.load_raspisanie)
+    if ctx.get('model') == 'grid':
+        # Сетка сразу дает и пустые уроки, и правильный порядок ключей
+        data = transform(ctx, 'all_null_lesson', normalize_grid, data, lambda class_name: 'grid')
+    else:
+        data = transform(ctx, 'all_null_lesson', all_null_lesson.add_missing_keys, data)
+    put_schedule(ctx, 'all_null_lesson', data, 'raspisanie_null_lesson_added.json')
+
+
+def stage_lesson_sort(ctx):
+    import lesson_sort
+    if columnar(ctx):
+        import columnar as table
+        data = table.sort_lessons(take_table(ctx, 'raspisanie_null_lesson_added.json', lesson_sort.load_raspisanie))
+        if data is not None:
+            put_schedule(ctx, 'lesson_sort', data, 'raspisanie_sorted_schedule.json')
+            return
+    data = take_schedule(ctx, 'raspisanie_null_lesson_added.json', lesson_sort.load_raspisanie)
+    if ctx.get('model') != 'grid':
+        data = transform(ctx, 'lesson_sort', lesson_sort.sort_lessons, data)
+    put_schedule(ctx, 'lesson_sort', data, 'raspisanie_sorted_schedule.json')
+
+
+def stage_update_cab(ctx):
+    import update_cab
+    if columnar(ctx):
+        import columnar as table
+        data = table.update_dot_one_fields(take_table(ctx, 'raspisanie_sorted_schedule.json',
+                                                      update_cab.load_raspisanie))
+    else:
+        data = transform(ctx, 'update_cab', update_cab.update_dot_one_fields,
+                         take_schedule(ctx, 'raspisanie_sorted_schedule.json', update_cab.load_raspisanie))
+    put_schedule(ctx, 'update_cab', data, 'raspisanie_cab_updated.json')
+
+
+def load_group_lessons(ctx):
+    """Предметы, которые делятся на группы (из groups.xlsx или groups.csv)."""
+    import check_group
+    lessons = source(ctx, 'group_lessons')
+    if lessons is None:
+        lessons = check_group.load_group_lessons(path(ctx, 'groups.csv'))
+    return lessons
+
+
+def load_replacements(ctx):
+    """Замены названий уроков (заранее загруженные, из zamena.xlsx или zamena.csv)."""
+    import update_lesson_gis
+    shared = (ctx.get('catalogs') or {}).get('replacements')
+    if shared is not None:
+        # Собранный движок используется повторно; счетчики срабатываний - свои у каждого запуска
+        return shared.fork() if isinstance(shared, update_lesson_gis.ReplacementEngine) else shared
+    replacements = source(ctx, 'replacements')
+    if replacements is None:
+        replacements = update_lesson_gis.load_replacements(path(ctx, 'zamena.csv'))
+    return replacements
+
+
+def stage_check_group(ctx):
+    import check_group
+    import events
+    lessons = load_group_lessons(ctx)
+    check = check_group.check_groups
+    if columnar(ctx):
+        import columnar as table
+        schedule, check = take_table(ctx, 'raspisanie_cab_updated.json'), table.check_groups
+    else:
+        schedule = take_schedule(ctx, 'raspisanie_cab_updated.json')
+    missing = check(schedule, lessons, path(ctx, 'log.log'), path(ctx, 'chech_groups.log'))
+    # check_group пишет в log.log напрямую, минуя logging, поэтому ошибки учитываются здесь
+    events.count(ctx, 'missing_group', missing)
+    events.count(ctx, 'errors', missing)
+
+
+def stage_update_lesson_gis(ctx):
+    import update_lesson_gis
+    replacements = load_replacements(ctx)
+    if columnar(ctx):
+        import columnar as table
+        data = table.replace_lessons(take_table(ctx, 'raspisanie_cab_updated.json'), replacements)
+    elif ctx.get('classes') is not None:
+        engine = update_lesson_gis.ReplacementEngine.of(replacements)
+        rules = repr(list(engine.replacements.items()))
+
+        def replace(part):
+            update_lesson_gis.apply_replacements(part, engine)
+            return part
+
+        data = transform(ctx, 'update_lesson_gis', replace, take_schedule(ctx, 'raspisanie_cab_updated.json'),
+                         lambda class_name: rules)
+        engine.report()
+    elif ctx.get('executor') is not None:
+        # Части обрабатываются в рабочих процессах; счетчики срабатываний правил суммируются
+        engine = update_lesson_gis.ReplacementEngine.of(replacements)
+        data, changes_made = {}, False
+        for part, fired, changed in ctx['executor'].map(
+                functools.partial(update_lesson_gis.replace_part, replacements=engine.replacements),
+                take_schedule(ctx, 'raspisanie_cab_updated.json')):
+            data.update(part)
+            changes_made = changes_made or changed
+            for rule, count in fired.items():
+                engine.fired[rule] += count
+        if not changes_made:
+            logging.info("Нет изменений для применения.")
+        engine.report()
+    else:
+        data = update_lesson_gis.replace_lessons(take_schedule(ctx, 'raspisanie_cab_updated.json'), replacements)
+    put_schedule(ctx, 'update_lesson_gis', data, 'raspisanie_replace_lessons.json')
+
+
+def stage_final_check(ctx):
+    import Final_check
+    klass, lesson = load_catalogs(ctx)
+    if columnar(ctx):
+        import columnar as table
+        errors = table.find_errors(take_table(ctx, 'raspisanie_replace_lessons.json'), klass, lesson,
+                                   skip_no_room=True)
+    else:
+        errors = Final_check.final_check(take_schedule(ctx, 'raspisanie_replace_lessons.json'), klass, lesson)
+    count_mismatches(ctx, errors)
+    Final_check.write_errors(errors, path(ctx, 'final_error.log'))
+
+
+def stage_validate(ctx):
+    """
+    Все проверки (validation.py) за один обход итогового расписания; заменяет этапы
+    FindError, check_group и Final_check в режиме validation='engine'.
+    """
+    import events
+    import update_lesson_gis
+    import validation
+    klass, lesson = load_catalogs(ctx)
+    # check_group сверяет названия до замен из zamena.csv, поэтому к предметам с группами
+    # добавляются и их названия после замен
+    group_lessons = set(load_group_lessons(ctx))
+    engine = update_lesson_gis.ReplacementEngine.of(load_replacements(ctx))
+    group_lessons.update([engine.replace(name) for name in group_lessons])
+    data = take_schedule(ctx, 'raspisanie_replace_lessons.json')
+    findings = validation.validate(data, {'klass': klass, 'lesson': lesson, 'group_lessons': group_lessons})
+    findings.write_jsonl(path(ctx, validation.FINDINGS_FILE))
+    ctx['findings'] = findings
+    for rule, value in findings.by_rule().items():
+        events.count(ctx, rule, value)
+
+
+def stage_json_to_gis(ctx):
+    import checkpoint
+    import json_to_GIS_SO
+    if columnar(ctx) and not ctx.get('exports'):
+        import columnar as table
+        table.write_csv_schedule(take_table(ctx, 'raspisanie_replace_lessons.json'), path(ctx, 'GIS_schedule.csv'))
+        return
+    render = None
+    if ctx.get('executor') is not None:
+        schedule = take_schedule(ctx, 'raspisanie_replace_lessons.json')
+
+        def render(part):
+            return [block for blocks in ctx['executor'].map(json_to_GIS_SO.render_classes, part) for block in blocks]
+    else:
+        # Двоичный промежуточный файл читается по одному классу во время выгрузки
+        schedule = take_schedule(ctx, 'raspisanie_replace_lessons.json', checkpoint.open_schedule)
+    try:
+        json_to_GIS_SO.export(schedule, json_to_GIS_SO.make_targets(ctx['base_dir'], ctx.get('exports') or ()),
+                              render)
+    finally:
+        if isinstance(schedule, checkpoint.LazySchedule):
+            schedule.close()
+
+
+def stage_delta_export(ctx):
+    """Файл ГИС только с классами, изменившимися с прошлого запуска (только с кэшем классов)."""
+    if ctx.get('classes') is None:
+        return
+    import class_cache
+    ctx['classes'].export_delta(take_schedule(ctx, 'raspisanie_replace_lessons.json'),
+                                path(ctx, class_cache.DELTA_FILE), path(ctx, class_cache.CHANGES_FILE))
+
+
+# Порядок этапов повторяет scripts_to_run из Lider.py; validate выполняется вместо
+# FindError, check_group и Final_check только в режиме validation='engine'
+STAGES = [
+    ("delete", stage_delete),
+    ("exel_to_csv", stage_excel_to_csv),
+    ("csv_to_json", stage_csv_to_json),
+    ("FindError", stage_find_error),
+    ("add_key", stage_add_key),
+    ("sinh_time", stage_sinh_time),
+    ("add_groups", stage_add_groups),
+    ("all_null_lesson", stage_all_null_lesson),
+    ("lesson_sort", stage_lesson_sort),
+    ("update_cab", stage_update_cab),
+    ("check_group", stage_check_group),
+    ("update_lesson_gis", stage_update_lesson_gis),
+    ("Final_check", stage_final_check),
+    ("validate", stage_validate),
+    ("json_to_GIS_SO", stage_json_to_gis),
+    ("delta_export", stage_delta_export),
+]
+
+# Этапы проверки для каждого режима validation
+VALIDATION_STAGES = {
+    'legacy': ["FindError", "check_group", "Final_check"],
+    'engine': ["validate"],
+}
+
+# Сведения для кэша этапов (stage_cache.py): модули с кодом этапа, читаемые им исходные
+# файлы, записываемые файлы и признак того, что этап изменяет расписание.
+# state - другие ключи ctx, которые этап заполняет и которые нужно сохранить в кэше
+# (в цепочку ключей этапов, изменяющих расписание, они не входят).
+# Этапы delete и delta_export (сравнивает результат с прошлым запуском) не кэшируются.
+STAGE_INFO = {
+    "exel_to_csv": {"modules": ["exel_to_csv", "xlsx_reader", "csv_to_json", "reference_catalog"],
+                    "inputs": EXCEL_FILES,
+                    "outputs": ['raspisanie.csv', 'klass.csv', 'lesson.csv', 'groups.csv', 'zamena.csv'],
+                    "data": False, "state": ['sources']},
+    "csv_to_json": {"modules": ["csv_to_json", "reference_catalog"], "inputs": ['raspisanie.csv'],
+                    "outputs": ['raspisanie.json'], "data": True},
+    "FindError": {"modules": ["FindError", "reference_catalog", "columnar"], "inputs": ['klass.csv', 'lesson.csv'],
+                  "outputs": ['error.log'], "data": False},
+    "add_key": {"modules": ["add_key", "columnar"], "inputs": [],
+                "outputs": ['raspisanie_key_added.json'], "data": True},
+    "sinh_time": {"modules": ["sinh_time", "columnar"], "inputs": [],
+                  "outputs": ['raspisanie_sinh_time.json'], "data": True},
+    "add_groups": {"modules": ["add_groups", "columnar"], "inputs": ['groups.csv'],
+                   "outputs": ['raspisanie_groups_added.json', 'err_groups.log'], "data": True},
+    "all_null_lesson": {"modules": ["all_null_lesson", "schedule_model", "columnar"], "inputs": [],
+                        "outputs": ['raspisanie_null_lesson_added.json'], "data": True},
+    "lesson_sort": {"modules": ["lesson_sort", "columnar"], "inputs": [],
+                    "outputs": ['raspisanie_sorted_schedule.json'], "data": True},
+    "update_cab": {"modules": ["update_cab", "columnar"], "inputs": [],
+                   "outputs": ['raspisanie_cab_updated.json'], "data": True},
+    # Строки, которые check_group пишет в log.log напрямую, при попадании в кэш не повторяются;
+    # сами ошибки восстанавливаются в chech_groups.log
+    "check_group": {"modules": ["check_group", "columnar"], "inputs": ['groups.csv'],
+                    "outputs": ['chech_groups.log'], "data": False},
+    "update_lesson_gis": {"modules": ["update_lesson_gis", "columnar"], "inputs": ['zamena.csv'],
+                          "outputs": ['raspisanie_replace_lessons.json'], "data": True},
+    "Final_check": {"modules": ["Final_check", "FindError", "reference_catalog", "columnar"],
+                    "inputs": ['klass.csv', 'lesson.csv'],
+                    "outputs": ['final_error.log'], "data": False},
+    "validate": {"modules": ["validation", "reference_catalog", "FindError", "check_group", "update_lesson_gis"],
+                 "inputs": ['klass.csv', 'lesson.csv', 'groups.csv', 'zamena.csv'],
+                 "outputs": ['findings.jsonl'], "data": False, "state": ['findings']},
+    "json_to_GIS_SO": {"modules": ["json_to_GIS_SO", "columnar"], "inputs": [],
+                       "outputs": ['GIS_schedule.csv'], "data": False},
+}
+
+
+def catalog_values(values):
+    """Содержимое заранее загруженного справочника для ключа кэша."""
+    if hasattr(values, 'replacements'):  # update_lesson_gis.ReplacementEngine
+        values = values.replacements
+    return list(values.items()) if isinstance(values, dict) else list(values)
+
+
+def cache_options(ctx):
+    """Параметры запуска, влияющие на результаты этапов (часть ключа кэша)."""
+    import hashlib
+    catalogs = ctx.get('catalogs')
+    catalogs_digest = hashlib.sha256(json.dumps({name: catalog_values(values) for name, values in catalogs.items()},
+                                                ensure_ascii=False).encode('utf-8')).hexdigest() if catalogs else ""
+    return f"{ctx['model']}|{ctx['in_memory']}|{sorted(ctx['checkpoints'])}|{catalogs_digest}|" \
+           f"{ctx['source']}|{ctx['export_csv']}|{ctx['checkpoint_format']}|{sorted(ctx.get('exports') or ())}"
+
+
+def stage_input(ctx, file_name):
+    """
+    Файл, от которого зависит вход этапа. В режиме source='xlsx' этапы читают данные книг из
+    ctx['sources'], а не CSV, поэтому ключ этапа строится по его книге (groups.csv -> groups.xlsx):
+    изменение одной книги не затрагивает этапы, которые читают другие.
+    """
+    if ctx.get('source') == 'xlsx' and file_name.endswith('.csv'):
+        file_name = file_name[:-len('.csv')] + '.xlsx'
+    return path(ctx, file_name)
+
+
+def run_cached_stage(ctx, cache, name, func):
+    """
+    Выполняет этап через кэш. Возвращает 'hit', если результат взят из кэша,
+    или 'miss', если этап выполнен и его результат сохранен.
+    """
+    import stage_cache
+
+    info = STAGE_INFO[name]
+    # Заранее загруженные справочники уже учтены в параметрах запуска
+    shared = {file_name.replace('.xlsx', '.csv') for file_name, key in CATALOG_FILES.items()
+              if key in (ctx.get('catalogs') or {})}
+    input_files = [stage_input(ctx, file_name) for file_name in info["inputs"] if file_name not in shared]
+    key = cache.stage_key(name, info["modules"], input_files, ctx.get('data_key'), ctx['cache_options'])
+
+    entry = cache.get(name, key)
+    if entry is not None:
+        stage_cache.restore_outputs(ctx['base_dir'], entry["files"])
+        for level, message in entry["records"]:
+            logging.log(level, f"[кэш] {message}")
+        ctx['events'].update(entry.get("events", {}))
+        for name_in_ctx, value in entry.get("state", {}).items():
+            ctx[name_in_ctx] = value
+        if info["data"]:
+            ctx['data'] = entry["data"]
+            ctx['data_key'] = key
+        return 'hit'
+
+    collector = stage_cache.RecordCollector()
+    logging.getLogger().addHandler(collector)
+    try:
+        func(ctx)
+    finally:
+        logging.getLogger().removeHandler(collector)
+    cache.put(key, {
+        "files": stage_cache.capture_outputs(ctx['base_dir'], info["outputs"]),
+        "records": collector.records,
+        "data": ctx.get('data') if info["data"] else None,
+        "state": {name_in_ctx: ctx.get(name_in_ctx) for name_in_ctx in info.get("state", [])},
+        "events": dict(ctx['events']),
+    })
+    if info["data"]:
+        ctx['data_key'] = key
+    return 'miss'
+
+
+def make_context(base_dir=None, in_memory=False, checkpoints=(), model='dict', catalogs=None, source='csv',
+                 export_csv=False, checkpoint_format='json', exports=()):
+    """Контекст запуска: параметры и состояние, которое этапы передают друг другу (см. run_pipeline)."""
+    return {'base_dir': os.path.abspath(base_dir or os.getcwd()), 'in_memory': in_memory,
+            'checkpoints': tuple(checkpoints), 'data': None, 'model': model, 'catalogs': catalogs,
+            'data_key': None, 'source': source, 'export_csv': export_csv, 'sources': None, 'workbooks': None,
+            'references': None, 'findings': None, 'events': {}, 'classes': None,
+            'checkpoint_format': checkpoint_format, 'exports': tuple(exports)}
+
+
+def run_pipeline(base_dir=None, stages=None, after_stage=None, in_memory=False, checkpoints=(), model='dict',
+                 catalogs=None, cache=None, source='csv', export_csv=False, validation='legacy',
+                 stop_on=(), on_violation=None, before_stage=None, context=None, classes=None,
+                 checkpoint_format='json', executor=None, workspace=None, workspace_outputs='final', exports=(),
+                 store=None, store_week=None):
+    """
+    Выполняет этапы конвейера по порядку в текущем процессе.
+    :param base_dir: Рабочий каталог с входными файлами (по умолчанию текущий).
+    :param stages: Список имен этапов для выполнения (по умолчанию все).
+    :param after_stage: Функция (имя этапа, ctx) -> bool, вызывается после каждого
+                        этапа; False останавливает конвейер.
+    :param in_memory: Передавать расписание между этапами в памяти, без промежуточных JSON.
+    :param checkpoints: Имена этапов, после которых промежуточный JSON все же записывается
+                        ('all' - после всех).
+    :param model: 'dict' - исходные функции над словарями, 'grid' - нормализация через
+                  schedule_model (сетка уже упорядочена, сортировка не выполняется),
+                  'columnar' - векторные функции columnar.py над таблицей pandas.
+    :param catalogs: Заранее загруженные справочники {'klass': [...], 'lesson': [...]} и, по желанию,
+                     'replacements' (словарь замен или update_lesson_gis.ReplacementEngine);
+                     соответствующие файлы рабочего каталога не читаются.
+    :param cache: Экземпляр stage_cache.StageCache; этапы с неизменившимися входами
+                  не выполняются, а восстанавливаются из кэша.
+    :param source: 'csv' - Excel конвертируется в CSV через pandas (exel_to_csv.py),
+                   'xlsx' - книги читаются напрямую и параллельно (xlsx_reader.py).
+    :param export_csv: В режиме 'xlsx' дополнительно записать CSV для отладки.
+    :param validation: 'legacy' - проверки FindError, check_group и Final_check с текстовыми логами,
+                       'engine' - один этап validate с записью findings.jsonl (validation.py).
+    :param stop_on: Политика остановки (events.parse_policy): после каждого этапа его счетчики
+                    событий сверяются с условиями.
+    :param on_violation: Функция (имя этапа, выполненные условия) -> bool, вызывается при
+                         срабатывании политики; True - продолжить. По умолчанию конвейер останавливается.
+    :param before_stage: Функция (имя этапа, ctx), вызывается перед каждым выполняемым этапом.
+    :param checkpoint_format: Формат промежуточных файлов: 'json' (с отступами, как раньше),
+                              'compact' или 'binary' (checkpoint.py).
+    :param classes: Экземпляр class_cache.ClassCache: этапы, изменяющие расписание, выполняются
+                    только для классов с изменившимися данными (кроме model='columnar');
+                    этап delta_export пишет файл ГИС с изменившимися классами.
+    :param executor: Экземпляр class_pool.ClassPool: этапы, изменяющие расписание, и построение
+                     строк ГИС выполняются по частям (по классам) в пуле процессов (кроме model='columnar';
+                     с кэшем классов пул не используется для этапов, изменяющих расписание).
+    :param exports: Дополнительные цели выгрузки этапа json_to_GIS_SO за тот же проход
+                    (json_to_GIS_SO.parse_target): 'class' - файлы по классам, 'teacher' - по учителям,
+                    'split:МБ' - части GIS_schedule.csv не больше указанного размера.
+    :param workspace: Выполнять этапы в отдельном рабочем каталоге (workspace.py), созданном в указанном
+                      месте ('' - временный каталог системы, 'tmpfs' - /dev/shm); входные файлы копируются
+                      туда, а результаты возвращаются в base_dir. С context не используется.
+    :param workspace_outputs: Какие файлы вернуть из рабочего каталога: 'final' - журналы, ошибки
+                              и выгрузку ГИС, 'all' - все файлы конвейера.
+    :param store: Файл базы SQLite (schedule_store.py): после этапов в нее добавляется запуск -
+                  этапы и их счетчики, итоговое расписание и находки validate.
+    :param store_week: Неделя расписания для store (по умолчанию текущая, например '2024-W36').
+    :param context: Контекст предыдущего запуска (make_context): прочитанные книги и справочники
+                    используются повторно. Если задан, base_dir, in_memory, checkpoints, model,
+                    catalogs, source, export_csv и checkpoint_format берутся из него.
+    :return: Список словарей {"stage", "seconds", "ok", "cache", "events", "violations"} по выполненным этапам.
+    """
+    import datetime
+    import events
+
+    started = datetime.datetime.now()
+    space = None
+    if workspace is not None and context is None:
+        from workspace import Workspace
+        space = Workspace(base_dir or os.getcwd(), workspace, workspace_outputs)
+        base_dir = space.open(stages)
+    ctx = context if context is not None else make_context(base_dir, in_memory, checkpoints, model, catalogs,
+                                                           source, export_csv, checkpoint_format, exports)
+    if cache is not None:
+        ctx['cache_options'] = cache_options(ctx)
+    ctx['classes'] = classes
+    if classes is not None:
+        classes.begin()
+    ctx['executor'] = executor
+    handler = configure_logging(ctx['base_dir'])
+    results = []
+    try:
+        skipped = [name for mode, names in VALIDATION_STAGES.items() if mode != validation for name in names]
+        for name, func in STAGES:
+            if (stages is not None and name not in stages) or name in skipped:
+                continue
+            start = time.perf_counter()
+            ok = True
+            cache_status = None
+            if before_stage is not None:
+                before_stage(name, ctx)
+            ctx['events'] = {}
+            counter = events.EventCounter()
+            logging.getLogger().addHandler(counter)
+            try:
+                # Файлы дополнительных целей выгрузки в кэше не хранятся
+                if cache is not None and name in STAGE_INFO and not (name == "json_to_GIS_SO" and ctx['exports']):
+                    cache_status = run_cached_stage(ctx, cache, name, func)
+                else:
+                    func(ctx)
+            except (Exception, SystemExit) as e:
+                # load_raspisanie в скриптах сообщает об ошибке через SystemExit
+                ok = False
+                logging.error(f"Ошибка на этапе {name}: {e}")
+            finally:
+                logging.getLogger().removeHandler(counter)
+            events.count(ctx, 'errors', counter.errors)
+            events.count(ctx, 'warnings', counter.warnings)
+            elapsed = time.perf_counter() - start
+            violations = events.check_policy(stop_on, ctx['events'])
+            results.append({"stage": name, "seconds": elapsed, "ok": ok, "cache": cache_status,
+                            "events": dict(ctx['events']), "violations": violations})
+            from_cache = " (из кэша)" if cache_status == 'hit' else ""
+            logging.info(f"Этап {name} выполнен за {elapsed:.3f} с{from_cache}.")
+            summary = events.format_events(ctx['events'])
+            print(f"Этап {name} {'выполнен' if ok else 'завершился с ошибкой'} за {elapsed:.3f} с{from_cache}."
+                  + (f" События: {summary}." if summary else ""))
+            if not ok:
+                break
+            if violations:
+                logging.warning(f"Этап {name}: сработала политика остановки: {', '.join(violations)}")
+                print(f"Сработала политика остановки: {', '.join(violations)}")
+                if on_violation is None or not on_violation(name, violations):
+                    break
+            if after_stage is not None and not after_stage(name, ctx):
+                break
+        if store is not None:
+            import schedule_store
+            schedule_store.store_pipeline_run(store, ctx, results, space.target_dir if space else ctx['base_dir'],
+                                              store_week, started)
+    finally:
+        handler.flush()
+        if classes is not None:
+            classes.save()
+        if space is not None:
+            handler.close()
+            space.close()
+            # Дальнейшие записи идут в log.log каталога школы
+            configure_logging(space.target_dir)
+    return results
+
+
+def print_timings(results):
+    """Выводит сводку времени выполнения этапов."""
+    total = sum(item["seconds"] for item in results)
+    print("Время выполнения этапов:")
+    for item in results:
+        status = "OK" if item["ok"] else "ОШИБКА"
+        if item.get("cache"):
+            status += f"  кэш: {'попадание' if item['cache'] == 'hit' else 'промах'}"
+        print(f"  {item['stage']:<20} {item['seconds']:8.3f} с  {status}")
+    print(f"  {'Итого':<20} {total:8.3f} с")
+
+
+def parse_export(text):
+    """Тип аргумента --export для argparse (как json_to_GIS_SO.parse_target, без импорта этапа)."""
+    import argparse
+    import re
+    name, _, size = text.partition(':')
+    if text not in ('class', 'teacher') and not (name == 'split' and re.fullmatch(r"\d+(\.\d+)?", size)
+                                                 and float(size) > 0):
+        raise argparse.ArgumentTypeError(f"Неизвестная цель выгрузки '{text}' (допустимо: class, teacher, split:МБ)")
+    return text
+
+
+def parse_policy(text):
+    """Тип аргумента --stop-on для argparse."""
+    import argparse
+    import events
+    try:
+        return events.parse_policy(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_arguments(parser):
+    """Добавляет общие параметры конвейера в argparse."""
+    parser.add_argument("--in-memory", action="store_true",
+                        help="передавать расписание между этапами в памяти без промежуточных JSON")
+    parser.add_argument("--checkpoint", action="append", default=[], metavar="ЭТАП",
+                        help="записать промежуточный JSON после этапа (можно указать несколько раз, 'all' - все)")
+    parser.add_argument("--checkpoint-format", choices=["json", "compact", "binary"], default="json",
+                        help="формат промежуточных файлов: json с отступами (по умолчанию), compact - без отступов, "
+                             "binary - двоичный с интернированными строками (checkpoint.py)")
+    parser.add_argument("--model", choices=["dict", "grid", "columnar"], default="dict",
+                        help="представление расписания: словари, сетка schedule_model для нормализации "
+                             "или таблица pandas для всех этапов (columnar.py)")
+    parser.add_argument("--source", choices=["csv", "xlsx"], default="csv",
+                        help="csv - конвертация Excel в CSV через pandas, xlsx - прямое чтение книг без CSV")
+    parser.add_argument("--export-csv", action="store_true",
+                        help="в режиме --source xlsx дополнительно записать CSV для отладки")
+    parser.add_argument("--validation", choices=["legacy", "engine"], default="legacy",
+                        help="legacy - проверки FindError, check_group, Final_check; "
+                             "engine - одна проверка за проход с записью findings.jsonl")
+    parser.add_argument("--stop-on", type=parse_policy, default=[], metavar="ПОЛИТИКА",
+                        help="остановить конвейер, если после этапа выполнено условие, "
+                             "например \"unknown_room>0,missing_group>=50\" (счетчики: errors, warnings, "
+                             "unknown_subject, unknown_room, missing_group, group_errors, no_room, "
+                             "teacher_conflict, room_conflict)")
+    parser.add_argument("--export", action="append", default=[], type=parse_export, metavar="ЦЕЛЬ",
+                        help="дополнительная выгрузка за тот же проход (можно несколько раз): class - файлы по "
+                             "классам в GIS_classes, teacher - по учителям в GIS_teachers, split:МБ - части "
+                             "GIS_schedule.csv не больше указанного размера (GIS_schedule_part01.csv, ...)")
+    parser.add_argument("--cache-dir", default=None, metavar="КАТАЛОГ",
+                        help="включить кэш этапов в указанном каталоге")
+    parser.add_argument("--class-cache", default=None, metavar="ФАЙЛ",
+                        help="кэш результатов по классам: заново обрабатываются только изменившиеся классы, "
+                             "а классы, изменившиеся с прошлого запуска, дополнительно записываются "
+                             "в GIS_schedule_delta.csv (сводка - class_changes.json)")
+    parser.add_argument("--cache-size-mb", type=int, default=200,
+                        help="предельный размер кэша этапов в МБ (по умолчанию 200)")
+    parser.add_argument("--workspace", nargs="?", const="", default=None, metavar="КАТАЛОГ",
+                        help="выполнять этапы в отдельном рабочем каталоге внутри КАТАЛОГ (без значения - во "
+                             "временном каталоге системы, tmpfs - в /dev/shm); в каталог школы возвращаются результаты")
+    parser.add_argument("--workspace-outputs", choices=["final", "all"], default="final",
+                        help="с --workspace: final - вернуть журналы, ошибки и GIS_schedule.csv (по умолчанию), "
+                             "all - все файлы конвейера, включая CSV и промежуточные JSON")
+    parser.add_argument("--store", default=None, metavar="ФАЙЛ",
+                        help="добавить запуск (этапы, итоговое расписание, находки validate) в базу SQLite "
+                             "(schedule_store.py); прежние запуски остаются историей")
+    parser.add_argument("--store-week", default=None, metavar="НЕДЕЛЯ",
+                        help="с --store: неделя расписания (по умолчанию текущая, например 2024-W36)")
+    parser.add_argument("--class-workers", type=int, default=0, metavar="N",
+                        help="обрабатывать классы по частям в N процессах (0 - последовательно, по умолчанию)")
+    parser.add_argument("--class-threshold", type=int, default=None, metavar="УРОКОВ",
+                        help="с --class-workers: расписания меньшего размера обрабатываются последовательно "
+                             "(по умолчанию 5000 уроков)")
+
+
+def pipeline_options(args):
+    """Параметры run_pipeline из разобранной командной строки."""
+    return {
+        'in_memory': args.in_memory,
+        'checkpoints': args.checkpoint,
+        'checkpoint_format': args.checkpoint_format,
+        'model': args.model,
+        'source': args.source,
+        'export_csv': args.export_csv,
+        'validation': args.validation,
+        'stop_on': args.stop_on,
+        'exports': args.export,
+        'workspace': args.workspace,
+        'workspace_outputs': args.workspace_outputs,
+        'store': args.store,
+        'store_week': args.store_week,
+    }
+
+
+def make_cache(args):
+    """Создает кэш этапов по параметрам командной строки (или None, если кэш не включен)."""
+    if not args.cache_dir:
+        return None
+    import stage_cache
+    return stage_cache.StageCache(os.path.abspath(args.cache_dir), args.cache_size_mb * 1024 * 1024)
+
+
+def make_class_cache(args):
+    """Создает кэш классов по параметрам командной строки (или None, если он не включен)."""
+    if not args.class_cache:
+        return None
+    import class_cache
+    return class_cache.ClassCache(os.path.abspath(args.class_cache))
+
+
+def make_class_pool(args):
+    """Создает пул обработки классов по параметрам командной строки (или None, если он не включен)."""
+    if args.class_workers <= 0:
+        return None
+    import class_pool
+    threshold = class_pool.DEFAULT_THRESHOLD if args.class_threshold is None else args.class_threshold
+    return class_pool.ClassPool(args.class_workers, threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Встроенный конвейер обработки расписания")
+    add_arguments(parser)
+    args = parser.parse_args()
+    cache = make_cache(args)
+    classes = make_class_cache(args)
+    executor = make_class_pool(args)
+    try:
+        print_timings(run_pipeline(**pipeline_options(args), cache=cache, classes=classes, executor=executor))
+    finally:
+        if executor is not None:
+            executor.close()
+    if cache is not None:
+        cache.report()
+    if classes is not None:
+        classes.report()
@@ -0,0 +1,198 @@
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from reference_catalog import normalize, room_key
+
+# Запросы к итоговому расписанию (raspisanie_replace_lessons.json, результат update_lesson_gis.update_json):
+# "что ведет учитель в среду", "где группа на 4 уроке", "в каких классах есть Информатика".
+# Индексы по учителю, кабинету, предмету, группе, классу и периоду (день, урок) строятся один раз;
+# запрос - пересечение списков уроков из индексов (от самого короткого), без обхода расписания.
+# Значения сравниваются без учета регистра, лишних пробелов и ё (reference_catalog.normalize),
+# кабинеты - также без ".0" числовых ячеек ("126.0" - тот же кабинет, что "126": reference_catalog.room_key).
+# Индексы сохраняются рядом с расписанием (pickle) вместе с отпечатком файла расписания
+# и загружаются без разбора JSON, пока расписание не изменилось.
+
+SCHEDULE_FILE = "raspisanie_replace_lessons.json"
+INDEX_FILE = "schedule_index.pickle"
+INDEX_VERSION = 2  # Увеличивается при изменении состава индексов: старые файлы строятся заново
+FIELDS = ["class", "day", "slot", "time", "lesson", "teach", "number", "groups"]  # Поля записи урока
+# Фильтр запроса -> индекс
+FILTERS = {"teacher": "teach", "room": "number", "subject": "lesson", "group": "groups", "class_name": "class",
+           "day": "day"}
+INDEX_KEYS = {"number": room_key}  # Ключ значения для индекса; для остальных - normalize
+
+
+def index_key(field, value):
+    return INDEX_KEYS.get(field, normalize)(value)
+
+
+def file_stamp(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ScheduleIndex:
+    """Уроки расписания и индексы значение -> номера уроков."""
+    __slots__ = ("entries", "indexes", "periods", "slots", "stamp")
+
+    def __init__(self, entries=(), stamp=None):
+        """
+        :param entries: Записи уроков - кортежи в порядке FIELDS.
+        :param stamp: Отпечаток файла расписания (mtime_ns, размер), по которому построены индексы.
+        """
+        self.entries = list(entries)
+        self.stamp = stamp
+        self.indexes = {field: {} for field in FILTERS.values()}
+        self.periods = {}  # (день, номер основного урока) -> номера уроков
+        self.slots = {}  # Номер основного урока -> номера уроков
+        for number, entry in enumerate(self.entries):
+            record = dict(zip(FIELDS, entry))
+            for field, index in self.indexes.items():
+                if record[field]:
+                    index.setdefault(index_key(field, record[field]), []).append(number)
+            slot = int(record["slot"].partition('.')[0])
+            self.periods.setdefault((normalize(record["day"]), slot), []).append(number)
+            self.slots.setdefault(slot, []).append(number)
+
+    @classmethod
+    def from_schedule(cls, data, stamp=None):
+        """Индексы по расписанию (словарь или checkpoint.LazySchedule); пустые уроки пропускаются."""
+        entries = []
+        for class_name, days in (data.stream() if hasattr(data, "stream") else data.items()):
+            for day, lessons in days.items():
+                for lesson_number, info in lessons.items():
+                    if info.get("lesson") or info.get("teach"):
+                        entries.append((class_name, day, lesson_number, info.get("time", ""), info.get("lesson", ""),
+                                        info.get("teach", ""), info.get("number", ""), info.get("groups", "")))
+        return cls(entries, stamp)
+
+    def __getstate__(self):
+        return INDEX_VERSION, self.entries, self.indexes, self.periods, self.slots, self.stamp
+
+    def __setstate__(self, state):
+        if state[0] != INDEX_VERSION:
+            raise ValueError(f"Версия индексов {state[0]} не поддерживается")
+        _, self.entries, self.indexes, self.periods, self.slots, self.stamp = state
+
+    def find(self, slot=None, **filters):
+        """
+        Уроки, подходящие под все условия, в порядке расписания.
+        :param slot: Номер урока (подгруппы .1 относятся к своему уроку).
+        :param filters: teacher, room, subject, group, class_name, day (см. FILTERS); None - без условия.
+        :return: Список словарей с полями FIELDS.
+        """
+        filters = {name: value for name, value in filters.items() if value is not None}
+        if slot is not None and "day" in filters:
+            candidates = [self.periods.get((normalize(filters.pop("day")), int(slot)), [])]
+        elif slot is not None:
+            candidates = [self.slots.get(int(slot), [])]
+        else:
+            candidates = []
+        candidates += [self.indexes[FILTERS[name]].get(index_key(FILTERS[name], value), [])
+                       for name, value in filters.items()]
+        if not candidates:
+            numbers = range(len(self.entries))
+        else:
+            candidates.sort(key=len)
+            numbers = candidates[0]
+            if len(candidates) > 1:
+                numbers = sorted(set(numbers).intersection(*candidates[1:]))
+        return [dict(zip(FIELDS, self.entries[number])) for number in numbers]
+
+    def teacher(self, name, day=None):
+        """Уроки учителя (за день или за неделю)."""
+        return self.find(teacher=name, day=day)
+
+    def room(self, name, day=None, slot=None):
+        """Уроки в кабинете."""
+        return self.find(room=name, day=day, slot=slot)
+
+    def group(self, name, day=None, slot=None):
+        """Где и что у группы."""
+        return self.find(group=name, day=day, slot=slot)
+
+    def classes_with(self, subject):
+        """Классы, в расписании которых есть предмет (в порядке расписания)."""
+        return list(dict.fromkeys(self.entries[number][0]
+                                  for number in self.indexes["lesson"].get(normalize(subject), [])))
+
+
+def save(index, file_path):
+    """Записывает индексы через временный файл (читатель не увидит файл наполовину)."""
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(index, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, file_path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def open_index(school_dir, rebuild=False):
+    """
+    Индексы расписания школы: из INDEX_FILE, если он построен по текущему файлу расписания,
+    иначе строятся заново и сохраняются.
+    """
+    import checkpoint
+
+    schedule_path = os.path.join(school_dir, SCHEDULE_FILE)
+    index_path = os.path.join(school_dir, INDEX_FILE)
+    stamp = file_stamp(schedule_path)
+    if not rebuild and os.path.isfile(index_path):
+        try:
+            with open(index_path, 'rb') as file:
+                index = pickle.load(file)
+            if isinstance(index, ScheduleIndex) and index.stamp == stamp:
+                return index
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError):
+            pass  # Поврежденный или устаревший файл индексов строится заново
+    schedule = checkpoint.open_schedule(schedule_path)
+    try:
+        index = ScheduleIndex.from_schedule(schedule, stamp)
+    finally:
+        if isinstance(schedule, checkpoint.LazySchedule):
+            schedule.close()
+    save(index, index_path)
+    return index
+
+
+def print_records(records):
+    for record in records:
+        print("\t".join(str(record[field]) for field in FIELDS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запросы к итоговому расписанию школы")
+    parser.add_argument("dir", nargs="?", default=".", help="каталог школы (по умолчанию текущий)")
+    parser.add_argument("--teacher", help="учитель")
+    parser.add_argument("--room", help="кабинет")
+    parser.add_argument("--subject", help="предмет")
+    parser.add_argument("--group", help="группа")
+    parser.add_argument("--class", dest="class_name", help="класс")
+    parser.add_argument("--day", help="день недели")
+    parser.add_argument("--slot", type=int, help="номер урока")
+    parser.add_argument("--classes", action="store_true", help="вывести только классы с предметом --subject")
+    parser.add_argument("--rebuild", action="store_true", help="построить индексы заново")
+    args = parser.parse_args()
+
+    load_start = time.perf_counter()
+    schedule_index = open_index(args.dir, rebuild=args.rebuild)
+    query_start = time.perf_counter()
+    if args.classes:
+        if args.subject is None:
+            parser.error("--classes требует --subject")
+        found = schedule_index.classes_with(args.subject)
+        print("\n".join(found))
+    else:
+        found = schedule_index.find(day=args.day, slot=args.slot, teacher=args.teacher, room=args.room,
+                                    subject=args.subject, group=args.group, class_name=args.class_name)
+        print_records(found)
+    done = time.perf_counter()
+    print(f"Найдено: {len(found)}; загрузка индексов {(query_start - load_start) * 1000:.1f} мс, "
+          f"запрос {(done - query_start) * 1000:.3f} мс", file=sys.stderr)
@@ -0,0 +1,146 @@
+import csv
+import difflib
+import logging
+import re
+
+# Справочник ГИС СО ЕЦП (кабинеты klass или предметы lesson) с быстрым поиском.
+# Проверка значения - поиск в множестве, а не перебор списка.
+# Дополнительно хранятся нормализованные ключи (пробелы, регистр, ё -> е) и индекс
+# по первому слову, чтобы для неизвестного значения быстро подобрать варианты "возможно, имелось в виду".
+# Здесь же - чтение справочников klass и lesson из CSV или строк книги (общее для FindError, Final_check,
+# конвейера и xlsx_reader).
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(value):
+    """Нормализованный ключ значения: лишние пробелы, регистр и ё не учитываются."""
+    return _SPACES.sub(' ', value).strip().casefold().replace('ё', 'е')
+
+
+def room_name(value):
+    """
+    Название кабинета без дробной части, которую pandas дает числовым столбцам с пустыми ячейками
+    ("108.0" -> "108"): так кабинет выглядит одинаково в CSV из pandas и в книге, прочитанной xlsx_reader.
+    """
+    value = value.strip()
+    if value.endswith(".0") and value[:-2].isdigit():
+        return value[:-2]
+    return value
+
+
+def room_key(value):
+    """Ключ сопоставления кабинетов (также без учета регистра, пробелов и ё)."""
+    return normalize(room_name(value))
+
+
+def first_token(key):
+    """Первое слово нормализованного ключа."""
+    return key.split(' ', 1)[0]
+
+
+class ReferenceCatalog:
+    """
+    Справочник значений.
+    value in catalog - точное совпадение (в выгрузку ГИС должно попасть значение из справочника как есть),
+    canonical(value) - значение справочника с тем же нормализованным ключом,
+    suggest(value) - близкие значения справочника для сообщения об ошибке.
+    """
+    __slots__ = ("values", "_exact", "_by_key", "_by_token")
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._exact = set(self.values)
+        self._by_key = {}
+        self._by_token = {}
+        for value in self.values:
+            key = normalize(value)
+            if not key or key in self._by_key:
+                continue
+            self._by_key[key] = value
+            self._by_token.setdefault(first_token(key), []).append(key)
+
+    @classmethod
+    def of(cls, values):
+        """Возвращает справочник как есть или строит его из списка значений."""
+        return values if isinstance(values, cls) else cls(values)
+
+    def __contains__(self, value):
+        return value in self._exact
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getstate__(self):
+        # Индексы строятся заново при распаковке: в процессы передается только список значений
+        return self.values
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def canonical(self, value):
+        """Значение справочника, отличающееся от value только пробелами, регистром или ё, либо None."""
+        return self._by_key.get(normalize(value))
+
+    def suggest(self, value, limit=3, cutoff=0.6):
+        """
+        Варианты для неизвестного значения: сначала совпадение по нормализованному ключу,
+        затем похожие значения с тем же первым словом.
+        """
+        key = normalize(value)
+        if key in self._by_key:
+            return [self._by_key[key]]
+        candidates = self._by_token.get(first_token(key), ())
+        matches = difflib.get_close_matches(key, candidates, n=limit, cutoff=cutoff)
+        return [self._by_key[match] for match in matches]
+
+
+def describe_suggestions(catalog, value):
+    """Приписка к сообщению об ошибке с вариантами из справочника (пустая строка, если вариантов нет)."""
+    suggestions = catalog.suggest(value)
+    if not suggestions:
+        return ""
+    return f" (возможно: {', '.join(suggestions)})"
+
+
+def klass_from_rows(rows):
+    """Кабинеты - первые значения строк справочника (первые 3 строки - заголовки, пустые строки пропускаются)."""
+    rows = iter(rows)
+    for _ in range(3):
+        next(rows, None)
+    return [room_name(row[0]) for row in rows if row]
+
+
+def lesson_from_rows(rows):
+    """Первые значения строк справочника уроков (первые 2 строки - заголовки, пустые строки пропускаются)."""
+    rows = iter(rows)
+    for _ in range(2):
+        next(rows, None)
+    return [row[0].strip() for row in rows if row]
+
+
+def load_klass(file_path='klass.csv'):
+    """Справочник кабинетов из klass.csv; при ошибке чтения - пустой список (ошибка записывается в лог)."""
+    klass = []
+    try:
+        with open(file_path, 'r', encoding='windows-1251') as file:
+            klass = klass_from_rows(csv.reader(file, delimiter=';'))
+        logging.info("Файл klass.csv успешно обработан.")
+    except Exception as e:
+        logging.error(f"Ошибка при чтении файла klass.csv: {e}")
+    return klass
+
+
+def load_lesson(file_path='lesson.csv'):
+    """Справочник уроков из lesson.csv; при ошибке чтения - пустой список (ошибка записывается в лог)."""
+    lesson = []
+    try:
+        with open(file_path, 'r', encoding='windows-1251') as file:
+            lesson = lesson_from_rows(csv.reader(file, delimiter=';'))
+        logging.info("Файл lesson.csv успешно обработан.")
+    except Exception as e:
+        logging.error(f"Ошибка при чтении файла lesson.csv: {e}")
+    return lesson
@@ -0,0 +1,266 @@
+import logging
+import sys
+
+# Компактная модель расписания.
+# Вместо вложенных словарей dict[класс][день][ключ урока] -> dict(...) каждый класс
+# хранится как фиксированная сетка (день, номер урока, подгруппа) -> Lesson.
+# Ключи вида "3" и "3.1" разбираются один раз при построении модели.
+
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]  # Дни недели
+FIELDS = ("time", "lesson", "teach", "number", "groups")  # Поля урока в порядке JSON
+
+
+def parse_lesson_key(key):
+    """
+    Разбирает ключ урока: "3" -> (3, 0), "3.1" -> (3, 1).
+    Для ключей другого вида возвращает None.
+    """
+    base, dot, sub = key.partition('.')
+    if not base.isdigit() or str(int(base)) != base:
+        return None
+    if not dot:
+        return int(base), 0
+    if sub == "1":
+        return int(base), 1
+    return None
+
+
+def lesson_key(slot, subgroup):
+    """Формирует ключ урока по номеру и подгруппе: (3, 1) -> "3.1"."""
+    return f"{slot}.1" if subgroup else str(slot)
+
+
+class Lesson:
+    """Запись урока. Строки интернируются: названия, учителя и кабинеты многократно повторяются."""
+    __slots__ = FIELDS
+
+    def __init__(self, time="", lesson="", teach="", number="", groups=""):
+        self.time = sys.intern(time)
+        self.lesson = sys.intern(lesson)
+        self.teach = sys.intern(teach)
+        self.number = sys.intern(number)
+        self.groups = sys.intern(groups)
+
+    @classmethod
+    def from_dict(cls, data):
+        if tuple(data) != FIELDS:
+            raise ValueError(f"Неожиданный набор полей урока: {list(data)}")
+        return cls(data["time"], data["lesson"], data["teach"], data["number"], data["groups"])
+
+    def to_dict(self):
+        return {
+            "time": self.time,
+            "lesson": self.lesson,
+            "teach": self.teach,
+            "number": self.number,
+            "groups": self.groups
+        }
+
+    def is_empty(self):
+        return not (self.time or self.lesson or self.teach or self.number or self.groups)
+
+    def __eq__(self, other):
+        if not isinstance(other, Lesson):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f"Lesson({', '.join(repr(getattr(self, field)) for field in FIELDS)})"
+
+
+class ClassSchedule:
+    """
+    Расписание одного класса.
+    grid[день] - плоский список длиной 2 * (max_slot + 1): ячейка 2 * slot - основной урок,
+    2 * slot + 1 - урок подгруппы (.1); None означает отсутствие ключа в этом дне.
+    orders[день] хранит исходный порядок ключей, только если он отличается от порядка сетки,
+    extras[(день, ключ)] - уроки с ключами, которые не укладываются в сетку (например "3.2").
+    """
+    __slots__ = ("name", "day_names", "grid", "orders", "extras")
+
+    def __init__(self, name, day_names=None, max_slot=0):
+        self.name = name
+        self.day_names = list(day_names if day_names is not None else DAYS)
+        self.grid = [[None] * (2 * (max_slot + 1)) for _ in self.day_names]
+        self.orders = {}
+        self.extras = {}
+
+    @property
+    def max_slot(self):
+        return len(self.grid[0]) // 2 - 1 if self.grid else -1
+
+    def _ensure_slot(self, slot):
+        size = 2 * (slot + 1)
+        for cells in self.grid:
+            if len(cells) < size:
+                cells.extend([None] * (size - len(cells)))
+
+    def get(self, day_idx, slot, subgroup=0):
+        cells = self.grid[day_idx]
+        index = 2 * slot + subgroup
+        return cells[index] if index < len(cells) else None
+
+    def set(self, day_idx, slot, subgroup, lesson):
+        self._ensure_slot(slot)
+        self.grid[day_idx][2 * slot + subgroup] = lesson
+
+    def iter_day(self, day_idx):
+        """Возвращает пары (ключ, Lesson) дня в порядке, в котором они идут в JSON."""
+        order = self.orders.get(day_idx)
+        if order is not None:
+            for key in order:
+                if (day_idx, key) in self.extras:
+                    yield key, self.extras[(day_idx, key)]
+                else:
+                    yield key, self.get(day_idx, *parse_lesson_key(key))
+            return
+        for index, lesson in enumerate(self.grid[day_idx]):
+            if lesson is not None:
+                yield lesson_key(index // 2, index % 2), lesson
+
+    def iter_lessons(self):
+        """Возвращает кортежи (день, номер, подгруппа, Lesson) по всем ячейкам сетки."""
+        for day_idx, day_name in enumerate(self.day_names):
+            for index, lesson in enumerate(self.grid[day_idx]):
+                if lesson is not None:
+                    yield day_name, index // 2, index % 2, lesson
+
+    @classmethod
+    def from_json(cls, name, days):
+        max_slot = 0
+        for lessons in days.values():
+            for key in lessons:
+                position = parse_lesson_key(key)
+                if position is not None and position[0] > max_slot:
+                    max_slot = position[0]
+        schedule = cls(name, days.keys(), max_slot)
+        for day_idx, lessons in enumerate(days.values()):
+            canonical = True
+            last_index = -1
+            for key, data in lessons.items():
+                lesson = Lesson.from_dict(data)
+                position = parse_lesson_key(key)
+                if position is None:
+                    schedule.extras[(day_idx, key)] = lesson
+                    canonical = False
+                    continue
+                index = 2 * position[0] + position[1]
+                schedule.grid[day_idx][index] = lesson
+                if index < last_index:
+                    canonical = False
+                last_index = index
+            if not canonical:
+                schedule.orders[day_idx] = list(lessons.keys())
+        return schedule
+
+    def to_json(self):
+        return {
+            day_name: {key: lesson.to_dict() for key, lesson in self.iter_day(day_idx)}
+            for day_idx, day_name in enumerate(self.day_names)
+        }
+
+    def normalize(self):
+        """
+        Дополняет сетку пустыми уроками так же, как add_missing_keys из all_null_lesson.py,
+        и приводит порядок ключей к результату sort_lessons из lesson_sort.py.
+        Сортировка не нужна: порядок задается самой сеткой.
+        """
+        if self.extras:
+            # Нестандартные ключи: используем исходные функции над словарями
+            from all_null_lesson import add_missing_keys
+            from lesson_sort import sort_lessons
+            data = sort_lessons(add_missing_keys({self.name: self.to_json()}))
+            normalized = ClassSchedule.from_json(self.name, data[self.name])
+            for slot in self.__slots__:
+                setattr(self, slot, getattr(normalized, slot))
+            return self
+
+        slot_count = self.max_slot + 1
+        main_slots = [slot for slot in range(slot_count)
+                      if any(cells[2 * slot] is not None for cells in self.grid)]
+        dot_one_slots = [slot for slot in range(slot_count)
+                         if any(cells[2 * slot + 1] is not None for cells in self.grid)]
+        main_set = set(main_slots)
+
+        for day_idx, cells in enumerate(self.grid):
+            had_order = day_idx in self.orders
+            reordered = []
+            for slot in main_slots:
+                if cells[2 * slot] is None:
+                    cells[2 * slot] = Lesson()
+                    if cells[2 * slot + 1] is not None:
+                        reordered.append(slot)
+                    logging.debug("Класс %s, день %s: добавлен основной ключ %s",
+                                  self.name, self.day_names[day_idx], slot)
+            for slot in dot_one_slots:
+                if slot in main_set and cells[2 * slot + 1] is None:
+                    cells[2 * slot + 1] = Lesson()
+                    logging.debug("Класс %s, день %s: добавлен дополнительный ключ %s.1",
+                                  self.name, self.day_names[day_idx], slot)
+
+            if had_order or reordered:
+                order = self._normalized_order(day_idx, reordered)
+                canonical = [key for key, _ in self._iter_grid_keys(day_idx)]
+                if order == canonical:
+                    self.orders.pop(day_idx, None)
+                else:
+                    self.orders[day_idx] = order
+        return self
+
+    def _iter_grid_keys(self, day_idx):
+        for index, lesson in enumerate(self.grid[day_idx]):
+            if lesson is not None:
+                yield lesson_key(index // 2, index % 2), lesson
+
+    def _normalized_order(self, day_idx, reordered):
+        """Порядок ключей дня после add_missing_keys + sort_lessons для нестандартных случаев."""
+        previous = self.orders.get(day_idx)
+        if previous is None:
+            # Основной ключ добавлен при уже существующем .1: исходный скрипт оставляет .1 первым
+            keys = []
+            for slot in range(self.max_slot + 1):
+                main = self.grid[day_idx][2 * slot]
+                dot_one = self.grid[day_idx][2 * slot + 1]
+                if slot in reordered:
+                    keys.extend([lesson_key(slot, 1), lesson_key(slot, 0)])
+                    continue
+                if main is not None:
+                    keys.append(lesson_key(slot, 0))
+                if dot_one is not None:
+                    keys.append(lesson_key(slot, 1))
+            return keys
+        # Был нестандартный порядок: существующие ключи в исходном порядке, затем добавленные,
+        # и устойчивая сортировка по номеру урока, как в исходных скриптах
+        existing = set(previous)
+        added = [key for key, _ in self._iter_grid_keys(day_idx) if key not in existing]
+        added.sort(key=lambda key: parse_lesson_key(key)[1])
+        return sorted(previous + added, key=lambda key: int(key.split('.')[0]))
+
+
+class Schedule:
+    """Расписание всех классов: упорядоченный словарь имя класса -> ClassSchedule."""
+    __slots__ = ("classes",)
+
+    def __init__(self, classes=None):
+        self.classes = classes if classes is not None else {}
+
+    @classmethod
+    def from_json(cls, data):
+        """Строит модель из словаря в формате raspisanie*.json."""
+        return cls({name: ClassSchedule.from_json(name, days) for name, days in data.items()})
+
+    def to_json(self):
+        """Возвращает словарь в формате raspisanie*.json (без потерь относительно from_json)."""
+        return {name: schedule.to_json() for name, schedule in self.classes.items()}
+
+    def normalize(self):
+        """Заменяет этапы all_null_lesson и lesson_sort."""
+        for schedule in self.classes.values():
+            schedule.normalize()
+        return self
+
+    def iter_lessons(self):
+        """Возвращает кортежи (класс, день, номер, подгруппа, Lesson) по всему расписанию."""
+        for name, schedule in self.classes.items():
+            for day_name, slot, subgroup, lesson in schedule.iter_lessons():
+                yield name, day_name, slot, subgroup, lesson
@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import os
+import sqlite3
+
+# Хранилище запусков в SQLite: итоговое расписание, находки проверки (validation.py) и сведения
+# о запуске (школа, неделя, этапы, параметры) для запросов по школам и неделям без разбора JSON.
+# Каждый запуск конвейера с --store добавляет новую версию (школа, неделя): прежние версии остаются
+# историей, последние видны через представления latest_runs и latest_lessons.
+# Строки записываются пачками (executemany) в одной транзакции BEGIN IMMEDIATE: запуск записывается
+# целиком или не записывается, а номер версии не повторяется при одновременных запусках batch.py.
+
+SCHEMA_VERSION = 1  # PRAGMA user_version базы
+BATCH_SIZE = 5000  # Строк в одном вызове executemany
+BUSY_TIMEOUT = 60  # Ожидание блокировки записи другим запуском, с
+SCHEDULE_FILE = "raspisanie_replace_lessons.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    school TEXT NOT NULL,
+    week TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    started TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    UNIQUE (school, week, version)
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    cache TEXT,
+    events TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    class TEXT NOT NULL,
+    day TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    subgroup INTEGER NOT NULL,
+    time TEXT NOT NULL,
+    lesson TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    room TEXT NOT NULL,
+    group_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    rule TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    class TEXT,
+    day TEXT,
+    slot TEXT,
+    value TEXT,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stages_run ON stages (run_id);
+CREATE INDEX IF NOT EXISTS lessons_run ON lessons (run_id, class, day, slot);
+CREATE INDEX IF NOT EXISTS lessons_teacher ON lessons (teacher, day, slot);
+CREATE INDEX IF NOT EXISTS lessons_room ON lessons (room, day, slot);
+CREATE INDEX IF NOT EXISTS lessons_lesson ON lessons (lesson);
+CREATE INDEX IF NOT EXISTS findings_run ON findings (run_id, rule);
+CREATE VIEW IF NOT EXISTS latest_runs AS
+    SELECT * FROM runs AS r
+    WHERE version = (SELECT MAX(version) FROM runs WHERE school = r.school AND week = r.week);
+CREATE VIEW IF NOT EXISTS latest_lessons AS
+    SELECT r.school, r.week, r.version, l.* FROM latest_runs AS r JOIN lessons AS l ON l.run_id = r.id;
+"""
+
+
+def current_week(today=None):
+    """Неделя по ISO 8601: '2024-W36'."""
+    year, week, _ = (today or datetime.date.today()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def connect(db_path):
+    """Открывает базу (создает схему при первом обращении)."""
+    connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"База {db_path} создана более новой версией (схема {version})")
+        connection.execute("PRAGMA journal_mode=WAL")  # Чтение не ждет записи другого запуска
+        connection.execute("PRAGMA foreign_keys=ON")
+        if version < SCHEMA_VERSION:
+            connection.executescript(SCHEMA + f"PRAGMA user_version = {SCHEMA_VERSION};")
+    except Exception:
+        connection.close()
+        raise
+    return connection
+
+
+def lesson_rows(data, run_id):
+    """Строки таблицы lessons; пустые уроки (без предмета и учителя) не записываются."""
+    for class_name, days in (data.stream() if hasattr(data, "stream") else data.items()):
+        for day, lessons in days.items():
+            for lesson_number, info in lessons.items():
+                if not (info.get("lesson") or info.get("teach")):
+                    continue
+                slot, _, subgroup = lesson_number.partition('.')
+                yield (run_id, class_name, day, int(slot), int(subgroup or 0), info.get("time", ""),
+                       info.get("lesson", ""), info.get("teach", ""), info.get("number", ""), info.get("groups", ""))
+
+
+def finding_rows(findings, run_id):
+    """Строки таблицы findings: по одной на урок записи; для отброшенных сверх лимита - число без урока."""
+    for record in findings.iter_records():
+        if "truncated" in record:
+            yield run_id, record["rule"], record["severity"], None, None, None, None, record["truncated"]
+            continue
+        for day, slot in record["slots"]:
+            yield run_id, record["rule"], record["severity"], record["class"], day, slot, record["value"], 1
+
+
+def insert_many(connection, sql, rows):
+    """Вставка пачками по BATCH_SIZE строк без построения всего списка строк в памяти."""
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return total
+        connection.executemany(sql, batch)
+        total += len(batch)
+
+
+def run_status(results):
+    if any(not item["ok"] for item in results):
+        return "error"
+    if results and results[-1]["violations"]:
+        return "stopped"
+    return "ok"
+
+
+def store_run(db_path, school, results, data=None, findings=None, week=None, options=None, started=None):
+    """
+    Записывает запуск одной транзакцией.
+    :param school: Имя школы (каталог школы).
+    :param results: Результаты run_pipeline по этапам.
+    :param data: Итоговое расписание (словарь или checkpoint.LazySchedule) или None.
+    :param findings: validation.Findings или None (проверки legacy записывают только счетчики этапов).
+    :param week: Неделя расписания (по умолчанию текущая, current_week).
+    :param options: Параметры запуска (записываются в runs.options как JSON).
+    :param started: Время начала запуска (datetime); по умолчанию - текущее.
+    :return: (id запуска, версия, число уроков, число находок).
+    """
+    week = week or current_week()
+    started = started or datetime.datetime.now()
+    connection = connect(db_path)
+    try:
+        # Блокировка записи до вычисления версии: одновременный запуск той же школы ждет
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = connection.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM runs WHERE school = ? AND week = ?",
+                                         (school, week)).fetchone()[0]
+            run_id = connection.execute(
+                "INSERT INTO runs (school, week, version, started, seconds, status, options) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (school, week, version, started.isoformat(timespec='seconds'),
+                 sum(item["seconds"] for item in results), run_status(results),
+                 json.dumps(options or {}, ensure_ascii=False, default=list))).lastrowid
+            connection.executemany(
+                "INSERT INTO stages (run_id, stage, seconds, ok, cache, events) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, item["stage"], item["seconds"], int(item["ok"]), item.get("cache"),
+                  json.dumps(item["events"], ensure_ascii=False)) for item in results])
+            lessons = 0
+            if data is not None:
+                lessons = insert_many(connection, "INSERT INTO lessons VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      lesson_rows(data, run_id))
+            found = 0
+            if findings is not None:
+                found = insert_many(connection, "INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    finding_rows(findings, run_id))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.close()
+    return run_id, version, lessons, found
+
+
+def store_pipeline_run(db_path, ctx, results, school_dir, week=None, started=None):
+    """
+    Записывает запуск run_pipeline: итоговое расписание берется из ctx (in_memory) или из
+    SCHEDULE_FILE рабочего каталога. Ошибка записи не прерывает конвейер.
+    """
+    import pipeline
+
+    try:
+        try:
+            data = pipeline.take_schedule(ctx, SCHEDULE_FILE)
+        except (OSError, ValueError):
+            data = None  # Запуск не дошел до итогового расписания: записываются только этапы
+        options = {name: ctx.get(name) for name in ("model", "source", "in_memory", "checkpoint_format", "exports")}
+        options["stages"] = [item["stage"] for item in results]
+        run_id, version, lessons, found = store_run(db_path, os.path.basename(os.path.abspath(school_dir)), results,
+                                                    data, ctx.get('findings'), week, options, started)
+        logging.info(f"Запуск записан в {db_path}: id {run_id}, версия {version}, уроков {lessons}, находок {found}.")
+    except (sqlite3.Error, OSError, ValueError) as e:
+        logging.error(f"Ошибка при записи запуска в {db_path}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запуски конвейера в базе SQLite")
+    parser.add_argument("db", help="файл базы")
+    parser.add_argument("--school", help="только запуски школы")
+    parser.add_argument("--sql", help="выполнить запрос только для чтения и вывести строки")
+    args = parser.parse_args()
+
+    # Только чтение: запрос не может изменить историю
+    db = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+    try:
+        if args.sql:
+            cursor = db.execute(args.sql)
+            print("\t".join(column[0] for column in cursor.description or ()))
+            for row in cursor:
+                print("\t".join("" if value is None else str(value) for value in row))
+        else:
+            query = ("SELECT r.id, r.school, r.week, r.version, r.started, r.status, round(r.seconds, 3), "
+                     "(SELECT COUNT(*) FROM lessons WHERE run_id = r.id), "
+                     "(SELECT COUNT(*) FROM findings WHERE run_id = r.id) FROM runs AS r")
+            rows = db.execute(query + " WHERE r.school = ? ORDER BY r.id", (args.school,)) if args.school \
+                else db.execute(query + " ORDER BY r.id")
+            print("id\tшкола\tнеделя\tверсия\tначало\tстатус\tвремя, с\tуроков\tнаходок")
+            for row in rows:
+                print("\t".join(str(value) for value in row))
+    finally:
+        db.close()
@@ -0,0 +1,368 @@
+import argparse
+import functools
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Локальная HTTP-служба преобразования расписания (без доступа в интернет, только стандартная библиотека).
+# POST /convert - тело запроса: zip-архив с книгами школы (raspisanie.xlsx, groups.xlsx и, по желанию,
+# zamena.xlsx, klass.xlsx, lesson.xlsx). Ответ - JSON с GIS_schedule.csv, находками проверки
+# (validation.py, как в findings.jsonl), счетчиками событий и временем по этапам.
+# GET /health - состояние службы.
+# Справочники klass и lesson и собранные правила замен из каталога службы загружаются один раз
+# в каждый рабочий процесс и используются всеми запросами (книги из запроса имеют приоритет).
+# Конвейер выполняется в пуле процессов ограниченного размера: настройка логирования и счетчики
+# событий в pipeline.py глобальны для процесса, поэтому потоки для этого не подходят.
+
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 120  # Предельное время ожидания результата, с
+MAX_BODY = 50 * 1024 * 1024  # Предельный размер архива
+MAX_UNPACKED = 200 * 1024 * 1024  # Предельный размер распакованных книг
+
+# Рабочий каталог каждого запроса новый, поэтому этап delete не нужен
+SERVICE_STAGES = ["exel_to_csv", "csv_to_json", "add_key", "sinh_time", "add_groups", "all_null_lesson",
+                  "lesson_sort", "update_cab", "update_lesson_gis", "validate", "json_to_GIS_SO"]
+
+# Справочники, загруженные в рабочем процессе
+_shared = None
+
+
+def load_shared(root_dir, source='xlsx'):
+    """
+    Справочники klass, lesson и словарь замен из каталога службы (если файлы есть).
+    :return: Словарь для run_pipeline(catalogs=...) без собранного движка замен.
+    """
+    import batch
+    import update_lesson_gis
+    import xlsx_reader
+
+    shared = {}
+    if any(os.path.exists(os.path.join(root_dir, f"klass.{ext}")) for ext in ("xlsx", "csv")):
+        shared.update(batch.load_shared_catalogs(root_dir, source))
+    if os.path.exists(os.path.join(root_dir, "zamena.xlsx")):
+        sources = xlsx_reader.load_inputs(root_dir, ["zamena.xlsx"])
+        if sources is not None:
+            shared['replacements'] = sources['replacements']
+    elif os.path.exists(os.path.join(root_dir, "zamena.csv")):
+        shared['replacements'] = update_lesson_gis.load_replacements(os.path.join(root_dir, "zamena.csv"))
+    return shared
+
+
+def init_worker(shared, source):
+    """Инициализация рабочего процесса: справочники, движок замен и модули этапов загружаются один раз."""
+    global _shared
+    import update_lesson_gis
+
+    _shared = dict(shared)
+    if 'replacements' in _shared:
+        _shared['replacements'] = update_lesson_gis.ReplacementEngine(_shared['replacements'])
+    for module in ("add_key", "sinh_time", "add_groups", "all_null_lesson", "lesson_sort", "update_cab",
+                   "validation", "json_to_GIS_SO", "xlsx_reader" if source == 'xlsx' else "exel_to_csv"):
+        __import__(module)
+
+
+def warm_up():
+    """Пустая задача: запускает рабочий процесс заранее, до первого запроса."""
+    return os.getpid()
+
+
+def read_findings(file_path):
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def convert(work_dir, files, options, submitted):
+    """
+    Выполняет конвейер для книг в work_dir (в рабочем процессе) и удаляет каталог.
+    :param files: Имена книг, пришедших в запросе.
+    :param submitted: Время постановки в очередь (time.time), для расчета ожидания.
+    :return: Ответ службы (словарь для JSON).
+    """
+    import pipeline
+    import validation
+
+    started = time.time()
+    try:
+        catalogs = dict(_shared or {})
+        # Книги из запроса заменяют соответствующие справочники службы (каждая - свой)
+        for name in files:
+            catalogs.pop(pipeline.CATALOG_FILES.get(name), None)
+        results = pipeline.run_pipeline(base_dir=work_dir, stages=SERVICE_STAGES, in_memory=True,
+                                        model=options['model'], source=options['source'],
+                                        validation='engine', catalogs=catalogs or None)
+        for handler in pipeline.logging.getLogger().handlers:
+            handler.close()
+        failed = [item["stage"] for item in results if not item["ok"]]
+        events = {}
+        for item in results:
+            for name, value in item["events"].items():
+                events[name] = events.get(name, 0) + value
+        gis_path = os.path.join(work_dir, 'GIS_schedule.csv')
+        gis_schedule = None
+        if os.path.exists(gis_path):
+            with open(gis_path, 'r', encoding='windows-1251', newline='') as file:
+                gis_schedule = file.read()
+        return {
+            "status": "ошибка" if failed or gis_schedule is None else "ok",
+            "failed_stage": failed[0] if failed else None,
+            "gis_schedule": gis_schedule,
+            "findings": read_findings(os.path.join(work_dir, validation.FINDINGS_FILE)),
+            "events": events,
+            "stages": [{"stage": item["stage"], "seconds": round(item["seconds"], 4), "ok": item["ok"]}
+                       for item in results],
+            "timings": {"queue": round(started - submitted, 4), "pipeline": round(time.time() - started, 4)},
+            "worker": os.getpid(),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def unpack(body, work_dir):
+    """
+    Извлекает книги из zip-архива в work_dir (только известные имена, без подкаталогов).
+    :return: Имена извлеченных книг.
+    :raises ValueError: Архив поврежден, слишком велик или в нем нет raspisanie.xlsx.
+    """
+    import pipeline
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(body))
+    except zipfile.BadZipFile:
+        raise ValueError("Тело запроса не является zip-архивом")
+    with archive:
+        members = {}
+        for info in archive.infolist():
+            name = os.path.basename(info.filename).lower()
+            if name in pipeline.EXCEL_FILES and not info.is_dir():
+                members[name] = info
+        if sum(info.file_size for info in members.values()) > MAX_UNPACKED:
+            raise ValueError("Слишком большой объем книг в архиве")
+        if 'raspisanie.xlsx' not in members:
+            raise ValueError("В архиве нет raspisanie.xlsx")
+        for name, info in members.items():
+            with archive.open(info) as source, open(os.path.join(work_dir, name), 'wb') as target:
+                shutil.copyfileobj(source, target)
+    return sorted(members)
+
+
+class ConvertHandler(BaseHTTPRequestHandler):
+    server_version = "RaspisanieGIS/1.0"
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": "Неизвестный адрес"})
+            return
+        service = self.server.service
+        self.send_json(200, {"status": "ok", "workers": service.workers, "catalogs": service.catalog_sizes,
+                             "in_progress": service.in_progress()})
+
+    def do_POST(self):
+        if self.path != "/convert":
+            self.send_json(404, {"error": "Неизвестный адрес"})
+            return
+        service = self.server.service
+        received = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_json(411, {"error": "Нужен заголовок Content-Length"})
+            return
+        if length > MAX_BODY:
+            self.send_json(413, {"error": f"Архив больше {MAX_BODY // (1024 * 1024)} МБ"})
+            return
+        body = self.rfile.read(length)
+        if not service.acquire():
+            self.send_json(503, {"error": "Служба занята, повторите запрос позже"})
+            return
+        work_dir = tempfile.mkdtemp(prefix="convert_", dir=service.work_root)
+        try:
+            files = unpack(body, work_dir)
+        except ValueError as e:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            service.release()
+            self.send_json(400, {"error": str(e)})
+            return
+        except BaseException:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            service.release()
+            raise
+        # Место освобождается, когда задача завершена или отменена, а не когда ответ отправлен:
+        # задача, не уложившаяся в timeout, продолжает занимать рабочий процесс.
+        # Каталог удаляет рабочий процесс после выполнения (отмененной задачи - finish_job)
+        future = service.pool.submit(convert, work_dir, files, service.options, time.time())
+        future.add_done_callback(functools.partial(service.finish_job, work_dir))
+        try:
+            result = future.result(timeout=service.timeout)
+        except FutureTimeout:
+            # Задача, еще ждущая в очереди, отменяется; уже выполняемая досчитывается в своем процессе
+            future.cancel()
+            self.send_json(504, {"error": f"Преобразование не завершилось за {service.timeout} с"})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"Ошибка рабочего процесса: {e}"})
+            return
+        result["files"] = files
+        result["timings"]["total"] = round(time.perf_counter() - received, 4)
+        self.send_json(200 if result["status"] == "ok" else 422, result)
+
+
+class ConvertService:
+    """HTTP-сервер с пулом рабочих процессов и общими справочниками."""
+
+    def __init__(self, root_dir=None, host="127.0.0.1", port=DEFAULT_PORT, workers=None, max_pending=None,
+                 timeout=DEFAULT_TIMEOUT, model='dict', source='xlsx', work_root=None):
+        shared = load_shared(os.path.abspath(root_dir), source) if root_dir else {}
+        self.catalog_sizes = {name: len(values) for name, values in shared.items()}
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = self.workers * 4 if max_pending is None else max_pending
+        # Одновременно выполняется workers запросов, еще max_pending ждут в очереди; остальным - 503.
+        # Учитываются задачи пула, а не ожидающие ответа запросы (см. finish_job)
+        self.capacity = self.workers + self.max_pending
+        self.jobs = 0
+        self.lock = threading.Lock()
+        self.timeout = timeout
+        self.options = {'model': model, 'source': source}
+        self.work_root = work_root
+        # Процессы запускаются через spawn: fork из многопоточного сервера небезопасен
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=init_worker, initargs=(shared, source))
+        for future in [self.pool.submit(warm_up) for _ in range(self.workers)]:
+            future.result()
+        self.httpd = ThreadingHTTPServer((host, port), ConvertHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = self
+
+    def acquire(self):
+        """Занимает место для задачи; False - все места заняты."""
+        with self.lock:
+            if self.jobs >= self.capacity:
+                return False
+            self.jobs += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.jobs -= 1
+
+    def in_progress(self):
+        with self.lock:
+            return self.jobs
+
+    def finish_job(self, work_dir, future):
+        """Задача пула завершена или отменена: место освобождается."""
+        if future.cancelled():
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self.release()
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+
+def send(url, school_dir, out_dir=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Клиент: отправляет книги школы службе и возвращает ответ.
+    :param out_dir: Каталог для GIS_schedule.csv и findings.jsonl из ответа (не записываются, если None).
+    """
+    import pipeline
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in pipeline.EXCEL_FILES:
+            file_path = os.path.join(school_dir, name)
+            if os.path.exists(file_path):
+                archive.write(file_path, name)
+    request = urllib.request.Request(url.rstrip('/') + "/convert", data=buffer.getvalue(),
+                                     headers={"Content-Type": "application/zip"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        result = json.load(e)
+        result.setdefault("status", f"HTTP {e.code}")
+    if out_dir and result.get("gis_schedule") is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, 'GIS_schedule.csv'), 'w', encoding='windows-1251', newline='') as file:
+            file.write(result["gis_schedule"])
+        with open(os.path.join(out_dir, 'findings.jsonl'), 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in result["findings"])
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная HTTP-служба преобразования расписания для ГИС СО ЕЦП")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="запустить службу")
+    serve_parser.add_argument("--root", default=None,
+                              help="каталог с общими klass.xlsx, lesson.xlsx и zamena.xlsx (или .csv)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию только локальный)")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"порт (по умолчанию {DEFAULT_PORT})")
+    serve_parser.add_argument("--workers", type=int, default=None, help="число рабочих процессов (по умолчанию до 4)")
+    serve_parser.add_argument("--max-pending", type=int, default=None,
+                              help="сколько запросов может ждать в очереди (по умолчанию 4 на процесс)")
+    serve_parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                              help="предельное время ожидания результата, с")
+    serve_parser.add_argument("--model", choices=["dict", "grid", "columnar"], default="dict",
+                              help="представление расписания (см. pipeline.py)")
+    serve_parser.add_argument("--source", choices=["csv", "xlsx"], default="xlsx",
+                              help="чтение книг: xlsx - напрямую (по умолчанию), csv - через pandas")
+
+    send_parser = commands.add_parser("send", help="отправить книги школы работающей службе")
+    send_parser.add_argument("school_dir", help="каталог с raspisanie.xlsx, groups.xlsx, ...")
+    send_parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}", help="адрес службы")
+    send_parser.add_argument("--out", default=None, help="каталог для GIS_schedule.csv и findings.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        service = ConvertService(args.root, host=args.host, port=args.port, workers=args.workers,
+                                 max_pending=args.max_pending, timeout=args.timeout, model=args.model,
+                                 source=args.source)
+        print(f"Служба запущена: {service.address} (процессов: {service.workers}, "
+              f"справочники: {service.catalog_sizes or 'из запросов'})")
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            print("\nСлужба остановлена.")
+        finally:
+            service.close()
+    else:
+        result = send(args.url, args.school_dir, args.out)
+        print(f"Статус: {result.get('status')}" + (f" ({result['error']})" if result.get('error') else ""))
+        for item in result.get("stages", []):
+            print(f"  {item['stage']:<20} {item['seconds']:8.3f} с  {'OK' if item['ok'] else 'ОШИБКА'}")
+        if result.get("timings"):
+            print("Время: " + ", ".join(f"{name} {value:.3f} с" for name, value in result["timings"].items()))
+        if result.get("events"):
+            print("События: " + ", ".join(f"{name}={value}" for name, value in result["events"].items() if value))
+        if args.out and result.get("gis_schedule") is not None:
+            print(f"Результат записан в {args.out}")
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+# Кэш результатов этапов конвейера.
+# Ключ этапа - хэш содержимого его входных файлов, исходного кода его модулей
+# и ключа предыдущего этапа, изменившего расписание. Если ничего из этого не
+# поменялось, этап не выполняется: его выходные файлы и расписание берутся из кэша.
+# Записи хранятся в отдельных файлах каталога кэша; при превышении лимита размера
+# удаляются давно не использовавшиеся (LRU по времени изменения файла).
+
+CACHE_FORMAT = "1"  # Меняется при несовместимом изменении формата записей
+DEFAULT_MAX_MB = 200
+
+
+class RecordCollector(logging.Handler):
+    """Собирает предупреждения и ошибки этапа, чтобы повторить их в log.log при попадании в кэш."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.levelno, record.getMessage()))
+
+
+def file_digest(file_path):
+    """Хэш содержимого файла (или отметка об отсутствии файла)."""
+    if not os.path.exists(file_path):
+        return "missing"
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(modules):
+    """Хэш исходного кода модулей (pipeline.py учитывается всегда)."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for module in ("pipeline",) + tuple(modules):
+        digest.update(module.encode('utf-8'))
+        digest.update(file_digest(os.path.join(script_dir, f"{module}.py")).encode('ascii'))
+    return digest.hexdigest()
+
+
+class StageCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {}  # этап -> {"hit": n, "miss": n}
+        self._code_versions = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def code_version(self, modules):
+        """Хэш исходного кода модулей этапа (pipeline.py учитывается всегда)."""
+        modules = tuple(modules)
+        if modules not in self._code_versions:
+            self._code_versions[modules] = code_version(modules)
+        return self._code_versions[modules]
+
+    def stage_key(self, stage_name, modules, input_files, previous_key=None, extra=""):
+        """Вычисляет ключ этапа."""
+        digest = hashlib.sha256()
+        for part in (CACHE_FORMAT, stage_name, self.code_version(modules), previous_key or "", extra):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        for file_path in input_files:
+            digest.update(os.path.basename(file_path).encode('utf-8'))
+            digest.update(file_digest(file_path).encode('ascii'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, stage_name, key):
+        """Возвращает запись кэша или None; обновляет статистику и время использования."""
+        entry_path = self._entry_path(key)
+        stats = self.stats.setdefault(stage_name, {"hit": 0, "miss": 0})
+        try:
+            with open(entry_path, 'rb') as file:
+                entry = pickle.load(file)
+            os.utime(entry_path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            stats["miss"] += 1
+            return None
+        stats["hit"] += 1
+        return entry
+
+    def put(self, key, entry):
+        """Сохраняет запись атомарно (через временный файл) и вытесняет старые записи."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            logging.warning(f"Не удалось сохранить запись кэша {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаляет самые давно использованные записи, пока размер кэша превышает лимит."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+                logging.info(f"Запись кэша {os.path.basename(entry_path)} вытеснена.")
+            except OSError:
+                pass  # Запись могла удалить параллельная обработка
+
+    def report(self):
+        """Выводит число попаданий и промахов по этапам."""
+        print("Кэш этапов:")
+        for stage_name, stats in self.stats.items():
+            print(f"  {stage_name:<20} попаданий {stats['hit']:>3}, промахов {stats['miss']:>3}")
+
+
+def capture_outputs(base_dir, output_files):
+    """Читает выходные файлы этапа для сохранения в кэш."""
+    files = {}
+    for name in output_files:
+        file_path = os.path.join(base_dir, name)
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as file:
+                files[name] = file.read()
+    return files
+
+
+def restore_outputs(base_dir, files):
+    """Восстанавливает выходные файлы этапа из записи кэша."""
+    for name, content in files.items():
+        with open(os.path.join(base_dir, name), 'wb') as file:
+            file.write(content)
@@ -0,0 +1,191 @@
+import argparse
+import csv
+import os
+import random
+
+# Генератор синтетических исходных данных в формате АВЕРС для нагрузочной проверки.
+# Создает raspisanie.csv (как после exel_to_csv.py) и согласованные справочники
+# groups.csv, zamena.csv, klass.csv, lesson.csv; по желанию - те же данные в .xlsx.
+# Часть значений намеренно не совпадает со справочниками, чтобы проверки находили ошибки.
+
+WIDTH = 12  # Номер, время и пары (урок, кабинет) на пять дней
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]
+BASE_SUBJECTS = ["Математика", "Русский язык", "Литература", "Информатика", "История", "Физика",
+                 "Химия", "Биология", "География", "Обществознание", "Физическая культура", "Музыка"]
+LETTERS = "АБВГДЕЖИКЛМН"
+SURNAMES = ["Иванов", "Петрова", "Сидоров", "Кузнецова", "Смирнов", "Попова", "Волков", "Соколова"]
+
+# Значения по умолчанию соответствуют одной типичной школе
+DEFAULTS = {
+    'classes': 30,
+    'slots': 7,
+    'subgroup_ratio': 0.3,
+    'catalog_size': 60,
+    'empty_ratio': 0.15,
+    'unknown_ratio': 0.02,
+    'seed': 1,
+}
+
+
+def lesson_times(slots):
+    """Время уроков: 40 минут с переменами по 10 минут начиная с 08:00."""
+    times = []
+    start = 8 * 60
+    for _ in range(slots):
+        end = start + 40
+        times.append(f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}")
+        start = end + 10
+    return times
+
+
+def class_names(count):
+    """Имена классов 1А, 1Б, ... 11Н; при большем числе добавляется номер корпуса."""
+    names = []
+    index = 0
+    while len(names) < count:
+        building, rest = divmod(index, 11 * len(LETTERS))
+        grade, letter = divmod(rest, len(LETTERS))
+        name = f"{grade + 1}{LETTERS[letter]}"
+        names.append(name if building == 0 else f"{name}-{building + 1}")
+        index += 1
+    return names
+
+
+def make_catalogs(catalog_size, rng):
+    """Предметы, кабинеты и учителя размера catalog_size."""
+    subjects = list(BASE_SUBJECTS[:catalog_size])
+    subjects += [f"Элективный курс {i}" for i in range(1, catalog_size - len(subjects) + 1)]
+    rooms = [str(100 * (i // 30 + 1) + i % 30 + 1) for i in range(catalog_size)]
+    teachers = [f"{rng.choice(SURNAMES)} {i} {rng.choice(LETTERS)}. {rng.choice(LETTERS)}."
+                for i in range(1, catalog_size + 1)]
+    return subjects, rooms, teachers
+
+
+def write_rows(file_path, rows):
+    with open(file_path, 'w', encoding='windows-1251', newline='') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerows(rows)
+
+
+def write_xlsx(file_path, rows):
+    """Записывает строки в .xlsx (openpyxl, потоковый режим)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in rows:
+        sheet.append([value if value != "" else None for value in row])
+    workbook.save(file_path)
+
+
+def generate(out_dir, classes=DEFAULTS['classes'], slots=DEFAULTS['slots'],
+             subgroup_ratio=DEFAULTS['subgroup_ratio'], catalog_size=DEFAULTS['catalog_size'],
+             empty_ratio=DEFAULTS['empty_ratio'], unknown_ratio=DEFAULTS['unknown_ratio'],
+             seed=DEFAULTS['seed'], xlsx=False):
+    """
+    Создает набор исходных файлов в out_dir.
+    :param classes: Число классов.
+    :param slots: Число уроков в день.
+    :param subgroup_ratio: Доля уроков, у которых есть строка подгруппы (.1).
+    :param catalog_size: Число предметов, кабинетов и учителей в справочниках.
+    :param empty_ratio: Доля пустых уроков.
+    :param unknown_ratio: Доля предметов и кабинетов, которых нет в справочниках.
+    :param xlsx: Дополнительно записать .xlsx (нужен openpyxl).
+    :return: Словарь с числом классов и уроков.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    subjects, rooms, teachers = make_catalogs(catalog_size, rng)
+    times = lesson_times(slots)
+    names = class_names(classes)
+
+    def pick_subject():
+        return f"{rng.choice(subjects)} (углубл.)" if rng.random() < unknown_ratio else rng.choice(subjects)
+
+    def pick_room():
+        return str(9000 + rng.randrange(100)) if rng.random() < unknown_ratio else rng.choice(rooms)
+
+    # Строки расписания в том виде, в котором их дает pandas (первая строка - заголовок Unnamed)
+    schedule = [[f"Unnamed: {i}" for i in range(WIDTH)], ["Расписание всех классов"] + [""] * (WIDTH - 1),
+                [""] * WIDTH]
+    lessons = 0
+    taught = set()
+    for name in names:
+        schedule.append([f"Класс - {name}"] + [""] * (WIDTH - 1))
+        schedule.append([""] * WIDTH)
+        schedule.append(["№", "Время"] + [cell for day in DAYS for cell in (day, "")])
+        schedule.append([""] * WIDTH)
+        for slot in range(slots):
+            lesson_row, teacher_row = [str(slot + 1), times[slot]], ["", ""]
+            for _ in DAYS:
+                if rng.random() < empty_ratio:
+                    lesson_row += ["", ""]
+                    teacher_row += ["", ""]
+                    continue
+                subject, teacher = pick_subject(), rng.choice(teachers)
+                lesson_row += [subject, pick_room()]
+                teacher_row += [teacher, ""]
+                taught.add((name, subject, teacher))
+                lessons += 1
+            schedule += [lesson_row, teacher_row]
+            if rng.random() < subgroup_ratio:
+                # Строка подгруппы; первый день всегда заполнен (пустая строка подгруппы
+                # после разделителя не разбирается исходным csv_to_json.py)
+                lesson_row, teacher_row = ["", ""], ["", ""]
+                for day_index, _ in enumerate(DAYS):
+                    if day_index and rng.random() < 0.5:
+                        lesson_row += ["", ""]
+                        teacher_row += ["", ""]
+                        continue
+                    subject, teacher = pick_subject(), rng.choice(teachers)
+                    lesson_row += [subject, rng.choice(rooms + ["", ""])]
+                    teacher_row += [teacher, ""]
+                    taught.add((name, subject, teacher))
+                    lessons += 1
+                schedule += [lesson_row, teacher_row]
+        schedule.append([""] * WIDTH)
+
+    # Группы для части сочетаний класс/предмет/учитель
+    groups = [["Класс", "Предмет", "Учитель", "Группа"]]
+    for name, subject, teacher in sorted(taught):
+        if rng.random() < subgroup_ratio:
+            groups.append([name.lower() if rng.random() < 0.5 else name, subject, teacher, f"{name} Группа 1"])
+            if rng.random() < 0.6:
+                groups.append([name, subject, teacher, f"{name} Группа 2"])
+
+    files = {
+        'raspisanie': schedule,
+        'groups': groups,
+        'klass': [["Кабинеты"], ["Школа"], ["Наименование"]] + [[room] for room in rooms],
+        'lesson': [["Предметы"], ["Наименование"]] + [[subject] for subject in subjects],
+        'zamena': [["Ключ", "Значение"], [" (углубл.)", ""], ["Элективный курс", "Элективный курс"]],
+    }
+    for base, rows in files.items():
+        write_rows(os.path.join(out_dir, f"{base}.csv"), rows)
+        if xlsx:
+            # В книге расписания вместо заголовка pandas - пустая первая строка
+            sheet_rows = [[""] * WIDTH] + rows[1:] if base == 'raspisanie' else rows
+            write_xlsx(os.path.join(out_dir, f"{base}.xlsx"), sheet_rows)
+    return {'classes': classes, 'lessons': lessons}
+
+
+def add_arguments(parser):
+    """Параметры генератора для argparse (используются и в benchmark.py)."""
+    parser.add_argument("--classes", type=int, default=DEFAULTS['classes'], help="число классов")
+    parser.add_argument("--slots", type=int, default=DEFAULTS['slots'], help="уроков в день")
+    parser.add_argument("--subgroup-ratio", type=float, default=DEFAULTS['subgroup_ratio'],
+                        help="доля уроков со строкой подгруппы (.1)")
+    parser.add_argument("--catalog-size", type=int, default=DEFAULTS['catalog_size'],
+                        help="число предметов, кабинетов и учителей")
+    parser.add_argument("--seed", type=int, default=DEFAULTS['seed'], help="начальное значение генератора")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генератор синтетического расписания АВЕРС и справочников")
+    parser.add_argument("out_dir", help="каталог для файлов")
+    parser.add_argument("--xlsx", action="store_true", help="дополнительно записать .xlsx (нужен openpyxl)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    stats = generate(args.out_dir, classes=args.classes, slots=args.slots, subgroup_ratio=args.subgroup_ratio,
+                     catalog_size=args.catalog_size, seed=args.seed, xlsx=args.xlsx)
+    print(f"Создано: классов {stats['classes']}, уроков {stats['lessons']} в {args.out_dir}")
@@ -1,7 +1,8 @@
 import csv
-import json
 import logging
+import re
 import time
+import checkpoint
 
 # Настройка логирования
 logging.basicConfig(
@@ -12,51 +13,134 @@ logging.basicConfig(
 
 # Функция для загрузки данных из CSV файла (в кодировке Windows-1251)
 def load_replacements(csv_file):
-    replacements = {}
     try:
         with open(csv_file, mode='r', encoding='windows-1251') as file:  # Указываем кодировку Windows-1251
             reader = csv.reader(file, delimiter=';')  # Используем точку с запятой как разделитель
-            next(reader)  # Пропускаем первую строку
-            for row in reader:
-                if len(row) == 2:  # Проверяем, что есть два значения
-                    old_value, new_value = row
-                    replacements[old_value] = new_value
-                    logging.info(f"Добавлена замена: '{old_value}' -> '{new_value}'")
-                else:
-                    logging.warning(f"Неправильный формат строки в файле {csv_file}: {row}")
+            replacements = replacements_from_rows(reader, csv_file)
         logging.info("Замены успешно загружены из файла.")
     except Exception as e:
         logging.error(f"Ошибка при чтении файла {csv_file}: {e}")
         raise
     return replacements
 
+# Функция для разбора строк справочника замен (из CSV или напрямую из zamena.xlsx)
+def replacements_from_rows(rows, source_name='zamena.csv'):
+    replacements = {}
+    rows = iter(rows)
+    next(rows)  # Пропускаем первую строку
+    for row in rows:
+        if len(row) == 2:  # Проверяем, что есть два значения
+            old_value, new_value = row
+            replacements[old_value] = new_value
+            logging.info(f"Добавлена замена: '{old_value}' -> '{new_value}'")
+        else:
+            logging.warning(f"Неправильный формат строки в файле {source_name}: {row}")
+    return replacements
+
+# Движок замен: все правила из zamena.csv собираются в одно регулярное выражение.
+# Альтернативы упорядочены по убыванию длины (при равной длине - по порядку в файле),
+# поэтому в каждой позиции срабатывает самое длинное совпадающее правило, а результат
+# не зависит от порядка строк. Замены выполняются за один проход, без повторного
+# применения правил к уже замененному тексту. Результат запоминается для каждого названия урока.
+class ReplacementEngine:
+    def __init__(self, replacements):
+        self.replacements = {}
+        for old_value, new_value in replacements.items():
+            if old_value:
+                self.replacements[old_value] = new_value
+            else:
+                logging.warning(f"Пустой ключ замены пропущен: '' -> '{new_value}'")
+        order = {old_value: index for index, old_value in enumerate(self.replacements)}
+        patterns = sorted(self.replacements, key=lambda old_value: (-len(old_value), order[old_value]))
+        self.pattern = re.compile('|'.join(map(re.escape, patterns))) if patterns else None
+        self.fired = dict.fromkeys(self.replacements, 0)  # Сколько раз сработало каждое правило
+        self._memo = {}
+
+    @classmethod
+    def of(cls, replacements):
+        """Возвращает движок как есть или собирает его из словаря замен."""
+        return replacements if isinstance(replacements, cls) else cls(replacements)
+
+    def fork(self):
+        """Движок с теми же правилами, выражением и запомненными результатами, но своими счетчиками."""
+        engine = object.__new__(type(self))
+        engine.replacements = self.replacements
+        engine.pattern = self.pattern
+        engine.fired = dict.fromkeys(self.replacements, 0)
+        engine._memo = self._memo
+        return engine
+
+    def _apply(self, text):
+        rules = []
+
+        def substitute(match):
+            rules.append(match.group(0))
+            return self.replacements[match.group(0)]
+
+        return self.pattern.sub(substitute, text), tuple(rules)
+
+    def replace(self, text):
+        """Возвращает текст после замен и учитывает сработавшие правила."""
+        if self.pattern is None:
+            return text
+        result = self._memo.get(text)
+        if result is None:
+            result = self._memo[text] = self._apply(text)
+        new_text, rules = result
+        for rule in rules:
+            self.fired[rule] += 1
+        return new_text
+
+    def report(self):
+        """Записывает в лог, сколько раз сработало каждое правило."""
+        for old_value, count in self.fired.items():
+            logging.info(f"Правило замены '{old_value}' -> '{self.replacements[old_value]}': срабатываний {count}")
+
+
+# Функция для замены названий уроков в расписании
+# replacements - словарь замен или уже собранный ReplacementEngine
+def replace_lessons(data, replacements):
+    engine = ReplacementEngine.of(replacements)
+    if not apply_replacements(data, engine):
+        logging.info("Нет изменений для применения.")
+    engine.report()
+    return data
+
+# Функция для замены названий уроков движком замен без итогового отчета
+# (используется и для отдельных классов, см. class_cache.py); возвращает True, если были замены
+def apply_replacements(data, engine):
+    # Проходим по всем классам и дням недели
+    changes_made = False
+    for class_name, days in data.items():
+        for day, lessons in days.items():
+            for lesson_number, lesson_info in lessons.items():
+                if 'lesson' in lesson_info:
+                    original_lesson = lesson_info['lesson']
+                    new_lesson = engine.replace(original_lesson)
+                    if new_lesson != original_lesson:
+                        lesson_info['lesson'] = new_lesson
+                        logging.info(f"Замена выполнена: класс={class_name}, день={day}, урок={lesson_number}, "
+                                     f"'{original_lesson}' -> '{new_lesson}'")
+                        changes_made = True
+    return changes_made
+
+# Функция для замен в части расписания (для параллельной обработки классов, см. class_pool.py):
+# возвращает часть, счетчики срабатываний правил и признак изменений
+def replace_part(data, replacements):
+    engine = ReplacementEngine.of(replacements)
+    changes_made = apply_replacements(data, engine)
+    return data, engine.fired, changes_made
+
 # Функция для обновления JSON файла
 def update_json(input_json_file, output_json_file, replacements):
     try:
-        with open(input_json_file, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        data = checkpoint.load(input_json_file)
         logging.info(f"Файл {input_json_file} успешно загружен.")
 
-        # Проходим по всем классам и дням недели
-        changes_made = False
-        for class_name, days in data.items():
-            for day, lessons in days.items():
-                for lesson_number, lesson_info in lessons.items():
-                    if 'lesson' in lesson_info:
-                        original_lesson = lesson_info['lesson']
-                        for old_value, new_value in replacements.items():
-                            if old_value in lesson_info['lesson']:
-                                lesson_info['lesson'] = lesson_info['lesson'].replace(old_value, new_value)
-                                logging.info(f"Замена выполнена: класс={class_name}, день={day}, урок={lesson_number}, "
-                                             f"'{original_lesson}' -> '{lesson_info['lesson']}'")
-                                changes_made = True
-
-        if not changes_made:
-            logging.info("Нет изменений для применения.")
+        replace_lessons(data, replacements)
 
         # Сохраняем обновленные данные в новый файл
-        with open(output_json_file, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+        checkpoint.dump(data, output_json_file)
         logging.info(f"Обновленные данные успешно сохранены в файл {output_json_file}.")
     except Exception as e:
         logging.error(f"Ошибка при обработке файла {input_json_file}: {e}")
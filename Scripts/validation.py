@@ -0,0 +1,153 @@
+import json
+import logging
+
+# Единый движок проверок расписания.
+# Проверки (правила) регистрируются в RULES и выполняются за один обход
+# класс -> день -> урок. Найденные несоответствия собираются в Findings без повторов:
+# одно и то же значение правила в классе (например, неизвестный кабинет на 12 уроках) - одна запись
+# со списком уроков, где оно найдено; общее число записей ограничено. Результат записывается в findings.jsonl (одна запись JSON в строке).
+
+NO_ROOM = "Нет кабинета"  # Значение, которое update_cab.py ставит урокам .1 без кабинета
+FINDINGS_FILE = "findings.jsonl"
+DEFAULT_LIMIT = 10000  # Максимум различных записей; остальные только подсчитываются
+
+# Правила: имя -> {"severity": "error" | "warning", "check": функция}
+# Функция получает (номер урока, данные урока, справочники) и возвращает проверяемое значение
+# при нарушении или None. Правила, сравнивающие уроки разных классов (накладки учителей и кабинетов,
+# conflicts.py), регистрируются без функции: уроки в том же обходе добавляются в индексы,
+# находки записываются после обхода.
+RULES = {}
+
+
+def register(name, severity="error"):
+    """Декоратор регистрации правила проверки."""
+    def decorator(check):
+        RULES[name] = {"severity": severity, "check": check}
+        return check
+    return decorator
+
+
+@register("unknown_subject")
+def check_unknown_subject(lesson_number, lesson_info, refs):
+    """Предмета нет в справочнике lesson (как в FindError.py и Final_check.py)."""
+    value = lesson_info.get("lesson", "").strip()
+    if value and value not in refs["lesson"]:
+        return value
+    return None
+
+
+@register("unknown_room")
+def check_unknown_room(lesson_number, lesson_info, refs):
+    """Кабинета нет в справочнике klass; "Нет кабинета" проверяется отдельным правилом."""
+    value = lesson_info.get("number", "").strip()
+    if value and value != NO_ROOM and value not in refs["klass"]:
+        return value
+    return None
+
+
+@register("missing_group")
+def check_missing_group(lesson_number, lesson_info, refs):
+    """Предмет делится на группы (groups.csv), а группы уроку не назначены (как в check_group.py)."""
+    value = lesson_info.get("lesson", "")
+    if value in refs["group_lessons"] and not lesson_info.get("groups"):
+        return value
+    return None
+
+
+@register("no_room", severity="warning")
+def check_no_room(lesson_number, lesson_info, refs):
+    """
+    Урок без кабинета. Для подгрупп (.1) это ожидаемая заглушка update_cab.py - предупреждение;
+    "Нет кабинета" у основного урока означает, что значение пришло из исходного расписания.
+    """
+    value = lesson_info.get("number", "").strip()
+    if value == NO_ROOM:
+        return value if lesson_number.endswith(".1") else f"{value} (основной урок)"
+    return None
+
+
+RULES["teacher_conflict"] = {"severity": "error", "check": None}  # Учитель в одно время у разных классов
+RULES["room_conflict"] = {"severity": "error", "check": None}  # Кабинет в одно время у разных классов
+
+
+class Findings:
+    """Найденные несоответствия без повторов, с ограничением числа записей."""
+    __slots__ = ("limit", "found", "dropped")
+
+    def __init__(self, limit=DEFAULT_LIMIT):
+        self.limit = limit
+        self.found = {}  # (правило, класс, значение) -> [(день, урок), ...]
+        self.dropped = {}  # правило -> число находок сверх лимита
+
+    def add(self, rule, class_name, day, lesson_number, value):
+        key = (rule, class_name, value)
+        slots = self.found.get(key)
+        if slots is not None:
+            slots.append((day, lesson_number))
+        elif len(self.found) < self.limit:
+            self.found[key] = [(day, lesson_number)]
+        else:
+            self.dropped[rule] = self.dropped.get(rule, 0) + 1
+
+    def __len__(self):
+        return len(self.found)
+
+    def by_rule(self):
+        """Число находок по правилам (каждый урок отдельно, с учетом не попавших в лимит)."""
+        totals = dict.fromkeys(RULES, 0)
+        for (rule, *_), slots in self.found.items():
+            totals[rule] = totals.get(rule, 0) + len(slots)
+        for rule, count in self.dropped.items():
+            totals[rule] = totals.get(rule, 0) + count
+        return totals
+
+    def iter_records(self):
+        """Записи для findings.jsonl в порядке обнаружения, затем сведения об отброшенных."""
+        for (rule, class_name, value), slots in self.found.items():
+            yield {"rule": rule, "severity": RULES.get(rule, {}).get("severity", "error"),
+                   "class": class_name, "value": value, "count": len(slots), "slots": [list(slot) for slot in slots]}
+        for rule, count in self.dropped.items():
+            yield {"rule": rule, "severity": RULES.get(rule, {}).get("severity", "error"), "truncated": count}
+
+    def write_jsonl(self, file_path=FINDINGS_FILE):
+        """Записывает находки в JSONL; файл создается, только если есть находки (как error.log)."""
+        if not self.found and not self.dropped:
+            logging.info("Проверка расписания: несоответствий не найдено.")
+            return
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in self.iter_records())
+        for rule, count in self.by_rule().items():
+            if count:
+                log = logging.error if RULES.get(rule, {}).get("severity") == "error" else logging.warning
+                log(f"Проверка расписания: правило {rule}, находок {count}")
+        logging.info(f"Находки записаны в файл {file_path}.")
+
+
+def validate(data, refs, rules=None, findings=None):
+    """
+    Проверяет расписание всеми правилами за один обход (накладки - по индексам, заполненным в нем же).
+    :param data: Расписание в формате raspisanie*.json.
+    :param refs: Справочники: klass и lesson (ReferenceCatalog), group_lessons (множество предметов с группами).
+    :param rules: Имена правил (по умолчанию все из RULES).
+    :param findings: Существующий Findings для накопления (по умолчанию новый).
+    :return: Findings.
+    """
+    names = list(rules or RULES)
+    checks = [(name, RULES[name]["check"]) for name in names if RULES[name]["check"] is not None]
+    index = None
+    if len(checks) < len(names):
+        import conflicts
+        index = conflicts.ConflictIndex()
+    findings = findings if findings is not None else Findings()
+    for class_name, days in data.items():
+        for day, lessons in days.items():
+            for lesson_number, lesson_info in lessons.items():
+                for name, check in checks:
+                    value = check(lesson_number, lesson_info, refs)
+                    if value is not None:
+                        findings.add(name, class_name, day, lesson_number, value)
+                if index is not None:
+                    index.add(class_name, day, lesson_number, lesson_info)
+    if index is not None:
+        index.report(findings, names)
+    return findings
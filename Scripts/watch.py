@@ -0,0 +1,186 @@
+import argparse
+import os
+import pickle
+import time
+
+# Режим наблюдения за исходными книгами.
+# Интерпретатор, pandas, справочники и прочитанные книги остаются в памяти между запусками.
+# При сохранении raspisanie.xlsx, groups.xlsx, zamena.xlsx, klass.xlsx или lesson.xlsx
+# заново читаются только измененные книги и выполняются только этапы, которые от них зависят:
+# этапы, читающие соответствующий CSV (STAGE_INFO["inputs"]), и все этапы после первого
+# выполненного этапа, изменяющего расписание.
+# В режиме in_memory расписание на входе этапа восстанавливается из снимка после
+# предыдущего этапа, изменяющего расписание (снимки хранятся в pickle).
+
+DEFAULT_INTERVAL = 0.25  # Период опроса файлов, с
+
+
+def workbook_state(base_dir, names):
+    """Время изменения и размер каждой книги (None, если книги нет)."""
+    state = {}
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(base_dir, name))
+            state[name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            state[name] = None
+    return state
+
+
+def affected_stages(changed, stage_names):
+    """
+    Этапы, которые нужно выполнить после изменения книг changed (в порядке конвейера).
+    :param changed: Имена измененных книг (*.xlsx).
+    :param stage_names: Этапы полного запуска.
+    """
+    import pipeline
+
+    inputs = {name.replace('.xlsx', '.csv') for name in changed}
+    selected = ["exel_to_csv"]
+    dirty = False  # Выполнен этап, изменяющий расписание: все следующие этапы читают новое расписание
+    for name in stage_names:
+        info = pipeline.STAGE_INFO.get(name)
+        if info is None or name == "exel_to_csv":
+            continue
+        if dirty or inputs & set(info["inputs"]):
+            selected.append(name)
+            dirty = dirty or info["data"]
+    return selected
+
+
+class Watcher:
+    """Повторные запуски конвейера в одном контексте по изменениям книг."""
+
+    def __init__(self, base_dir=None, options=None, interval=DEFAULT_INTERVAL, cache=None, classes=None,
+                 executor=None):
+        """
+        :param options: Параметры run_pipeline (pipeline.pipeline_options).
+        :param cache: stage_cache.StageCache, classes: class_cache.ClassCache, executor: class_pool.ClassPool
+                      (как в run_pipeline) - используются во всех запусках.
+        """
+        import pipeline
+
+        options = dict(options or {})
+        self.validation = options.pop('validation', 'legacy')
+        self.stop_on = options.pop('stop_on', ())
+        self.store = options.pop('store', None)
+        self.store_week = options.pop('store_week', None)
+        # Наблюдение идет за книгами в каталоге школы, поэтому этапы выполняются в нем самом
+        options.pop('workspace', None)
+        options.pop('workspace_outputs', None)
+        self.ctx = pipeline.make_context(base_dir, **options)
+        self.cache = cache
+        self.classes = classes
+        self.executor = executor
+        self.interval = interval
+        self.snapshots = {}  # Этап -> расписание после него (pickle)
+        self.complete = False  # Предыдущий запуск дошел до конца: снимки всех этапов есть
+        skipped = [name for mode, names in pipeline.VALIDATION_STAGES.items()
+                   if mode != self.validation for name in names]
+        self.stage_names = [name for name, _ in pipeline.STAGES if name not in skipped]
+        self.data_stages = [name for name in self.stage_names if pipeline.STAGE_INFO.get(name, {}).get("data")]
+
+    def before_stage(self, name, ctx):
+        import delete
+        import pipeline
+
+        if name == "exel_to_csv" or name not in pipeline.STAGE_INFO:
+            return
+        # Файлы ошибок прошлого запуска не должны остаться, если ошибки исправлены
+        delete.delete_files([pipeline.path(ctx, file_name) for file_name in pipeline.STAGE_INFO[name]["outputs"]])
+        if ctx['in_memory']:
+            position = self.stage_names.index(name)
+            previous = [stage for stage in self.data_stages if self.stage_names.index(stage) < position]
+            if previous and previous[-1] in self.snapshots:
+                ctx['data'] = pickle.loads(self.snapshots[previous[-1]])
+
+    def after_stage(self, name, ctx):
+        if ctx['in_memory'] and name in self.data_stages and ctx['data'] is not None:
+            self.snapshots[name] = pickle.dumps(ctx['data'], protocol=pickle.HIGHEST_PROTOCOL)
+        return True
+
+    def run(self, changed=None):
+        """
+        Выполняет конвейер: полностью (changed=None или прошлый запуск не завершен)
+        или только этапы, зависящие от измененных книг.
+        :return: Результаты run_pipeline.
+        """
+        import pipeline
+
+        if changed is None or not self.complete:
+            stages = self.stage_names
+            self.ctx['workbooks'] = None
+            self.ctx['sources'] = None
+            self.ctx['references'] = None
+            self.snapshots.clear()
+        else:
+            stages = affected_stages(changed, self.stage_names)
+            self.ctx['workbooks'] = sorted(changed)
+            if {'klass.xlsx', 'lesson.xlsx'} & set(changed):
+                self.ctx['references'] = None
+        results = pipeline.run_pipeline(stages=stages, validation=self.validation, stop_on=self.stop_on,
+                                        before_stage=self.before_stage, after_stage=self.after_stage,
+                                        context=self.ctx, store=self.store, store_week=self.store_week,
+                                        cache=self.cache, classes=self.classes, executor=self.executor)
+        self.complete = len(results) == len(stages) and all(item["ok"] and not item["violations"]
+                                                            for item in results)
+        return results
+
+    def watch(self, max_runs=None):
+        """Опрашивает книги и перезапускает конвейер после их сохранения (Ctrl+C - выход)."""
+        import pipeline
+
+        names = pipeline.EXCEL_FILES
+        state = workbook_state(self.ctx['base_dir'], names)
+        runs = 0
+        self.report(self.run())
+        while max_runs is None or runs < max_runs:
+            time.sleep(self.interval)
+            current = workbook_state(self.ctx['base_dir'], names)
+            if current == state:
+                continue
+            # Excel сохраняет книгу в несколько приемов: ждем, пока файлы перестанут меняться
+            while True:
+                time.sleep(self.interval)
+                settled = workbook_state(self.ctx['base_dir'], names)
+                if settled == current:
+                    break
+                current = settled
+            changed = [name for name in names if current[name] != state[name] and current[name] is not None]
+            state = current
+            if not changed:
+                continue
+            print(f"\nИзменены: {', '.join(changed)}")
+            self.report(self.run(changed))
+            runs += 1
+
+    @staticmethod
+    def report(results):
+        total = sum(item["seconds"] for item in results)
+        stages = ", ".join(item["stage"] for item in results)
+        print(f"Готово за {total:.3f} с ({stages}). Ожидание изменений...")
+
+
+if __name__ == "__main__":
+    import pipeline
+
+    parser = argparse.ArgumentParser(description="Повторная обработка расписания при изменении Excel-файлов")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="период опроса файлов в секундах (по умолчанию 0.25)")
+    pipeline.add_arguments(parser)
+    args = parser.parse_args()
+    cache = pipeline.make_cache(args)
+    classes = pipeline.make_class_cache(args)
+    executor = pipeline.make_class_pool(args)
+    try:
+        Watcher(options=pipeline.pipeline_options(args), interval=args.interval, cache=cache,
+                classes=classes, executor=executor).watch()
+    except KeyboardInterrupt:
+        print("\nНаблюдение остановлено.")
+    finally:
+        if executor is not None:
+            executor.close()
+    if cache is not None:
+        cache.report()
+    if classes is not None:
+        classes.report()
@@ -0,0 +1,148 @@
+import logging
+import os
+import shutil
+import tempfile
+
+# Отдельный рабочий каталог запуска конвейера.
+# Все этапы читают и пишут файлы с фиксированными именами (log.log, raspisanie.json, GIS_schedule.csv, ...)
+# в каталоге запуска, поэтому два конвейера в одном каталоге мешают друг другу. Запуск с рабочим
+# каталогом копирует входные файлы школы в новый каталог (по желанию - на tmpfs, в /dev/shm),
+# выполняет этапы там и возвращает в каталог школы только итоговые файлы (или все файлы конвейера).
+# Несколько запусков (в разных процессах: журнал logging общий для процесса) не пересекаются.
+
+TMPFS_DIR = "/dev/shm"
+# Итоговые файлы: журналы, файлы ошибок и результаты выгрузки
+FINAL_FILES = ["log.log", "error.log", "err_groups.log", "final_error.log", "chech_groups.log", "findings.jsonl",
+               "GIS_schedule.csv", "GIS_schedule_delta.csv", "class_changes.json"]
+OUTPUTS = ["final", "all"]
+
+
+def workspace_root(location):
+    """
+    Каталог, в котором создаются рабочие каталоги запусков.
+    :param location: '' - временный каталог системы, 'tmpfs' - /dev/shm (если есть), иначе путь.
+    """
+    if location == 'tmpfs':
+        if os.path.isdir(TMPFS_DIR):
+            return TMPFS_DIR
+        logging.warning(f"Каталог {TMPFS_DIR} недоступен, рабочий каталог создается во временном каталоге системы")
+        return tempfile.gettempdir()
+    if not location:
+        return tempfile.gettempdir()
+    os.makedirs(location, exist_ok=True)
+    return os.path.abspath(location)
+
+
+def copy_back(source, target):
+    """
+    Копирует файл через временный файл с уникальным именем: читатель каталога школы не увидит
+    файл наполовину, а одновременные запуски не мешают друг другу (побеждает последний).
+    """
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.",
+                                     suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copy2(source, temporary)
+        os.replace(temporary, target)
+    except OSError:
+        remove(temporary)
+        raise
+
+
+def remove(file_path):
+    """Удаляет файл, если он есть (его мог удалить и другой запуск)."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+class Workspace:
+    """Рабочий каталог одного запуска: open() копирует входные файлы, close() возвращает результаты."""
+
+    def __init__(self, target_dir, location='', outputs='final'):
+        """
+        :param target_dir: Каталог школы.
+        :param location: Где создать рабочий каталог (см. workspace_root).
+        :param outputs: 'final' - вернуть итоговые файлы (FINAL_FILES), 'all' - все файлы конвейера,
+                        включая CSV и промежуточные JSON.
+        """
+        if outputs not in OUTPUTS:
+            raise ValueError(f"Неизвестный набор возвращаемых файлов: {outputs}")
+        self.target_dir = os.path.abspath(target_dir)
+        self.location = location
+        self.outputs = outputs
+        self.path = None
+        self.copied = {}  # Имя -> (mtime_ns, size) скопированного файла
+        self.clean = False  # Выполняется этап delete: прежние файлы конвейера в каталоге школы устаревают
+
+    def known_files(self):
+        import delete
+        import pipeline
+        return pipeline.EXCEL_FILES + delete.files_to_delete
+
+    def open(self, stages=None):
+        """
+        Создает рабочий каталог и копирует в него входные файлы.
+        :param stages: Выполняемые этапы (None - все); если выполняется delete, копируются только книги Excel.
+        :return: Путь рабочего каталога.
+        """
+        import pipeline
+
+        self.clean = stages is None or "delete" in stages
+        self.path = tempfile.mkdtemp(prefix="run_", dir=workspace_root(self.location))
+        names = pipeline.EXCEL_FILES if self.clean else self.known_files()
+        for name in names:
+            source = os.path.join(self.target_dir, name)
+            if os.path.isfile(source):
+                target = os.path.join(self.path, name)
+                shutil.copy2(source, target)
+                self.copied[name] = self.state(target)
+        return self.path
+
+    def state(self, file_path):
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def close(self):
+        """Возвращает в каталог школы новые и измененные файлы и удаляет рабочий каталог."""
+        try:
+            names = FINAL_FILES if self.outputs == 'final' else self.known_files()
+            for name in names:
+                source = os.path.join(self.path, name)
+                target = os.path.join(self.target_dir, name)
+                if os.path.isfile(source):
+                    if self.copied.get(name) != self.state(source):
+                        copy_back(source, target)
+                elif self.clean or name in self.copied:
+                    # Файл удален этапом delete (или не создан заново): как при запуске в каталоге школы
+                    remove(target)
+            self.copy_exports()
+            if self.clean and self.outputs == 'final':
+                # Промежуточные файлы прошлых запусков не возвращаются, но удаляются, как этапом delete
+                import pipeline
+                for name in self.known_files():
+                    target = os.path.join(self.target_dir, name)
+                    if name not in names and name not in pipeline.EXCEL_FILES:
+                        remove(target)
+        finally:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def copy_exports(self):
+        """Возвращает дополнительные цели выгрузки (json_to_GIS_SO.make_targets), если они созданы."""
+        import glob
+        import json_to_GIS_SO as gis
+
+        for directory in (gis.CLASS_DIR, gis.TEACHER_DIR):
+            source_dir = os.path.join(self.path, directory)
+            if os.path.isdir(source_dir):
+                target_dir = os.path.join(self.target_dir, directory)
+                gis.reset_dir(target_dir)
+                for source in glob.glob(os.path.join(source_dir, '*.csv')):
+                    copy_back(source, os.path.join(target_dir, os.path.basename(source)))
+        parts = glob.glob(os.path.join(self.path, f"{gis.PART_PREFIX}*.csv"))
+        if parts:
+            for stale in glob.glob(os.path.join(self.target_dir, f"{gis.PART_PREFIX}*.csv")):
+                remove(stale)
+            for source in parts:
+                copy_back(source, os.path.join(self.target_dir, os.path.basename(source)))
@@ -0,0 +1,138 @@
+import csv
+import datetime
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Чтение исходных Excel-файлов без промежуточных CSV и без pandas.
+# Строки берутся из .xlsx в режиме read_only (openpyxl) и сразу передаются разборщикам:
+# расписание - автомату iter_classes из csv_to_json.py, справочники - функциям *_from_rows.
+# Все пять книг читаются параллельно. CSV можно выгрузить для отладки (export_csv).
+
+WORKBOOKS = ['raspisanie.xlsx', 'klass.xlsx', 'lesson.xlsx', 'groups.xlsx', 'zamena.xlsx']
+CATALOG_WORKBOOKS = ['klass.xlsx', 'lesson.xlsx']
+SCHEDULE_WIDTH = 12  # Номер, время и пары (урок, кабинет) на пять дней
+
+
+def cell_to_str(value):
+    """
+    Приводит значение ячейки к строке. Целые числа записываются без ".0"; в CSV из pandas кабинеты
+    числовых столбцов с пустыми ячейками получают ".0" и приводятся к тому же виду при разборе
+    (reference_catalog.room_name).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Номера уроков и кабинетов без ".0"
+    if isinstance(value, datetime.datetime) and not (value.hour or value.minute or value.second):
+        return value.date().isoformat()
+    return str(value)
+
+
+def iter_xlsx_rows(file_path, min_width=0):
+    """
+    Возвращает строки первого листа книги как списки строк.
+    Строки дополняются пустыми ячейками до ширины листа, как в CSV из pandas.
+    Если размер листа в книге не записан (так сохраняют потоковые генераторы),
+    строки дополняются только до min_width (см. pad_rows).
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        width = max(sheet.max_column or 0, min_width)
+        for row in sheet.iter_rows(values_only=True):
+            cells = [cell_to_str(value) for value in row]
+            if len(cells) < width:
+                cells.extend([""] * (width - len(cells)))
+            yield cells
+    finally:
+        workbook.close()
+
+
+def pad_rows(rows):
+    """Дополняет строки до ширины самой длинной из них, как pandas при чтении листа."""
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+    return rows
+
+
+def tee_csv(rows, csv_path):
+    """Пропускает строки дальше, попутно записывая их в CSV (windows-1251, разделитель ';')."""
+    with open(csv_path, 'w', encoding='windows-1251', errors='replace', newline='') as file:
+        writer = csv.writer(file, delimiter=';', lineterminator=os.linesep)  # Как DataFrame.to_csv
+        for row in rows:
+            writer.writerow(row)
+            yield row
+
+
+def read_workbook(file_path, export_csv=False):
+    """
+    Читает одну книгу. Расписание сразу разбирается в словарь классов,
+    справочники возвращаются списком строк (они небольшие).
+    """
+    import csv_to_json
+
+    start = time.perf_counter()
+    is_schedule = os.path.basename(file_path) == 'raspisanie.xlsx'
+    csv_path = os.path.splitext(file_path)[0] + '.csv'
+    if is_schedule:
+        rows = iter_xlsx_rows(file_path, SCHEDULE_WIDTH)
+        if export_csv:
+            rows = tee_csv(rows, csv_path)
+        result = {}
+        for class_name, class_data in csv_to_json.iter_classes(rows):
+            result[class_name] = class_data
+    else:
+        # Справочники небольшие: читаются целиком и выравниваются по самой длинной строке
+        result = pad_rows(list(iter_xlsx_rows(file_path)))
+        if export_csv:
+            result = list(tee_csv(result, csv_path))
+    logging.info(f"Файл {file_path} прочитан за {time.perf_counter() - start:.3f} с.")
+    return result
+
+
+def load_inputs(base_dir, names=None, export_csv=False, max_workers=None):
+    """
+    Параллельно читает книги из base_dir.
+    :param names: Имена книг (по умолчанию все пять из WORKBOOKS).
+    :param export_csv: Дополнительно записать CSV рядом с книгами (для отладки).
+    :return: Словарь с ключами schedule, klass, lesson, groups, group_lessons, replacements
+             (только для прочитанных книг) или None, если каких-то книг нет.
+    """
+    import add_groups
+    import check_group
+    import reference_catalog
+    import update_lesson_gis
+
+    names = names or WORKBOOKS
+    paths = {name: os.path.join(base_dir, name) for name in names}
+    missing = [file_path for file_path in paths.values() if not os.path.exists(file_path)]
+    if missing:
+        for file_path in missing:
+            logging.error(f"Файл {file_path} не найден.")
+        return None
+
+    # Разбор XML в openpyxl частично отпускает GIL (zlib, lxml), поэтому потоков достаточно:
+    # процессы пришлось бы запускать и передавать им результаты обратно
+    with ThreadPoolExecutor(max_workers=max_workers or len(paths)) as executor:
+        futures = {name: executor.submit(read_workbook, file_path, export_csv) for name, file_path in paths.items()}
+        loaded = {name: future.result() for name, future in futures.items()}
+
+    sources = {}
+    if 'raspisanie.xlsx' in loaded:
+        sources['schedule'] = loaded['raspisanie.xlsx']
+    if 'klass.xlsx' in loaded:
+        sources['klass'] = reference_catalog.klass_from_rows(loaded['klass.xlsx'])
+    if 'lesson.xlsx' in loaded:
+        sources['lesson'] = reference_catalog.lesson_from_rows(loaded['lesson.xlsx'])
+    if 'groups.xlsx' in loaded:
+        sources['groups'] = add_groups.groups_from_rows(loaded['groups.xlsx'])
+        sources['group_lessons'] = check_group.group_lessons_from_rows(loaded['groups.xlsx'])
+    if 'zamena.xlsx' in loaded:
+        sources['replacements'] = update_lesson_gis.replacements_from_rows(loaded['zamena.xlsx'], paths['zamena.xlsx'])
+    return sources